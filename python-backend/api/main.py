@@ -3,11 +3,16 @@ LUMINA - API Principal
 Sistema de Gestão Educacional
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime
 
+from services.jwt_keys import get_jwt_key_store
+from services.password_hash_pool import PasswordHashPoolSaturated, get_password_hash_pool
+from services.token_cache import get_token_cache
+
 app = FastAPI(
     title="LUMINA API",
     description="API para Sistema de Gestão Educacional",
@@ -24,6 +29,22 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def load_jwt_keys():
+    """Carrega as chaves JWT uma vez, antes das primeiras requisições"""
+    get_jwt_key_store()
+
+
+@app.exception_handler(PasswordHashPoolSaturated)
+async def password_pool_saturated_handler(request: Request, exc: PasswordHashPoolSaturated):
+    """Backpressure do pool de bcrypt: servidor temporariamente sobrecarregado"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serviço de autenticação sobrecarregado, tente novamente"},
+        headers={"Retry-After": "1"}
+    )
+
+
 @app.get("/")
 async def root():
     """Endpoint raiz da API"""
@@ -39,7 +60,9 @@ async def health_check():
     """Verificação de saúde da API"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "password_hash_pool": get_password_hash_pool().metrics(),
+        "token_cache": get_token_cache().stats()
     }
 
 
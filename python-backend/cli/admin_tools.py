@@ -63,10 +63,24 @@ class AdminCLI:
         cleanup = subparsers.add_parser('cleanup', help='Limpar dados antigos')
         cleanup.add_argument('--days', type=int, default=90, help='Idade dos dados em dias')
         cleanup.add_argument('--dry-run', action='store_true', help='Simular sem executar')
+        
+        # Comando: análise de itens
+        item_analysis = subparsers.add_parser('item-analysis', help='Dificuldade e discriminação das questões')
+        item_analysis.add_argument('--input', required=True,
+                                   help='Matriz de acertos (.csv com cabeçalho de questões ou .npy)')
+        item_analysis.add_argument('--block-size', type=int, default=10000, help='Tentativas por bloco')
+        
+        # Comando: relatórios em lote
+        reports = subparsers.add_parser('reports', help='Gerar relatórios de desempenho de todos os alunos')
+        reports.add_argument('--attempts', required=True, help='CSV de tentativas')
+        reports.add_argument('--activity', help='CSV do activity_log (engajamento)')
+        reports.add_argument('--output', required=True, help='Diretório de saída ou arquivo .zip')
+        reports.add_argument('--archive', action='store_true', help='Gravar um único .zip')
+        reports.add_argument('--processes', type=int, help='Processos de renderização')
     
-    def run(self):
+    def run(self, argv: Optional[list] = None):
         """Executa o CLI"""
-        args = self.parser.parse_args()
+        args = self.parser.parse_args(argv)
         
         if not args.command:
             self.parser.print_help()
@@ -82,6 +96,8 @@ class AdminCLI:
             'restore': self.restore,
             'stats': self.show_stats,
             'cleanup': self.cleanup_data,
+            'item-analysis': self.item_analysis,
+            'reports': self.batch_reports,
         }
         
         handler = command_map.get(args.command)
@@ -123,10 +139,10 @@ class AdminCLI:
         if args.description:
             print(f"Descrição: {args.description}")
         
+        from services.class_service import ClassService
+        
         # Gera código
-        import random
-        import string
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        code = ClassService.generate_class_code()
         
         print(f"✓ Turma criada com sucesso!")
         print(f"Código de acesso: {code}")
@@ -226,6 +242,43 @@ class AdminCLI:
                 print("✓ Limpeza concluída com sucesso!")
             else:
                 print("Operação cancelada.")
+    
+    def item_analysis(self, args):
+        """Exibe relatório de análise de itens"""
+        from services.item_analysis import ItemAnalysis, format_item_report, iter_correctness_blocks
+        
+        question_ids, blocks = iter_correctness_blocks(args.input, args.block_size)
+        analysis = ItemAnalysis.from_blocks(blocks, question_ids)
+        
+        print("\n" + "=" * 80)
+        print("ANÁLISE DE ITENS")
+        print("=" * 80 + "\n")
+        print(format_item_report(analysis))
+    
+    def batch_reports(self, args):
+        """Gera relatórios de todos os alunos, um arquivo por turma"""
+        from scripts.data_analysis import ColumnarPerformanceAnalyzer, CohortEngagement, generate_batch_reports
+        
+        print(f"Analisando {args.attempts}...")
+        analyzer = ColumnarPerformanceAnalyzer.from_csv(args.attempts)
+        engagement = CohortEngagement.from_csv(args.activity) if args.activity else None
+        
+        result = generate_batch_reports(
+            analyzer,
+            args.output,
+            engagement,
+            archive=args.archive,
+            processes=args.processes,
+            on_progress=self._print_report_progress
+        )
+        
+        print(f"✓ {result['reports']} relatórios em {len(result['files'])} arquivos "
+              f"({result['elapsed']:.1f}s, {result['reports_per_second']:,.0f} relatórios/s)")
+    
+    @staticmethod
+    def _print_report_progress(written: int, total: int, elapsed: float):
+        rate = written / elapsed if elapsed > 0 else 0.0
+        print(f"  {written}/{total} relatórios em {elapsed:.1f}s ({rate:,.0f} relatórios/s)")
 
 
 def main():
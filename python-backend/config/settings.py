@@ -20,8 +20,16 @@ class Settings(BaseSettings):
     
     # Autenticação
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # HS256, RS256 ou EdDSA
+    JWT_JWKS_FILE: Optional[str] = None  # chaves públicas (por kid) para verificação
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None  # PEM de assinatura; ausente em nós só de verificação
+    JWT_SIGNING_KID: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 horas
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # padrão: número de núcleos
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    TOKEN_CACHE_SIZE: int = 10000  # 0 desativa o cache de tokens verificados
+    TOKEN_CACHE_TTL_SECONDS: int = 300
     
     # API
     API_PREFIX: str = "/api/v1"
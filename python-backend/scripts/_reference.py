@@ -0,0 +1,112 @@
+"""
+Implementações de Referência
+Versões originais (não otimizadas) e dados de exemplo usados pelos testes
+de equivalência e pelos benchmarks
+"""
+
+import random
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from scripts.data_migration import DateParser
+
+
+def collaborative_filtering_scan(user_id: str, all_users_interactions: Dict) -> List[str]:
+    """Implementação original por varredura completa (referência)"""
+    user_items = set(all_users_interactions.get(user_id, []))
+    
+    similar_users = []
+    for other_user_id, other_items in all_users_interactions.items():
+        if other_user_id == user_id:
+            continue
+        
+        other_items_set = set(other_items)
+        
+        if user_items:
+            similarity = len(user_items.intersection(other_items_set)) / \
+                       len(user_items.union(other_items_set))
+            
+            if similarity > 0.3:
+                similar_users.append((other_user_id, similarity))
+    
+    similar_users.sort(key=lambda x: x[1], reverse=True)
+    
+    recommendations = set()
+    for similar_user_id, _ in similar_users[:5]:
+        similar_user_items = set(all_users_interactions[similar_user_id])
+        recommendations.update(similar_user_items - user_items)
+    
+    return list(recommendations)[:10]
+
+
+def content_based_filtering_scan(user_history: List[Dict], all_content: List[Dict]) -> List[str]:
+    """Implementação original com busca linear e laços Python (referência)"""
+    user_tags = defaultdict(int)
+    user_difficulties = []
+    
+    for interaction in user_history:
+        content_id = interaction['content_id']
+        content = next((c for c in all_content if c['id'] == content_id), None)
+        
+        if content:
+            for tag in content.get('tags', []):
+                user_tags[tag] += interaction.get('rating', 3)
+            
+            user_difficulties.append(content.get('difficulty', 5))
+    
+    avg_difficulty = sum(user_difficulties) / len(user_difficulties) \
+                    if user_difficulties else 5
+    
+    scored_content = []
+    consumed_ids = {item['content_id'] for item in user_history}
+    
+    for content in all_content:
+        if content['id'] in consumed_ids:
+            continue
+        
+        score = 0
+        for tag in content.get('tags', []):
+            score += user_tags.get(tag, 0)
+        
+        difficulty_diff = abs(content.get('difficulty', 5) - avg_difficulty)
+        score -= difficulty_diff * 2
+        
+        scored_content.append((content['id'], score))
+    
+    scored_content.sort(key=lambda x: x[1], reverse=True)
+    
+    return [content_id for content_id, _ in scored_content[:10]]
+
+
+def sample_catalog(rng: random.Random, size: int, tags: int = 200) -> List[Dict]:
+    vocabulary = [f"tag{i}" for i in range(tags)]
+    return [
+        {
+            'id': f"c{i}",
+            'tags': rng.sample(vocabulary, rng.randint(1, 6)),
+            'difficulty': rng.randint(1, 10)
+        }
+        for i in range(size)
+    ]
+
+
+def sample_history(rng: random.Random, catalog: List[Dict], size: int) -> List[Dict]:
+    return [
+        {'content_id': content['id'], 'rating': rng.randint(1, 5)}
+        for content in rng.sample(catalog, size)
+    ]
+
+
+def parse_date_strptime(date_str: Optional[str]) -> Optional[str]:
+    """Implementação original com strptime em sequência (referência, sem datetime.now())"""
+    if not date_str:
+        return None
+    
+    for fmt in DateParser.STRPTIME_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).isoformat()
+        except ValueError:
+            continue
+    
+    return None
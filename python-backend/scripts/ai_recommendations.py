@@ -3,11 +3,624 @@ Sistema de Recomendações com IA
 Recomendações personalizadas de conteúdo e estudo
 """
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
+import heapq
+import json
 import math
+import multiprocessing
+import os
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from utils.helpers import chunk_list
+
+
+class UserItemIndex:
+    """Índice invertido item → usuários para filtragem colaborativa
+    
+    Guarda uma cópia das listas de itens; os dados de origem nunca são
+    alterados (add_interaction atualiza apenas o índice). source é a cópia
+    dos dados de origem usada para validar o reuso do índice.
+    """
+    
+    def __init__(self, all_users_interactions: Dict):
+        self.source = {user_id: list(items) for user_id, items in all_users_interactions.items()}
+        self.item_users = defaultdict(set)
+        self.user_items = {}
+        self.user_lists = {}
+        self.user_order = {}
+        
+        for user_id, items in all_users_interactions.items():
+            self._register_user(user_id)
+            self.user_lists[user_id].extend(items)
+            for item_id in items:
+                self._link(user_id, item_id)
+    
+    def _register_user(self, user_id: str):
+        if user_id not in self.user_items:
+            # A posição preserva a ordem de inserção para desempates
+            self.user_order[user_id] = len(self.user_order)
+            self.user_items[user_id] = set()
+            self.user_lists[user_id] = []
+    
+    def _link(self, user_id: str, item_id: str):
+        self.user_items[user_id].add(item_id)
+        self.item_users[item_id].add(user_id)
+    
+    def items_of(self, user_id: str) -> List[str]:
+        """Itens do usuário na ordem dos dados de origem"""
+        return self.user_lists.get(user_id, [])
+    
+    def add_interaction(self, user_id: str, item_id: str):
+        """Registra nova interação no índice"""
+        self._register_user(user_id)
+        self._link(user_id, item_id)
+        self.user_lists[user_id].append(item_id)
+    
+    def similar_users(
+        self,
+        user_id: str,
+        threshold: float = 0.3,
+        limit: int = 5
+    ) -> List[Tuple[str, float]]:
+        """Retorna os usuários mais similares (Jaccard) acima do threshold"""
+        user_items = self.user_items.get(user_id)
+        if not user_items:
+            return []
+        
+        # Apenas usuários com ao menos um item em comum são examinados
+        overlaps = defaultdict(int)
+        for item_id in user_items:
+            for other_user_id in self.item_users[item_id]:
+                if other_user_id != user_id:
+                    overlaps[other_user_id] += 1
+        
+        user_count = len(user_items)
+        candidates = []
+        for other_user_id, intersection in overlaps.items():
+            union = user_count + len(self.user_items[other_user_id]) - intersection
+            similarity = intersection / union
+            
+            if similarity > threshold:
+                candidates.append((other_user_id, similarity))
+        
+        return heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda x: (-x[1], self.user_order[x[0]])
+        )
+
+
+class ContentCatalog:
+    """Catálogo indexado: mapa id → conteúdo e matriz esparsa conteúdo × tag (CSR)"""
+    
+    DEFAULT_DIFFICULTY = 5
+    
+    def __init__(self, all_content: List[Dict]):
+        # Cópia rasa da lista de origem, usada para validar o reuso do catálogo
+        self.source = list(all_content)
+        self.content_ids = [content['id'] for content in all_content]
+        self.content_by_id = {}
+        self.positions_by_id = defaultdict(list)
+        self.tag_vocabulary = {}
+        
+        indptr = [0]
+        tag_indices = []
+        for position, content in enumerate(all_content):
+            # Ids duplicados: a busca retorna a primeira ocorrência
+            self.content_by_id.setdefault(content['id'], content)
+            self.positions_by_id[content['id']].append(position)
+            
+            for tag in content.get('tags', []):
+                tag_indices.append(
+                    self.tag_vocabulary.setdefault(tag, len(self.tag_vocabulary))
+                )
+            indptr.append(len(tag_indices))
+        
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.tag_indices = np.array(tag_indices, dtype=np.int32)
+        self.row_of_entry = np.repeat(
+            np.arange(len(all_content), dtype=np.int32), np.diff(self.indptr)
+        )
+        self.difficulties = np.array(
+            [content.get('difficulty', self.DEFAULT_DIFFICULTY) for content in all_content],
+            dtype=np.float64
+        )
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        content_ids: List[str],
+        tag_vocabulary: List[str],
+        indptr: np.ndarray,
+        tag_indices: np.ndarray,
+        row_of_entry: np.ndarray,
+        difficulties: np.ndarray
+    ) -> 'ContentCatalog':
+        """Reconstrói o catálogo a partir de arrays (ex.: snapshot em memory-map)
+        
+        Os metadados completos dos conteúdos não fazem parte dos arrays,
+        então content_by_id fica vazio.
+        """
+        catalog = cls.__new__(cls)
+        catalog.source = None
+        catalog.content_ids = content_ids
+        catalog.content_by_id = {}
+        catalog.positions_by_id = defaultdict(list)
+        for position, content_id in enumerate(content_ids):
+            catalog.positions_by_id[content_id].append(position)
+        catalog.tag_vocabulary = {tag: code for code, tag in enumerate(tag_vocabulary)}
+        catalog.indptr = indptr
+        catalog.tag_indices = tag_indices
+        catalog.row_of_entry = row_of_entry
+        catalog.difficulties = difficulties
+        return catalog
+    
+    def __len__(self) -> int:
+        return len(self.content_ids)
+    
+    def build_profile(self, user_history: List[Dict]) -> Tuple[np.ndarray, float, np.ndarray]:
+        """Retorna pesos por tag, dificuldade média e máscara de consumidos"""
+        profile, difficulty_sum, count, consumed = self.profile_components(user_history)
+        return profile, self.average_difficulty(difficulty_sum, count), consumed
+    
+    def average_difficulty(self, difficulty_sum: float, count: int) -> float:
+        """Dificuldade média preferida (padrão sem histórico)"""
+        return difficulty_sum / count if count else self.DEFAULT_DIFFICULTY
+    
+    def profile_components(
+        self,
+        user_history: List[Dict]
+    ) -> Tuple[np.ndarray, float, int, np.ndarray]:
+        """Retorna pesos por tag, soma e contagem de dificuldades e consumidos"""
+        rows = []
+        ratings = []
+        consumed = np.zeros(len(self), dtype=bool)
+        
+        for interaction in user_history:
+            positions = self.positions_by_id.get(interaction['content_id'])
+            if not positions:
+                continue
+            rows.append(positions[0])
+            ratings.append(interaction.get('rating', 3))
+            consumed[positions] = True
+        
+        rows = np.array(rows, dtype=np.int64)
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        
+        # Expande as linhas CSR do histórico: perfil = Xᵀ · ratings
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        entries = np.repeat(self.indptr[rows], lengths) + offsets
+        profile = np.bincount(
+            self.tag_indices[entries],
+            weights=np.repeat(np.array(ratings, dtype=np.float64), lengths),
+            minlength=len(self.tag_vocabulary)
+        )
+        
+        # Soma sequencial, como no acúmulo incremental de ingest()
+        difficulty_sum = sum(self.difficulties[rows].tolist())
+        
+        return profile, difficulty_sum, len(rows), consumed
+    
+    def score(self, profile: np.ndarray, avg_difficulty: float) -> np.ndarray:
+        """Pontua todo o catálogo: X · perfil menos penalidade de dificuldade"""
+        tag_scores = np.bincount(
+            self.row_of_entry,
+            weights=profile[self.tag_indices],
+            minlength=len(self)
+        )
+        return tag_scores - np.abs(self.difficulties - avg_difficulty) * 2
+    
+    @staticmethod
+    def top_k(scores: np.ndarray, candidates: np.ndarray, k: int = 10) -> np.ndarray:
+        """Seleciona as k maiores pontuações, desempatando pela ordem do catálogo"""
+        values = scores[candidates]
+        
+        if len(values) > k:
+            # Mantém todos os empatados com o k-ésimo valor antes da ordenação estável
+            kth_value = np.partition(values, len(values) - k)[len(values) - k]
+            keep = values >= kth_value
+            candidates = candidates[keep]
+            values = values[keep]
+        
+        order = np.argsort(-values, kind='stable')[:k]
+        return candidates[order]
+
+
+class UserProfileStore:
+    """Perfis de conteúdo dos usuários em arrays planos (CSR)
+    
+    Cada perfil guarda os pesos por tag (esparsos), a soma e a contagem das
+    dificuldades do histórico e as posições do catálogo já consumidas, como
+    produzidos por ContentCatalog.profile_components. Perfis atualizados
+    por ingest() ficam em overrides até a próxima compactação, em forma
+    esparsa (tag → peso e posições consumidas), então cada um ocupa memória
+    proporcional ao histórico do usuário, não ao tamanho do vocabulário.
+    """
+    
+    def __init__(
+        self,
+        user_ids: List[str],
+        n_tags: int,
+        n_content: int,
+        indptr: np.ndarray,
+        tags: np.ndarray,
+        weights: np.ndarray,
+        difficulty_sums: np.ndarray,
+        history_counts: np.ndarray,
+        consumed_indptr: np.ndarray,
+        consumed_positions: np.ndarray
+    ):
+        self.user_ids = user_ids
+        self.position_by_user = {user_id: code for code, user_id in enumerate(user_ids)}
+        self.n_tags = n_tags
+        self.n_content = n_content
+        self.indptr = indptr
+        self.tags = tags
+        self.weights = weights
+        self.difficulty_sums = difficulty_sums
+        self.history_counts = history_counts
+        self.consumed_indptr = consumed_indptr
+        self.consumed_positions = consumed_positions
+        self.overrides = {}
+    
+    @classmethod
+    def build(
+        cls,
+        catalog: ContentCatalog,
+        user_histories: Dict[str, List[Dict]]
+    ) -> 'UserProfileStore':
+        """Constrói os perfis de todos os usuários a partir dos históricos"""
+        return cls._from_components(
+            catalog,
+            list(user_histories),
+            (catalog.profile_components(history) for history in user_histories.values())
+        )
+    
+    @classmethod
+    def _from_components(
+        cls,
+        catalog: ContentCatalog,
+        user_ids: List[str],
+        components: Iterable[Tuple[np.ndarray, float, int, np.ndarray]]
+    ) -> 'UserProfileStore':
+        indptr = [0]
+        consumed_indptr = [0]
+        tags = []
+        weights = []
+        difficulty_sums = []
+        history_counts = []
+        consumed_positions = []
+        
+        for profile, difficulty_sum, count, consumed in components:
+            nonzero = np.flatnonzero(profile)
+            tags.append(nonzero)
+            weights.append(profile[nonzero])
+            indptr.append(indptr[-1] + len(nonzero))
+            difficulty_sums.append(difficulty_sum)
+            history_counts.append(count)
+            
+            positions = np.flatnonzero(consumed)
+            consumed_positions.append(positions)
+            consumed_indptr.append(consumed_indptr[-1] + len(positions))
+        
+        def concat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+        
+        return cls(
+            user_ids,
+            len(catalog.tag_vocabulary),
+            len(catalog),
+            np.array(indptr, dtype=np.int64),
+            concat(tags, np.int32),
+            concat(weights, np.float64),
+            np.array(difficulty_sums, dtype=np.float64),
+            np.array(history_counts, dtype=np.int64),
+            np.array(consumed_indptr, dtype=np.int64),
+            concat(consumed_positions, np.int32)
+        )
+    
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.overrides or user_id in self.position_by_user
+    
+    def __len__(self) -> int:
+        return len(self.position_by_user) + sum(
+            1 for user_id in self.overrides if user_id not in self.position_by_user
+        )
+    
+    def components(self, user_id: str) -> Tuple[np.ndarray, float, int, np.ndarray]:
+        """Retorna perfil denso, soma e contagem de dificuldades e máscara de consumidos"""
+        profile = np.zeros(self.n_tags)
+        consumed = np.zeros(self.n_content, dtype=bool)
+        
+        if user_id in self.overrides:
+            weights, difficulty_sum, count, positions = self.overrides[user_id]
+            profile[list(weights)] = list(weights.values())
+            consumed[list(positions)] = True
+            return profile, difficulty_sum, count, consumed
+        
+        code = self.position_by_user.get(user_id)
+        if code is None:
+            return profile, 0.0, 0, consumed
+        
+        start, stop = self.indptr[code], self.indptr[code + 1]
+        profile[self.tags[start:stop]] = self.weights[start:stop]
+        consumed[self.consumed_positions[
+            self.consumed_indptr[code]:self.consumed_indptr[code + 1]
+        ]] = True
+        
+        return (
+            profile,
+            float(self.difficulty_sums[code]),
+            int(self.history_counts[code]),
+            consumed
+        )
+    
+    def get(self, user_id: str) -> Tuple[np.ndarray, float, np.ndarray]:
+        """Retorna o perfil denso (pesos, dificuldade média, máscara de consumidos)"""
+        profile, difficulty_sum, count, consumed = self.components(user_id)
+        average = difficulty_sum / count if count else ContentCatalog.DEFAULT_DIFFICULTY
+        return profile, average, consumed
+    
+    def add_interaction(
+        self,
+        catalog: ContentCatalog,
+        user_id: str,
+        content_id: str,
+        rating: float = 3
+    ) -> bool:
+        """Atualiza o perfil com uma nova interação; False se o conteúdo é desconhecido"""
+        positions = catalog.positions_by_id.get(content_id)
+        if not positions:
+            return False
+        
+        override = self.overrides.get(user_id)
+        if override is None:
+            override = self.overrides[user_id] = self._sparse_components(user_id)
+        
+        weights = override[0]
+        start, stop = catalog.indptr[positions[0]], catalog.indptr[positions[0] + 1]
+        for tag in catalog.tag_indices[start:stop].tolist():
+            weights[tag] = weights.get(tag, 0.0) + rating
+        override[1] += float(catalog.difficulties[positions[0]])
+        override[2] += 1
+        override[3].update(positions)
+        return True
+    
+    def _sparse_components(self, user_id: str) -> list:
+        """Perfil guardado como [tag → peso, soma, contagem, posições consumidas]"""
+        code = self.position_by_user.get(user_id)
+        if code is None:
+            return [{}, 0.0, 0, set()]
+        
+        start, stop = self.indptr[code], self.indptr[code + 1]
+        consumed = self.consumed_positions[self.consumed_indptr[code]:self.consumed_indptr[code + 1]]
+        return [
+            dict(zip(self.tags[start:stop].tolist(), self.weights[start:stop].tolist())),
+            float(self.difficulty_sums[code]),
+            int(self.history_counts[code]),
+            set(consumed.tolist())
+        ]
+    
+    def compacted(self, catalog: ContentCatalog) -> 'UserProfileStore':
+        """Retorna um novo store com os overrides incorporados aos arrays"""
+        user_ids = list(self.user_ids) + [
+            user_id for user_id in self.overrides if user_id not in self.position_by_user
+        ]
+        return self._from_components(
+            catalog,
+            user_ids,
+            (self.components(user_id) for user_id in user_ids)
+        )
+
+
+class ItemNeighbourTable:
+    """Tabela pré-calculada dos k conteúdos mais similares a cada conteúdo
+    
+    Usa a mesma ponderação de calculate_content_similarity (0.7 Jaccard de
+    tags + 0.3 similaridade de dificuldade). É salva como arrays .npy
+    planos que podem ser abertos com memory-map somente leitura.
+    """
+    
+    NEIGHBOURS_FILE = 'neighbours.npy'
+    SCORES_FILE = 'scores.npy'
+    IDS_FILE = 'content_ids.json'
+    
+    def __init__(self, content_ids: List[str], neighbours: np.ndarray, scores: np.ndarray):
+        self.content_ids = content_ids
+        self.neighbours = neighbours
+        self.scores = scores
+        self.position_by_id = {}
+        for position, content_id in enumerate(content_ids):
+            self.position_by_id.setdefault(content_id, position)
+    
+    def neighbours_of(self, content_id: str) -> List[Tuple[str, float]]:
+        """Retorna (content_id, similaridade) dos vizinhos mais similares"""
+        position = self.position_by_id.get(content_id)
+        if position is None:
+            return []
+        
+        return [
+            (self.content_ids[neighbour], float(score))
+            for neighbour, score in zip(self.neighbours[position], self.scores[position])
+            if neighbour >= 0
+        ]
+    
+    def save(self, directory: str):
+        """Salva a tabela em um diretório"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, self.NEIGHBOURS_FILE), self.neighbours)
+        np.save(os.path.join(directory, self.SCORES_FILE), self.scores)
+        with open(os.path.join(directory, self.IDS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.content_ids, f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'ItemNeighbourTable':
+        """Carrega a tabela, por padrão via memory-map somente leitura"""
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(directory, cls.IDS_FILE), 'r', encoding='utf-8') as f:
+            content_ids = json.load(f)
+        
+        return cls(
+            content_ids,
+            np.load(os.path.join(directory, cls.NEIGHBOURS_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, cls.SCORES_FILE), mmap_mode=mmap_mode)
+        )
+    
+    @classmethod
+    def build(
+        cls,
+        catalog: ContentCatalog,
+        k: int = 10,
+        block_size: int = 256,
+        max_tag_items: Optional[int] = 5000
+    ) -> 'ItemNeighbourTable':
+        """Calcula os top-k vizinhos de todo o catálogo em blocos esparsos
+        
+        Pares que compartilham tags são obtidos pelo produto esparso do
+        bloco com o índice tag → conteúdos. Conteúdos sem tags em comum
+        (Jaccard 0) só competem pela dificuldade e são completados a partir
+        de grupos ordenados por dificuldade quando podem entrar no top-k.
+        
+        A expansão cresce com o quadrado da popularidade de cada tag: tags
+        presentes em mais de max_tag_items conteúdos não distinguem
+        conteúdos e são ignoradas no Jaccard, como stop-words (None calcula
+        com todas as tags).
+        """
+        n_content = len(catalog)
+        n_tags = len(catalog.tag_vocabulary)
+        difficulties = catalog.difficulties
+        
+        # Tags distintas por conteúdo (Jaccard usa conjuntos)
+        keys = np.unique(catalog.row_of_entry.astype(np.int64) * n_tags + catalog.tag_indices)
+        rows = keys // max(n_tags, 1)
+        tags = keys % max(n_tags, 1)
+        if max_tag_items is not None:
+            common = np.bincount(tags, minlength=n_tags) > max_tag_items
+            rows = rows[~common[tags]]
+            tags = tags[~common[tags]]
+        sizes = np.bincount(rows, minlength=n_content)
+        row_indptr = np.concatenate(([0], np.cumsum(sizes)))
+        
+        # Índice invertido tag → conteúdos (ordenados por posição)
+        by_tag = np.argsort(tags, kind='stable')
+        tag_items = rows[by_tag]
+        tag_indptr = np.concatenate(([0], np.cumsum(np.bincount(tags, minlength=n_tags))))
+        
+        # Grupos de dificuldade dos conteúdos com tags, para o preenchimento
+        tagged = np.flatnonzero(sizes > 0)
+        level_values, level_of = np.unique(difficulties[tagged], return_inverse=True)
+        levels = [tagged[level_of == level] for level in range(len(level_values))]
+        
+        neighbours = np.full((n_content, k), -1, dtype=np.int32)
+        scores = np.zeros((n_content, k), dtype=np.float64)
+        
+        for start in range(0, n_content, block_size):
+            stop = min(start + block_size, n_content)
+            
+            # Expande as listas de postings das tags de cada linha do bloco
+            block_tags = tags[row_indptr[start]:row_indptr[stop]]
+            block_rows = rows[row_indptr[start]:row_indptr[stop]]
+            lengths = tag_indptr[block_tags + 1] - tag_indptr[block_tags]
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            items = tag_items[np.repeat(tag_indptr[block_tags], lengths) + offsets]
+            pair_keys = np.repeat(block_rows - start, lengths) * n_content + items
+            
+            pairs, intersections = np.unique(pair_keys, return_counts=True)
+            pair_rows = pairs // n_content + start
+            pair_items = pairs % n_content
+            
+            union = sizes[pair_rows] + sizes[pair_items] - intersections
+            similarity = (
+                (intersections / union) * 0.7
+                + (1 - np.abs(difficulties[pair_rows] - difficulties[pair_items]) / 10) * 0.3
+            )
+            similarity[pair_rows == pair_items] = -1
+            
+            row_bounds = np.searchsorted(pair_rows, np.arange(start, stop + 1))
+            
+            for row in range(start, stop):
+                if sizes[row] == 0:
+                    continue
+                
+                lo, hi = row_bounds[row - start], row_bounds[row - start + 1]
+                cls._select_row(
+                    row, pair_items[lo:hi], similarity[lo:hi], neighbours, scores,
+                    difficulties, levels, level_values, k
+                )
+        
+        return cls(list(catalog.content_ids), neighbours, scores)
+    
+    @classmethod
+    def _select_row(
+        cls,
+        row: int,
+        candidates: np.ndarray,
+        values: np.ndarray,
+        neighbours: np.ndarray,
+        scores: np.ndarray,
+        difficulties: np.ndarray,
+        levels: List[np.ndarray],
+        level_values: np.ndarray,
+        k: int
+    ):
+        """Seleciona os top-k vizinhos de uma linha e grava na tabela"""
+        best = ContentCatalog.top_k(values, np.arange(len(values)), k)
+        items = list(candidates[best])
+        item_values = list(values[best])
+        
+        # Sem tags em comum a similaridade máxima é 0.3 (mesma dificuldade)
+        if len(items) < k or item_values[-1] <= 0.3:
+            fill_items, fill_values = cls._difficulty_fill(
+                row, difficulties[row], set(candidates), levels, level_values, k
+            )
+            items += fill_items
+            item_values += fill_values
+            merged = np.lexsort((items, -np.array(item_values)))[:k]
+            items = [items[i] for i in merged]
+            item_values = [item_values[i] for i in merged]
+        
+        column = 0
+        for item, value in zip(items, item_values):
+            if value > 0:
+                neighbours[row, column] = item
+                scores[row, column] = round(value, 3)
+                column += 1
+    
+    @staticmethod
+    def _difficulty_fill(
+        row: int,
+        difficulty: float,
+        excluded: set,
+        levels: List[np.ndarray],
+        level_values: np.ndarray,
+        k: int
+    ) -> Tuple[List[int], List[float]]:
+        """Melhores conteúdos sem tags em comum, por proximidade de dificuldade"""
+        distances = np.abs(level_values - difficulty)
+        items = []
+        values = []
+        
+        for distance in np.unique(distances):
+            # Níveis equidistantes empatam: percorre-os em ordem de posição
+            level_items = np.sort(np.concatenate(
+                [levels[level] for level in np.flatnonzero(distances == distance)]
+            ))
+            # Sem tags em comum o termo de Jaccard (peso 0.7) é zero: sobra
+            # apenas a similaridade de dificuldade
+            value = (1 - distance / 10) * 0.3
+            
+            for item in level_items:
+                if item != row and item not in excluded:
+                    items.append(int(item))
+                    values.append(float(value))
+                    if len(items) >= k:
+                        return items, values
+        
+        return items, values
+
 
 class ContentRecommendationEngine:
     """Motor de recomendação de conteúdo educacional"""
@@ -16,6 +629,197 @@ class ContentRecommendationEngine:
         self.user_profiles = {}
         self.content_metadata = {}
         self.interaction_history = []
+        # Início, em interaction_history, dos eventos ausentes dos dados de origem
+        self._ingested_offset = 0
+        self.user_item_index = None
+        self.content_catalog = None
+        self.version = 0
+        self._recommendation_cache = {}
+    
+    def _invalidate_all(self):
+        """Novas estruturas: descarta o cache e avança a versão"""
+        self._recommendation_cache.clear()
+        self.version += 1
+    
+    def invalidate(self):
+        """Desassocia índice e catálogo dos dados de origem
+        
+        A próxima chamada que receber dados reconstrói as estruturas; use
+        após alterar conteúdos ou interações no lugar.
+        """
+        for structure in (self.user_item_index, self.content_catalog):
+            if structure is not None:
+                structure.source = None
+        self._recommendation_cache.clear()
+    
+    def build_user_index(self, all_users_interactions: Dict) -> UserItemIndex:
+        """Constrói e guarda o índice invertido de interações
+        
+        Os dados passam a ser a origem completa: eventos ingeridos antes
+        desta chamada não são reaplicados em reconstruções posteriores.
+        """
+        self._ingested_offset = len(self.interaction_history)
+        return self._rebuild_user_index(all_users_interactions)
+    
+    def _rebuild_user_index(self, all_users_interactions: Dict) -> UserItemIndex:
+        """Refaz o índice e reaplica os eventos ingeridos desde o último build"""
+        index = UserItemIndex(all_users_interactions)
+        for event in self.interaction_history[self._ingested_offset:]:
+            index.add_interaction(event['user_id'], event['content_id'])
+        self.user_item_index = index
+        self._invalidate_all()
+        return index
+    
+    def _user_index_for(self, all_users_interactions: Optional[Dict]) -> UserItemIndex:
+        """Reaproveita o índice se foi construído a partir dos mesmos dados
+        
+        Os dados são comparados com a cópia guardada no índice (comparação
+        de dicts e listas, em C), então usuários novos e listas alteradas
+        no lugar também refazem o índice; eventos ingeridos são reaplicados
+        sobre o novo índice. Sem dados (None) usa o índice já carregado,
+        ex.: de um snapshot.
+        """
+        index = self.user_item_index
+        if all_users_interactions is None:
+            if index is None:
+                raise ValueError("Nenhum índice de interações construído ou carregado")
+            return index
+        if index is None or index.source is None or index.source != all_users_interactions:
+            index = self._rebuild_user_index(all_users_interactions)
+        return index
+    
+    def build_content_catalog(self, all_content: List[Dict]) -> ContentCatalog:
+        """Constrói e guarda o catálogo indexado de conteúdos"""
+        self.content_catalog = ContentCatalog(all_content)
+        self.content_metadata = self.content_catalog.content_by_id
+        self._invalidate_all()
+        return self.content_catalog
+    
+    def _catalog_for(self, all_content: Optional[List[Dict]]) -> ContentCatalog:
+        """Reaproveita o catálogo se foi construído a partir dos mesmos dados
+        
+        A lista é comparada com a cópia guardada no catálogo; como os
+        conteúdos são os mesmos objetos, a comparação é por identidade e
+        feita em C. Conteúdos (dicts) alterados no lugar não são detectados:
+        chame invalidate ou build_content_catalog. Sem dados (None) usa o
+        catálogo já carregado, ex.: de um snapshot.
+        """
+        catalog = self.content_catalog
+        if all_content is None:
+            if catalog is None:
+                raise ValueError("Nenhum catálogo de conteúdos construído ou carregado")
+            return catalog
+        if catalog is None or catalog.source is None or catalog.source != all_content:
+            catalog = self.build_content_catalog(all_content)
+        return catalog
+    
+    def build_user_profiles(
+        self,
+        user_histories: Dict[str, List[Dict]],
+        all_content: Optional[List[Dict]] = None
+    ) -> UserProfileStore:
+        """Constrói e guarda os perfis de conteúdo de todos os usuários"""
+        self.user_profiles = UserProfileStore.build(self._catalog_for(all_content), user_histories)
+        self._invalidate_all()
+        return self.user_profiles
+    
+    def _profile_for(
+        self,
+        user_id: str,
+        user_history: Optional[List[Dict]],
+        catalog: ContentCatalog
+    ) -> Tuple[np.ndarray, float, np.ndarray]:
+        """Perfil a partir do histórico ou, sem histórico (None), dos perfis guardados"""
+        if user_history is None:
+            if not isinstance(self.user_profiles, UserProfileStore):
+                raise ValueError("Nenhum perfil de usuário construído ou carregado")
+            return self.user_profiles.get(user_id)
+        return catalog.build_profile(user_history)
+    
+    def ingest(self, events: Iterable[Dict]) -> int:
+        """Incorpora novas interações de forma incremental
+        
+        Cada evento é um dict com user_id, content_id e, opcionalmente,
+        rating (padrão 3, como no histórico). Atualiza interaction_history,
+        o índice item → usuários, o perfil do usuário (pesos por tag e
+        dificuldade média) e invalida as recomendações em cache afetadas.
+        Os eventos não alteram os dados de origem; ficam registrados em
+        interaction_history e são reaplicados quando o índice é refeito.
+        Retorna a nova versão do motor.
+        """
+        index = self.user_item_index
+        if index is None:
+            index = self.user_item_index = UserItemIndex({})
+        elif not isinstance(index, UserItemIndex):
+            # Snapshots são somente leitura: materializa uma cópia mutável
+            index = self.user_item_index = index.thaw()
+        
+        catalog = self.content_catalog
+        if catalog is not None and not isinstance(self.user_profiles, UserProfileStore):
+            self.user_profiles = UserProfileStore.build(catalog, {})
+        
+        ingested = False
+        for event in events:
+            user_id = event['user_id']
+            content_id = event['content_id']
+            
+            self.interaction_history.append(event)
+            index.add_interaction(user_id, content_id)
+            if catalog is not None:
+                self.user_profiles.add_interaction(
+                    catalog, user_id, content_id, event.get('rating', 3)
+                )
+            self._invalidate_recommendations(user_id)
+            ingested = True
+        
+        if ingested:
+            self.version += 1
+        return self.version
+    
+    def _invalidate_recommendations(self, user_id: str):
+        """Descarta do cache o usuário e quem compartilha itens com ele"""
+        cache = self._recommendation_cache
+        if not cache:
+            return
+        
+        cache.pop(user_id, None)
+        
+        # Só quem tem itens em comum pode ter a similaridade com user_id alterada
+        index = self.user_item_index
+        for item_id in index.user_items.get(user_id, ()):
+            for other_user_id in index.item_users[item_id]:
+                cache.pop(other_user_id, None)
+    
+    def recommend(self, user_id: str) -> List[Tuple[str, float]]:
+        """Recomendação híbrida com cache, sobre as estruturas do motor"""
+        recommendations = self._recommendation_cache.get(user_id)
+        if recommendations is None:
+            recommendations = self.hybrid_recommendation(user_id, None, None, None)
+            self._recommendation_cache[user_id] = recommendations
+        return recommendations
+    
+    def save_snapshot(self, directory: str):
+        """Salva as estruturas derivadas em arrays planos (ver recommendation_snapshot)"""
+        from scripts.recommendation_snapshot import save_engine_snapshot
+        save_engine_snapshot(self, directory)
+    
+    @classmethod
+    def load_snapshot(cls, directory: str, mmap: bool = True) -> 'ContentRecommendationEngine':
+        """Carrega um snapshot, por padrão em memory-map somente leitura"""
+        from scripts.recommendation_snapshot import load_engine_snapshot
+        return load_engine_snapshot(directory, mmap)
+    
+    def precompute_similar_content(
+        self,
+        all_content: List[Dict],
+        k: int = 10,
+        block_size: int = 256,
+        max_tag_items: Optional[int] = 5000
+    ) -> ItemNeighbourTable:
+        """Pré-calcula a tabela de conteúdos relacionados"""
+        return ItemNeighbourTable.build(
+            self._catalog_for(all_content), k, block_size, max_tag_items
+        )
     
     def calculate_content_similarity(
         self, 
@@ -49,34 +853,18 @@ class ContentRecommendationEngine:
     def collaborative_filtering(
         self, 
         user_id: str, 
-        all_users_interactions: Dict
+        all_users_interactions: Optional[Dict]
     ) -> List[str]:
         """Filtragem colaborativa para recomendações"""
-        user_items = set(all_users_interactions.get(user_id, []))
-        
-        # Encontra usuários similares
-        similar_users = []
-        for other_user_id, other_items in all_users_interactions.items():
-            if other_user_id == user_id:
-                continue
-            
-            other_items_set = set(other_items)
-            
-            # Calcula similaridade usando Jaccard
-            if user_items:
-                similarity = len(user_items.intersection(other_items_set)) / \
-                           len(user_items.union(other_items_set))
-                
-                if similarity > 0.3:  # Threshold de similaridade
-                    similar_users.append((other_user_id, similarity))
-        
-        # Ordena por similaridade
-        similar_users.sort(key=lambda x: x[1], reverse=True)
+        # Encontra usuários similares via índice invertido, já ordenados
+        index = self._user_index_for(all_users_interactions)
+        user_items = set(index.items_of(user_id))
+        similar_users = index.similar_users(user_id)
         
         # Recomenda itens que usuários similares consumiram
         recommendations = set()
-        for similar_user_id, _ in similar_users[:5]:  # Top 5 similares
-            similar_user_items = set(all_users_interactions[similar_user_id])
+        for similar_user_id, _ in similar_users:  # Top 5 similares
+            similar_user_items = set(index.items_of(similar_user_id))
             new_items = similar_user_items - user_items
             recommendations.update(new_items)
         
@@ -85,67 +873,34 @@ class ContentRecommendationEngine:
     def content_based_filtering(
         self, 
         user_id: str, 
-        user_history: List[Dict],
-        all_content: List[Dict]
+        user_history: Optional[List[Dict]],
+        all_content: Optional[List[Dict]]
     ) -> List[str]:
         """Filtragem baseada em conteúdo"""
-        # Constrói perfil do usuário baseado em histórico
-        user_tags = defaultdict(int)
-        user_difficulties = []
+        catalog = self._catalog_for(all_content)
         
-        for interaction in user_history:
-            content_id = interaction['content_id']
-            
-            # Busca metadados do conteúdo
-            content = next(
-                (c for c in all_content if c['id'] == content_id), 
-                None
-            )
-            
-            if content:
-                for tag in content.get('tags', []):
-                    user_tags[tag] += interaction.get('rating', 3)
-                
-                user_difficulties.append(content.get('difficulty', 5))
-        
-        # Calcula dificuldade média preferida
-        avg_difficulty = sum(user_difficulties) / len(user_difficulties) \
-                        if user_difficulties else 5
-        
-        # Pontua todos os conteúdos
-        scored_content = []
-        consumed_ids = {item['content_id'] for item in user_history}
-        
-        for content in all_content:
-            if content['id'] in consumed_ids:
-                continue
-            
-            score = 0
-            
-            # Pontuação por tags
-            for tag in content.get('tags', []):
-                score += user_tags.get(tag, 0)
-            
-            # Penaliza se a dificuldade é muito diferente
-            difficulty_diff = abs(content.get('difficulty', 5) - avg_difficulty)
-            score -= difficulty_diff * 2
-            
-            scored_content.append((content['id'], score))
+        # Constrói perfil do usuário baseado em histórico
+        profile, avg_difficulty, consumed = self._profile_for(user_id, user_history, catalog)
         
-        # Ordena por pontuação
-        scored_content.sort(key=lambda x: x[1], reverse=True)
+        # Pontua todos os conteúdos e seleciona os 10 melhores não consumidos
+        scores = catalog.score(profile, avg_difficulty)
+        top = catalog.top_k(scores, np.flatnonzero(~consumed), 10)
         
-        return [content_id for content_id, _ in scored_content[:10]]
+        return [catalog.content_ids[position] for position in top]
     
     def hybrid_recommendation(
         self,
         user_id: str,
-        user_history: List[Dict],
-        all_users_interactions: Dict,
-        all_content: List[Dict],
+        user_history: Optional[List[Dict]],
+        all_users_interactions: Optional[Dict],
+        all_content: Optional[List[Dict]],
         weights: Dict = None
     ) -> List[Tuple[str, float]]:
-        """Sistema híbrido de recomendação"""
+        """Sistema híbrido de recomendação
+        
+        Argumentos None usam as estruturas já construídas ou carregadas de
+        um snapshot (perfis, índice de interações e catálogo).
+        """
         if weights is None:
             weights = {'collaborative': 0.4, 'content': 0.6}
         
@@ -159,7 +914,15 @@ class ContentRecommendationEngine:
             self.content_based_filtering(user_id, user_history, all_content)
         )
         
-        # Combina recomendações
+        return self._combine_recommendations(collab_recs, content_recs, weights)
+    
+    @staticmethod
+    def _combine_recommendations(
+        collab_recs: set,
+        content_recs: set,
+        weights: Dict
+    ) -> List[Tuple[str, float]]:
+        """Combina as recomendações colaborativas e por conteúdo"""
         all_recs = collab_recs.union(content_recs)
         
         # Calcula pontuação final
@@ -179,6 +942,363 @@ class ContentRecommendationEngine:
         final_scores.sort(key=lambda x: x[1], reverse=True)
         
         return final_scores[:10]
+    
+    def recommend_many(
+        self,
+        user_ids: Iterable[str],
+        user_histories: Optional[Dict[str, List[Dict]]],
+        all_users_interactions: Optional[Dict],
+        all_content: Optional[List[Dict]],
+        weights: Dict = None,
+        block_size: int = 128,
+        processes: Optional[int] = None
+    ) -> Iterator[Tuple[str, List[Tuple[str, float]]]]:
+        """Recomendação híbrida em lote, produzida em streaming por usuário
+        
+        O índice de interações e o catálogo são construídos uma única vez e
+        os usuários são pontuados em blocos de block_size. Com processes > 1
+        os blocos são distribuídos em um pool de processos (fork). Os
+        resultados são idênticos a chamadas individuais de
+        hybrid_recommendation.
+        """
+        if weights is None:
+            weights = {'collaborative': 0.4, 'content': 0.6}
+        
+        self._user_index_for(all_users_interactions)
+        self._catalog_for(all_content)
+        
+        blocks = chunk_list(list(user_ids), block_size)
+        
+        # fork mantém a mesma semente de hash, preservando a ordem dos sets
+        if processes and processes > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            with context.Pool(
+                processes,
+                initializer=_init_batch_worker,
+                initargs=(self, user_histories, weights)
+            ) as pool:
+                for results in pool.imap(_recommend_block_worker, blocks):
+                    yield from results
+            return
+        
+        for block in blocks:
+            yield from self._recommend_block(block, user_histories, weights)
+    
+    def _recommend_block(
+        self,
+        block: List[str],
+        user_histories: Optional[Dict[str, List[Dict]]],
+        weights: Dict
+    ) -> List[Tuple[str, List[Tuple[str, float]]]]:
+        """Pontua um bloco de usuários com as estruturas compartilhadas"""
+        catalog = self.content_catalog
+        
+        results = []
+        for user_id in block:
+            user_history = None if user_histories is None else user_histories.get(user_id, [])
+            profile, avg_difficulty, consumed = self._profile_for(user_id, user_history, catalog)
+            scores = catalog.score(profile, avg_difficulty)
+            top = catalog.top_k(scores, np.flatnonzero(~consumed), 10)
+            
+            content_recs = {catalog.content_ids[position] for position in top}
+            # O índice já foi validado por recommend_many para o lote inteiro
+            collab_recs = set(self.collaborative_filtering(user_id, None))
+            results.append(
+                (user_id, self._combine_recommendations(collab_recs, content_recs, weights))
+            )
+        
+        return results
+
+
+_batch_state = None
+
+
+def _init_batch_worker(
+    engine: ContentRecommendationEngine,
+    user_histories: Dict[str, List[Dict]],
+    weights: Dict
+):
+    """Inicializa o estado compartilhado de um processo do pool"""
+    global _batch_state
+    _batch_state = (engine, user_histories, weights)
+
+
+def _recommend_block_worker(block: List[str]) -> List[Tuple[str, List[Tuple[str, float]]]]:
+    """Executa um bloco de recomendações em um processo do pool"""
+    engine, user_histories, weights = _batch_state
+    return engine._recommend_block(block, user_histories, weights)
+
+
+class PrerequisiteCycleError(ValueError):
+    """Ciclo no mapa de pré-requisitos"""
+    
+    def __init__(self, cycle: List[str]):
+        super().__init__("Ciclo de pré-requisitos: " + " -> ".join(cycle + cycle[:1]))
+        self.cycle = cycle
+
+
+class PrerequisiteGraph:
+    """Grafo de pré-requisitos construído uma vez a partir de prerequisites_map
+    
+    Todos os percursos são iterativos. Os ciclos (componentes fortemente
+    conexas) são detectados na construção. O fecho transitivo de cada
+    conteúdo (bitset em um int) é calculado sob demanda e reaproveitado
+    pelas consultas seguintes. As cadeias não ficam em cache (guardá-las
+    para cada nó intermediário custaria memória quadrática na profundidade):
+    chain refaz a busca em profundidade de calculate_prerequisite_chain.
+    As trilhas (study_path) não percorrem o grafo: filtram pelo fecho uma
+    pós-ordem global, calculada uma vez por grafo.
+    """
+    
+    def __init__(self, prerequisites_map: Dict[str, List[str]]):
+        self.content_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        
+        for content_id, prereqs in prerequisites_map.items():
+            self._node(content_id)
+            for prereq in prereqs:
+                self._node(prereq)
+        
+        self._prereqs: List[List[int]] = [[] for _ in self.content_ids]
+        for content_id, prereqs in prerequisites_map.items():
+            self._prereqs[self._index[content_id]] = [self._index[prereq] for prereq in prereqs]
+        
+        self._cycle_components = self._strongly_connected_cycles()
+        self._component_of = {
+            node: component
+            for component in self._cycle_components
+            for node in component
+        }
+        
+        self._closures: Dict[int, int] = {}
+        self._order: Optional[np.ndarray] = None
+    
+    def _node(self, content_id: str) -> int:
+        index = self._index.get(content_id)
+        if index is None:
+            index = self._index[content_id] = len(self.content_ids)
+            self.content_ids.append(content_id)
+        return index
+    
+    def _strongly_connected_cycles(self) -> List[List[int]]:
+        """Componentes com ciclo (Tarjan iterativo)"""
+        n = len(self.content_ids)
+        order = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        components = []
+        counter = 0
+        
+        for root in range(n):
+            if order[root] != -1:
+                continue
+            
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(self._prereqs[root]))]
+            
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if order[child] == -1:
+                        order[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, iter(self._prereqs[child])))
+                        break
+                    if on_stack[child]:
+                        low[node] = min(low[node], order[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    
+                    if low[node] == order[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self._prereqs[node]:
+                            components.append(sorted(component))
+        
+        components.sort()
+        return components
+    
+    @property
+    def cycles(self) -> List[List[str]]:
+        """Grupos de conteúdos que dependem uns dos outros em ciclo"""
+        return [[self.content_ids[node] for node in component] for component in self._cycle_components]
+    
+    def _cycle_error(self, node: int) -> PrerequisiteCycleError:
+        """Erro com um ciclo concreto dentro da componente de node"""
+        component = set(self._component_of[node])
+        path = [node]
+        position = {node: 0}
+        while True:
+            current = next(p for p in self._prereqs[path[-1]] if p in component)
+            if current in position:
+                cycle = path[position[current]:]
+                return PrerequisiteCycleError([self.content_ids[member] for member in cycle])
+            position[current] = len(path)
+            path.append(current)
+    
+    def topological_order(self) -> List[str]:
+        """Todos os conteúdos, pré-requisitos antes dos dependentes (Kahn)"""
+        if self._cycle_components:
+            raise self._cycle_error(self._cycle_components[0][0])
+        
+        n = len(self.content_ids)
+        dependents = [[] for _ in range(n)]
+        pending = [0] * n
+        for node, prereqs in enumerate(self._prereqs):
+            for prereq in set(prereqs):
+                dependents[prereq].append(node)
+            pending[node] = len(set(prereqs))
+        
+        ready = [node for node in range(n) if not pending[node]]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(self.content_ids[node])
+            for dependent in dependents[node]:
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    heapq.heappush(ready, dependent)
+        return order
+    
+    def _ensure(self, root: int):
+        """Calcula o fecho de root e de seus pré-requisitos, em pós-ordem"""
+        if root in self._closures:
+            return
+        
+        stack = [(root, 0)]
+        while stack:
+            node, position = stack[-1]
+            if node in self._component_of:
+                raise self._cycle_error(node)
+            
+            prereqs = self._prereqs[node]
+            while position < len(prereqs) and prereqs[position] in self._closures:
+                position += 1
+            
+            if position < len(prereqs):
+                stack[-1] = (node, position + 1)
+                stack.append((prereqs[position], 0))
+            else:
+                stack.pop()
+                closure = 1 << node
+                for prereq in prereqs:
+                    closure |= self._closures[prereq]
+                self._closures[node] = closure
+    
+    def _walk(self, root: int) -> List[int]:
+        """Cadeia de root em pós-ordem (mesma ordem da DFS recursiva)"""
+        chain = []
+        visited = {root}
+        stack = [iter(self._prereqs[root])]
+        path = [root]
+        while stack:
+            for prereq in stack[-1]:
+                if prereq not in visited:
+                    visited.add(prereq)
+                    path.append(prereq)
+                    stack.append(iter(self._prereqs[prereq]))
+                    break
+            else:
+                stack.pop()
+                chain.append(path.pop())
+        return chain
+    
+    def _global_order(self) -> np.ndarray:
+        """Pós-ordem de todo o grafo: pré-requisitos antes dos dependentes"""
+        if self._order is None:
+            n = len(self.content_ids)
+            order = []
+            visited = bytearray(n)
+            for root in range(n):
+                if visited[root]:
+                    continue
+                visited[root] = 1
+                stack = [iter(self._prereqs[root])]
+                path = [root]
+                while stack:
+                    for prereq in stack[-1]:
+                        if not visited[prereq]:
+                            visited[prereq] = 1
+                            path.append(prereq)
+                            stack.append(iter(self._prereqs[prereq]))
+                            break
+                    else:
+                        stack.pop()
+                        order.append(path.pop())
+            self._order = np.array(order, dtype=np.int64)
+        return self._order
+    
+    def _ordered_members(self, bits: int) -> List[int]:
+        """Conteúdos do bitset na ordem global"""
+        n = len(self.content_ids)
+        packed = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+        mask = np.unpackbits(packed, bitorder='little')[:n].astype(bool)
+        order = self._global_order()
+        return order[mask[order]].tolist()
+    
+    def chain(self, content_id: str) -> List[str]:
+        """Cadeia de pré-requisitos de content_id, terminando nele"""
+        node = self._index.get(content_id)
+        if node is None:
+            return [content_id]
+        
+        self._ensure(node)
+        return [self.content_ids[member] for member in self._walk(node)]
+    
+    def chains(self, content_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Cadeias de vários conteúdos em uma consulta"""
+        return {content_id: self.chain(content_id) for content_id in content_ids}
+    
+    def study_path(self, content_ids: Iterable[str]) -> List[str]:
+        """Cadeia combinada de vários alvos, na ordem dada e sem repetições
+        
+        O que cada alvo acrescenta vem da pós-ordem global filtrada pelo
+        fecho, então pré-requisitos continuam antes dos dependentes, mas
+        irmãos podem sair em ordem diferente da de chain.
+        """
+        path = []
+        seen = set()  # ids desconhecidos; os do grafo ficam no bitset closure
+        closure = 0
+        for content_id in content_ids:
+            node = self._index.get(content_id)
+            if node is None:
+                if content_id not in seen:
+                    seen.add(content_id)
+                    path.append(content_id)
+                continue
+            
+            self._ensure(node)
+            if not self._closures[node] & ~closure:
+                continue
+            members = self._ordered_members(self._closures[node] & ~closure)
+            path.extend(self.content_ids[member] for member in members)
+            closure |= self._closures[node]
+        return path
+    
+    def depends_on(self, content_id: str, prerequisite_id: str) -> bool:
+        """Indica se prerequisite_id está na cadeia de content_id"""
+        node = self._index.get(content_id)
+        prereq = self._index.get(prerequisite_id)
+        if node is None or prereq is None:
+            return content_id == prerequisite_id
+        
+        self._ensure(node)
+        return bool(self._closures[node] >> prereq & 1)
 
 
 class StudyPathOptimizer:
@@ -193,21 +1313,41 @@ class StudyPathOptimizer:
         chain = []
         visited = set()
         
-        def dfs(current_id: str):
-            if current_id in visited:
-                return
-            
-            visited.add(current_id)
-            
-            prereqs = prerequisites_map.get(current_id, [])
-            for prereq in prereqs:
-                dfs(prereq)
-            
-            chain.append(current_id)
+        # Busca em profundidade iterativa; um pré-requisito ainda na pilha é um ciclo
+        visited.add(content_id)
+        path = [content_id]
+        on_path = {content_id}
+        stack = [iter(prerequisites_map.get(content_id, []))]
+        
+        while stack:
+            for prereq in stack[-1]:
+                if prereq not in visited:
+                    visited.add(prereq)
+                    path.append(prereq)
+                    on_path.add(prereq)
+                    stack.append(iter(prerequisites_map.get(prereq, [])))
+                    break
+                if prereq in on_path:
+                    raise PrerequisiteCycleError(path[path.index(prereq):])
+            else:
+                stack.pop()
+                on_path.discard(path[-1])
+                chain.append(path.pop())
         
-        dfs(content_id)
         return chain
     
+    @staticmethod
+    def build_study_paths(
+        targets_by_student: Dict[str, List[str]],
+        prerequisites_map: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
+        """Trilhas de pré-requisitos de uma turma com um único grafo"""
+        graph = PrerequisiteGraph(prerequisites_map)
+        return {
+            student_id: graph.study_path(targets)
+            for student_id, targets in targets_by_student.items()
+        }
+    
     @staticmethod
     def optimize_study_schedule(
         materials: List[Dict],
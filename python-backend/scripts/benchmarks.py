@@ -0,0 +1,259 @@
+"""
+Benchmarks de Desempenho
+Mede ganhos das implementações otimizadas frente às versões originais
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from scripts._reference import (
+    collaborative_filtering_scan,
+    content_based_filtering_scan,
+    parse_date_strptime,
+    sample_catalog,
+    sample_history,
+)
+from scripts.ai_recommendations import ContentRecommendationEngine, ItemNeighbourTable
+from scripts.data_migration import DateParser
+from services.quiz_service import AnswerKey, QuizService
+
+
+def _timeit(func: Callable, repeat: int = 1) -> float:
+    """Retorna o melhor tempo (segundos) entre as repetições"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _report(name: str, baseline: float, optimized: float):
+    speedup = baseline / optimized if optimized > 0 else float('inf')
+    print(f"{name:<35} original: {baseline * 1000:>10.1f} ms   "
+          f"otimizado: {optimized * 1000:>10.1f} ms   ganho: {speedup:>7.1f}x")
+
+
+def benchmark_collaborative_filtering(users: int = 50000, queries: int = 20):
+    """Compara filtragem colaborativa por varredura e por índice invertido"""
+    rng = random.Random(42)
+    catalog = [f"c{i}" for i in range(users // 10)]
+    interactions = {
+        f"u{i}": rng.sample(catalog, rng.randint(3, 15))
+        for i in range(users)
+    }
+    query_users = rng.sample(list(interactions), queries)
+    
+    engine = ContentRecommendationEngine()
+    build_time = _timeit(lambda: engine.build_user_index(interactions))
+    
+    baseline = _timeit(
+        lambda: [collaborative_filtering_scan(u, interactions) for u in query_users]
+    )
+    optimized = _timeit(
+        lambda: [engine.collaborative_filtering(u, interactions) for u in query_users]
+    )
+    
+    for user_id in query_users:
+        assert engine.collaborative_filtering(user_id, interactions) == \
+            collaborative_filtering_scan(user_id, interactions)
+    
+    print(f"Índice invertido construído em {build_time * 1000:.1f} ms ({users} usuários)")
+    _report(f"collaborative_filtering x{queries}", baseline, optimized)
+
+
+def benchmark_content_based_filtering(catalog_size: int = 20000, queries: int = 20):
+    """Compara filtragem baseada em conteúdo por laços e por matriz esparsa"""
+    rng = random.Random(42)
+    catalog = sample_catalog(rng, catalog_size)
+    histories = [sample_history(rng, catalog, 30) for _ in range(queries)]
+    
+    engine = ContentRecommendationEngine()
+    build_time = _timeit(lambda: engine.build_content_catalog(catalog))
+    
+    baseline = _timeit(
+        lambda: [content_based_filtering_scan(h, catalog) for h in histories]
+    )
+    optimized = _timeit(
+        lambda: [engine.content_based_filtering('u', h, catalog) for h in histories]
+    )
+    
+    for history in histories:
+        assert engine.content_based_filtering('u', history, catalog) == \
+            content_based_filtering_scan(history, catalog)
+    
+    print(f"Catálogo indexado em {build_time * 1000:.1f} ms ({catalog_size} conteúdos)")
+    _report(f"content_based_filtering x{queries}", baseline, optimized)
+
+
+def benchmark_batch_recommendations(
+    users: int = 5000,
+    catalog_size: int = 5000,
+    processes: int = None
+):
+    """Compara hybrid_recommendation por usuário com recommend_many"""
+    processes = processes or os.cpu_count() or 1
+    rng = random.Random(42)
+    catalog = sample_catalog(rng, catalog_size)
+    histories = {
+        f"u{i}": sample_history(rng, catalog, rng.randint(1, 20))
+        for i in range(users)
+    }
+    interactions = {
+        user_id: [item['content_id'] for item in history]
+        for user_id, history in histories.items()
+    }
+    
+    engine = ContentRecommendationEngine()
+    baseline = _timeit(lambda: [
+        engine.hybrid_recommendation(u, histories[u], interactions, catalog)
+        for u in histories
+    ])
+    serial = _timeit(
+        lambda: list(engine.recommend_many(histories, histories, interactions, catalog))
+    )
+    parallel = _timeit(lambda: list(engine.recommend_many(
+        histories, histories, interactions, catalog, processes=processes
+    )))
+    
+    _report(f"recommend_many x{users}", baseline, serial)
+    _report(f"recommend_many x{users} ({processes} proc.)", baseline, parallel)
+
+
+def benchmark_similar_content(catalog_size: int = 100000, queries: int = 10000):
+    """Mede o pré-cálculo de conteúdos relacionados e a consulta via memory-map"""
+    rng = random.Random(42)
+    catalog = sample_catalog(rng, catalog_size, tags=500)
+    engine = ContentRecommendationEngine()
+    
+    start = time.perf_counter()
+    table = engine.precompute_similar_content(catalog)
+    build_time = time.perf_counter() - start
+    
+    with tempfile.TemporaryDirectory() as directory:
+        table.save(directory)
+        mapped = ItemNeighbourTable.load(directory)
+        query_ids = [rng.choice(catalog)['id'] for _ in range(queries)]
+        
+        query_time = _timeit(lambda: [mapped.neighbours_of(c) for c in query_ids])
+        pair_time = _timeit(lambda: [
+            engine.calculate_content_similarity(catalog[0], other)
+            for other in catalog
+        ])
+    
+    print(f"Vizinhos pré-calculados em {build_time:.1f} s ({catalog_size} conteúdos)")
+    print(f"Consulta via memory-map: {query_time / queries * 1e6:.1f} µs/conteúdo "
+          f"(varredura par a par: {pair_time * 1000:.1f} ms/conteúdo)")
+
+
+def benchmark_snapshot_load(users: int = 50000, catalog_size: int = 20000):
+    """Compara a reconstrução do estado do motor com a carga de um snapshot"""
+    rng = random.Random(42)
+    catalog = sample_catalog(rng, catalog_size)
+    histories = {
+        f"u{i}": sample_history(rng, catalog, rng.randint(1, 15))
+        for i in range(users)
+    }
+    interactions = {
+        user_id: [item['content_id'] for item in history]
+        for user_id, history in histories.items()
+    }
+    
+    def rebuild():
+        engine = ContentRecommendationEngine()
+        engine.build_user_index(interactions)
+        engine.build_user_profiles(histories, catalog)
+        return engine
+    
+    build_time = _timeit(rebuild)
+    engine = rebuild()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        engine.save_snapshot(directory)
+        load_time = _timeit(lambda: ContentRecommendationEngine.load_snapshot(directory))
+    
+    _report(f"inicialização ({users} usuários)", build_time, load_time)
+
+
+def benchmark_date_parsing(size: int = 1000000, distinct_days: int = 1500):
+    """Compara o parse de datas com strptime e com o DateParser"""
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    
+    columns = {
+        'iso': '%Y-%m-%d %H:%M:%S',
+        'dd/mm/YYYY': '%d/%m/%Y',
+        'dd/mm/YYYY HH:MM:SS': '%d/%m/%Y %H:%M:%S',
+    }
+    
+    for label, fmt in columns.items():
+        # Datas de sistemas legados se repetem muito (granularidade diária)
+        values = [
+            (start + timedelta(days=rng.randrange(distinct_days), hours=rng.randrange(24))).strftime(fmt)
+            for _ in range(size)
+        ]
+        
+        baseline = _timeit(lambda: [parse_date_strptime(value) for value in values])
+        parser = DateParser()
+        optimized = _timeit(lambda: [parser.parse(value, label) for value in values])
+        
+        uncached = DateParser(cache_size=0)
+        uncached_time = _timeit(lambda: [uncached.parse(value, label) for value in values])
+        
+        _report(f"datas {label} ({size})", baseline, optimized)
+        _report(f"datas {label} sem cache ({size})", baseline, uncached_time)
+
+
+def benchmark_batch_grading(submissions: int = 50000, questions: int = 40):
+    """Compara calculate_score por tentativa com a correção vetorizada"""
+    rng = random.Random(42)
+    correct_answers = [{'correct_option_id': f"q{q}o{rng.randrange(4)}"} for q in range(questions)]
+    attempts = [
+        [{'option_id': f"q{q}o{rng.randrange(4)}"} for q in range(questions)]
+        for _ in range(submissions)
+    ]
+    
+    baseline = _timeit(lambda: [QuizService.calculate_score(answers, correct_answers) for answers in attempts])
+    
+    key = AnswerKey.from_correct_answers(correct_answers)
+    responses = key.encode(attempts)
+    optimized = _timeit(lambda: QuizService.grade_batch(responses, key))
+    encode_time = _timeit(lambda: key.encode(attempts))
+    
+    _report(f"correção ({submissions} tentativas)", baseline, optimized)
+    _report(f"correção + codificação ({submissions})", baseline, optimized + encode_time)
+
+
+BENCHMARKS = {
+    'collaborative': benchmark_collaborative_filtering,
+    'content': benchmark_content_based_filtering,
+    'batch': benchmark_batch_recommendations,
+    'similar': benchmark_similar_content,
+    'snapshot': benchmark_snapshot_load,
+    'dates': benchmark_date_parsing,
+    'grading': benchmark_batch_grading,
+}
+
+
+def main():
+    """Ponto de entrada dos benchmarks"""
+    parser = argparse.ArgumentParser(description='LUMINA - Benchmarks de desempenho')
+    parser.add_argument('names', nargs='*',
+                        help=f"Benchmarks a executar: {', '.join(BENCHMARKS)} (padrão: todos)")
+    args = parser.parse_args()
+    
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmark desconhecido: {', '.join(unknown)}")
+    
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
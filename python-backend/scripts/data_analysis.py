@@ -3,11 +3,122 @@ Análise de Dados Educacionais
 Script para análise estatística de desempenho dos alunos
 """
 
+import array
+import bisect
+import csv
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import re
 import statistics
-from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
+import time
+import zipfile
+from typing import List, Dict, Tuple, Optional, Iterable, Callable
+from datetime import datetime, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
 import json
 
+import numpy as np
+
+from utils.helpers import iter_chunks
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US_PER_HOUR = 3600 * 1000000
+_US_PER_DAY = 24 * _US_PER_HOUR
+_TZ_SUFFIX = re.compile(r'(?:Z|[+-]\d{2}:?\d{2})$', re.MULTILINE)
+
+
+def _epoch_us(value: str) -> int:
+    """Converte um timestamp ISO-8601 em microssegundos desde a época (UTC)"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def _iso_to_epoch_us(values: List[str]) -> np.ndarray:
+    """Converte timestamps ISO-8601 em lote para épocas int64 (microssegundos, UTC)
+    
+    O NumPy só converte datas sem fuso; lotes com offset (Z, +03:00) são
+    convertidos para UTC valor a valor por _epoch_us.
+    """
+    if not _TZ_SUFFIX.search('\n'.join(values)):
+        try:
+            return np.array(values, dtype='datetime64[us]').astype(np.int64)
+        except ValueError:
+            pass
+    
+    return np.fromiter((_epoch_us(v) for v in values), dtype=np.int64, count=len(values))
+
+
+class _ScoreAggregate:
+    """Agregado de pontuações de um aluno ou turma"""
+    
+    __slots__ = ('count', 'total', 'scores', 'first_attempt', 'last_attempt', '_stdev')
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.scores = []
+        self.first_attempt = None
+        self.last_attempt = None
+        self._stdev = None
+    
+    def add(self, attempt: Dict):
+        """Acumula uma tentativa no agregado"""
+        self.count += 1
+        self.scores.append(attempt['score'])
+        
+        # Empates mantêm a ordem original, como uma ordenação estável
+        completed_at = attempt.get('completed_at')
+        if completed_at is None:
+            return
+        if self.first_attempt is None or completed_at < self.first_attempt['completed_at']:
+            self.first_attempt = attempt
+        if self.last_attempt is None or completed_at >= self.last_attempt['completed_at']:
+            self.last_attempt = attempt
+    
+    def finalize(self):
+        """Ordena as pontuações e fecha a soma"""
+        self.scores.sort()
+        self.total = math.fsum(self.scores)
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+    
+    @property
+    def median(self) -> float:
+        n = self.count
+        mid = n // 2
+        if n % 2 == 1:
+            return self.scores[mid]
+        return (self.scores[mid - 1] + self.scores[mid]) / 2
+    
+    @property
+    def stdev(self) -> float:
+        if self._stdev is None:
+            self._stdev = statistics.stdev(self.scores)
+        return self._stdev
+    
+    def count_at_least(self, value: float) -> int:
+        """Conta pontuações maiores ou iguais a value"""
+        return self.count - bisect.bisect_left(self.scores, value)
+
+
+def _prediction_label(success_probability: float) -> str:
+    """Classificação da probabilidade de sucesso"""
+    if success_probability >= 80:
+        return "Alto potencial de sucesso"
+    elif success_probability >= 60:
+        return "Bom potencial de sucesso"
+    elif success_probability >= 40:
+        return "Potencial moderado - necessita apoio"
+    return "Necessita intervenção urgente"
+
 
 class StudentPerformanceAnalyzer:
     """Analisador de desempenho estudantil"""
@@ -15,75 +126,97 @@ class StudentPerformanceAnalyzer:
     def __init__(self, student_data: List[Dict]):
         self.student_data = student_data
         self.results = {}
+        self._student_index = None
+        self._class_index = None
+    
+    def _build_indexes(self):
+        """Constrói os índices por aluno e por turma em uma única passada"""
+        student_index = {}
+        class_index = {}
+        
+        for attempt in self.student_data:
+            student_id = attempt['student_id']
+            aggregate = student_index.get(student_id)
+            if aggregate is None:
+                aggregate = student_index[student_id] = _ScoreAggregate()
+            aggregate.add(attempt)
+            
+            class_id = attempt.get('class_id')
+            aggregate = class_index.get(class_id)
+            if aggregate is None:
+                aggregate = class_index[class_id] = _ScoreAggregate()
+            aggregate.add(attempt)
+        
+        for aggregate in student_index.values():
+            aggregate.finalize()
+        for aggregate in class_index.values():
+            aggregate.finalize()
+        
+        self._student_index = student_index
+        self._class_index = class_index
+    
+    def refresh_indexes(self):
+        """Descarta os índices para refletir alterações em student_data"""
+        self._student_index = None
+        self._class_index = None
+    
+    def _student(self, student_id: str) -> Optional[_ScoreAggregate]:
+        if self._student_index is None:
+            self._build_indexes()
+        return self._student_index.get(student_id)
+    
+    def _class(self, class_id: str) -> Optional[_ScoreAggregate]:
+        if self._class_index is None:
+            self._build_indexes()
+        return self._class_index.get(class_id)
     
     def calculate_average_score(self, student_id: str) -> float:
         """Calcula média de pontuação do aluno"""
-        scores = [
-            attempt['score'] 
-            for attempt in self.student_data 
-            if attempt['student_id'] == student_id
-        ]
+        aggregate = self._student(student_id)
         
-        if not scores:
+        if aggregate is None:
             return 0.0
         
-        return statistics.mean(scores)
+        return aggregate.mean
     
     def calculate_median_score(self, student_id: str) -> float:
         """Calcula mediana de pontuação do aluno"""
-        scores = [
-            attempt['score'] 
-            for attempt in self.student_data 
-            if attempt['student_id'] == student_id
-        ]
+        aggregate = self._student(student_id)
         
-        if not scores:
+        if aggregate is None:
             return 0.0
         
-        return statistics.median(scores)
+        return aggregate.median
     
     def calculate_standard_deviation(self, student_id: str) -> float:
         """Calcula desvio padrão das pontuações"""
-        scores = [
-            attempt['score'] 
-            for attempt in self.student_data 
-            if attempt['student_id'] == student_id
-        ]
+        aggregate = self._student(student_id)
         
-        if len(scores) < 2:
+        if aggregate is None or aggregate.count < 2:
             return 0.0
         
-        return statistics.stdev(scores)
+        return aggregate.stdev
     
     def identify_struggling_students(self, threshold: float = 60.0) -> List[str]:
         """Identifica alunos com dificuldades"""
-        struggling = []
-        
-        student_ids = set(item['student_id'] for item in self.student_data)
+        if self._student_index is None:
+            self._build_indexes()
         
-        for student_id in student_ids:
-            avg_score = self.calculate_average_score(student_id)
-            if avg_score < threshold:
-                struggling.append(student_id)
-        
-        return struggling
+        return [
+            student_id
+            for student_id, aggregate in self._student_index.items()
+            if aggregate.mean < threshold
+        ]
     
     def calculate_improvement_rate(self, student_id: str) -> float:
         """Calcula taxa de melhoria do aluno ao longo do tempo"""
-        attempts = [
-            attempt 
-            for attempt in self.student_data 
-            if attempt['student_id'] == student_id
-        ]
+        aggregate = self._student(student_id)
         
-        if len(attempts) < 2:
+        if aggregate is None or aggregate.count < 2:
             return 0.0
         
-        # Ordena por data
-        attempts.sort(key=lambda x: x['completed_at'])
-        
-        first_score = attempts[0]['score']
-        last_score = attempts[-1]['score']
+        first_score = aggregate.first_attempt['score']
+        last_score = aggregate.last_attempt['score']
         
         if first_score == 0:
             return 0.0
@@ -93,25 +226,21 @@ class StudentPerformanceAnalyzer:
     
     def generate_class_statistics(self, class_id: str) -> Dict:
         """Gera estatísticas completas da turma"""
-        class_attempts = [
-            attempt 
-            for attempt in self.student_data 
-            if attempt.get('class_id') == class_id
-        ]
+        aggregate = self._class(class_id)
         
-        if not class_attempts:
+        if aggregate is None:
             return {}
         
-        scores = [attempt['score'] for attempt in class_attempts]
+        scores = aggregate.scores
         
         return {
-            'total_attempts': len(class_attempts),
-            'average_score': round(statistics.mean(scores), 2),
-            'median_score': statistics.median(scores),
-            'min_score': min(scores),
-            'max_score': max(scores),
-            'std_deviation': round(statistics.stdev(scores), 2) if len(scores) > 1 else 0,
-            'passing_rate': len([s for s in scores if s >= 60]) / len(scores) * 100
+            'total_attempts': aggregate.count,
+            'average_score': round(aggregate.mean, 2),
+            'median_score': aggregate.median,
+            'min_score': scores[0],
+            'max_score': scores[-1],
+            'std_deviation': round(aggregate.stdev, 2) if aggregate.count > 1 else 0,
+            'passing_rate': aggregate.count_at_least(60) / aggregate.count * 100
         }
     
     def predict_student_success(self, student_id: str) -> Tuple[str, float]:
@@ -122,16 +251,630 @@ class StudentPerformanceAnalyzer:
         # Algoritmo simples de predição
         success_probability = (avg_score * 0.7 + improvement_rate * 0.3)
         
-        if success_probability >= 80:
-            prediction = "Alto potencial de sucesso"
-        elif success_probability >= 60:
-            prediction = "Bom potencial de sucesso"
-        elif success_probability >= 40:
-            prediction = "Potencial moderado - necessita apoio"
+        return _prediction_label(success_probability), round(success_probability, 2)
+
+
+class ColumnarPerformanceAnalyzer:
+    """Analisador de desempenho em formato colunar (NumPy)
+    
+    Armazena student_id/class_id como códigos categóricos inteiros, score
+    como float64 (sem perda para notas fracionárias) e completed_at como
+    épocas int64 (microssegundos). As estatísticas de todos os alunos e
+    turmas são calculadas em um único group-by vetorizado e produzem os
+    mesmos resultados do StudentPerformanceAnalyzer.
+    """
+    
+    CHUNK_SIZE = 65536
+    PASSING_SCORE = 60
+    
+    def __init__(
+        self,
+        student_ids: List[str],
+        student_codes: np.ndarray,
+        class_ids: List[Optional[str]],
+        class_codes: np.ndarray,
+        scores: np.ndarray,
+        completed_at: np.ndarray
+    ):
+        self.student_ids = student_ids
+        self.class_ids = class_ids
+        self.student_codes = student_codes
+        self.class_codes = class_codes
+        self.scores = scores
+        self.completed_at = completed_at
+        
+        self._student_lookup = {sid: code for code, sid in enumerate(student_ids)}
+        self._class_lookup = {cid: code for code, cid in enumerate(class_ids)}
+        self._student_groups = None
+        self._class_groups = None
+    
+    @classmethod
+    def from_attempts(cls, attempts: Iterable[Dict]) -> 'ColumnarPerformanceAnalyzer':
+        """Constrói o analisador a partir de tentativas (dicts)"""
+        student_lookup = {}
+        class_lookup = {}
+        student_codes = array.array('i')
+        class_codes = array.array('i')
+        scores = array.array('d')
+        epoch_chunks = []
+        pending_dates = []
+        
+        for attempt in attempts:
+            student_codes.append(
+                student_lookup.setdefault(attempt['student_id'], len(student_lookup))
+            )
+            class_codes.append(
+                class_lookup.setdefault(attempt.get('class_id'), len(class_lookup))
+            )
+            scores.append(float(attempt['score']))
+            pending_dates.append(attempt['completed_at'])
+            
+            # Converte as datas em blocos para limitar a memória
+            if len(pending_dates) >= cls.CHUNK_SIZE:
+                epoch_chunks.append(_iso_to_epoch_us(pending_dates))
+                pending_dates = []
+        
+        if pending_dates:
+            epoch_chunks.append(_iso_to_epoch_us(pending_dates))
+        
+        completed_at = (
+            np.concatenate(epoch_chunks) if epoch_chunks
+            else np.empty(0, dtype=np.int64)
+        )
+        
+        return cls(
+            list(student_lookup),
+            np.frombuffer(student_codes, dtype=np.int32),
+            list(class_lookup),
+            np.frombuffer(class_codes, dtype=np.int32),
+            np.frombuffer(scores, dtype=np.float64),
+            completed_at
+        )
+    
+    @classmethod
+    def from_csv(cls, filepath: str) -> 'ColumnarPerformanceAnalyzer':
+        """Constrói o analisador a partir de um CSV de tentativas"""
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            rows = (
+                {**row, 'class_id': row.get('class_id') or None}
+                for row in csv.DictReader(f)
+            )
+            return cls.from_attempts(rows)
+    
+    def save(self, filepath: str):
+        """Salva as colunas em arquivo .npz"""
+        np.savez(
+            filepath,
+            labels=np.array(json.dumps({
+                'student_ids': self.student_ids,
+                'class_ids': self.class_ids
+            })),
+            student_codes=self.student_codes,
+            class_codes=self.class_codes,
+            scores=self.scores,
+            completed_at=self.completed_at
+        )
+    
+    @classmethod
+    def load(cls, filepath: str) -> 'ColumnarPerformanceAnalyzer':
+        """Carrega colunas salvas com save()"""
+        with np.load(filepath, allow_pickle=False) as data:
+            labels = json.loads(str(data['labels']))
+            return cls(
+                labels['student_ids'],
+                data['student_codes'],
+                labels['class_ids'],
+                data['class_codes'],
+                data['scores'],
+                data['completed_at']
+            )
+    
+    def _group_statistics(self, codes: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+        """Calcula estatísticas de todos os grupos em uma passada vetorizada"""
+        scores = np.asarray(self.scores, dtype=np.float64)
+        
+        counts = np.bincount(codes, minlength=n_groups)
+        
+        # Grupos contíguos ordenados por pontuação: min, max e mediana por posição
+        starts = np.cumsum(counts) - counts
+        ends = starts + counts - 1
+        sorted_scores = scores[np.lexsort((scores, codes))]
+        medians = (
+            sorted_scores[starts + (counts - 1) // 2] + sorted_scores[starts + counts // 2]
+        ) / 2
+        
+        # Somas exatas (math.fsum) como no StudentPerformanceAnalyzer: a soma
+        # acumulada do bincount desloca médias que caem sobre o threshold
+        values = sorted_scores.tolist()
+        sums = np.array([
+            math.fsum(values[start:start + count])
+            for start, count in zip(starts.tolist(), counts.tolist())
+        ], dtype=np.float64)
+        means = sums / np.maximum(counts, 1)
+        
+        deviations = scores - means[codes]
+        squares = np.bincount(codes, weights=deviations * deviations, minlength=n_groups)
+        std = np.zeros(n_groups)
+        multi = counts > 1
+        std[multi] = np.sqrt(squares[multi] / (counts[multi] - 1))
+        
+        passing = np.bincount(
+            codes, weights=scores >= self.PASSING_SCORE, minlength=n_groups
+        )
+        
+        # Ordenação estável por data: empates mantêm a ordem original
+        by_date = np.lexsort((self.completed_at, codes))
+        first_scores = scores[by_date[starts]]
+        last_scores = scores[by_date[ends]]
+        
+        return {
+            'counts': counts,
+            'means': means,
+            'std': std,
+            'passing': passing,
+            'min': sorted_scores[starts],
+            'max': sorted_scores[ends],
+            'medians': medians,
+            'first_scores': first_scores,
+            'last_scores': last_scores,
+        }
+    
+    def _students(self) -> Dict[str, np.ndarray]:
+        if self._student_groups is None:
+            self._student_groups = self._group_statistics(
+                self.student_codes, len(self.student_ids)
+            )
+        return self._student_groups
+    
+    def _classes(self) -> Dict[str, np.ndarray]:
+        if self._class_groups is None:
+            self._class_groups = self._group_statistics(
+                self.class_codes, len(self.class_ids)
+            )
+        return self._class_groups
+    
+    def calculate_average_score(self, student_id: str) -> float:
+        """Calcula média de pontuação do aluno"""
+        code = self._student_lookup.get(student_id)
+        if code is None:
+            return 0.0
+        return float(self._students()['means'][code])
+    
+    def identify_struggling_students(self, threshold: float = 60.0) -> List[str]:
+        """Identifica alunos com dificuldades"""
+        groups = self._students()
+        codes = np.flatnonzero(groups['means'] < threshold)
+        return [self.student_ids[code] for code in codes]
+    
+    def _improvement_rate(self, groups: Dict[str, np.ndarray], code: int) -> float:
+        if groups['counts'][code] < 2:
+            return 0.0
+        
+        first_score = float(groups['first_scores'][code])
+        last_score = float(groups['last_scores'][code])
+        
+        if first_score == 0:
+            return 0.0
+        
+        return round(((last_score - first_score) / first_score) * 100, 2)
+    
+    def calculate_improvement_rate(self, student_id: str) -> float:
+        """Calcula taxa de melhoria do aluno ao longo do tempo"""
+        code = self._student_lookup.get(student_id)
+        if code is None:
+            return 0.0
+        return self._improvement_rate(self._students(), code)
+    
+    def calculate_all_improvement_rates(self) -> Dict[str, float]:
+        """Calcula a taxa de melhoria de todos os alunos"""
+        groups = self._students()
+        return {
+            student_id: self._improvement_rate(groups, code)
+            for code, student_id in enumerate(self.student_ids)
+        }
+    
+    def _class_statistics(self, groups: Dict[str, np.ndarray], code: int) -> Dict:
+        count = int(groups['counts'][code])
+        return {
+            'total_attempts': count,
+            'average_score': round(float(groups['means'][code]), 2),
+            'median_score': float(groups['medians'][code]),
+            'min_score': float(groups['min'][code]),
+            'max_score': float(groups['max'][code]),
+            'std_deviation': round(float(groups['std'][code]), 2) if count > 1 else 0,
+            'passing_rate': float(groups['passing'][code]) / count * 100
+        }
+    
+    def generate_class_statistics(self, class_id: str) -> Dict:
+        """Gera estatísticas completas da turma"""
+        code = self._class_lookup.get(class_id)
+        if code is None:
+            return {}
+        return self._class_statistics(self._classes(), code)
+    
+    def generate_all_class_statistics(self) -> Dict[str, Dict]:
+        """Gera estatísticas de todas as turmas"""
+        groups = self._classes()
+        return {
+            class_id: self._class_statistics(groups, code)
+            for code, class_id in enumerate(self.class_ids)
+        }
+
+
+class ContentGapAggregator:
+    """Contagem de conclusões por material em uma única passada
+    
+    Mantém apenas (concluídos, total) por material, então as linhas podem
+    vir de qualquer iterável. Contagens parciais de vários workers são
+    mescladas com merge() ou merge_counts().
+    """
+    
+    GAP_THRESHOLD = 30
+    
+    def __init__(self):
+        self.completed: Dict[str, int] = {}
+        self.total: Dict[str, int] = {}
+    
+    def add(self, completion_data: Iterable[Dict]):
+        """Acumula linhas de conclusão"""
+        completed = self.completed
+        total = self.total
+        
+        for item in completion_data:
+            material_id = item['material_id']
+            total[material_id] = total.get(material_id, 0) + 1
+            if item.get('completed', False):
+                completed[material_id] = completed.get(material_id, 0) + 1
+    
+    def partial_counts(self) -> Dict[str, Tuple[int, int]]:
+        """Contagens (concluídos, total) por material, para envio a outro processo"""
+        return {
+            material_id: (self.completed.get(material_id, 0), total)
+            for material_id, total in self.total.items()
+        }
+    
+    def merge_counts(self, counts: Dict[str, Tuple[int, int]]):
+        """Incorpora contagens parciais (concluídos, total) por material"""
+        for material_id, (completed, total) in counts.items():
+            self.total[material_id] = self.total.get(material_id, 0) + total
+            if completed:
+                self.completed[material_id] = self.completed.get(material_id, 0) + completed
+    
+    def merge(self, other: 'ContentGapAggregator'):
+        """Incorpora as contagens de outro agregador"""
+        self.merge_counts(other.partial_counts())
+    
+    def completion_rates(self) -> Dict[str, float]:
+        """Taxa de conclusão (%) por material"""
+        return {
+            material_id: (self.completed.get(material_id, 0) / total) * 100 if total > 0 else 0
+            for material_id, total in self.total.items()
+        }
+    
+    def gaps(self, threshold: float = GAP_THRESHOLD) -> List[str]:
+        """Materiais com taxa de conclusão abaixo de threshold"""
+        return [
+            material_id
+            for material_id, rate in self.completion_rates().items()
+            if rate < threshold
+        ]
+    
+    @classmethod
+    def from_rows(cls, completion_data: Iterable[Dict]) -> 'ContentGapAggregator':
+        aggregator = cls()
+        aggregator.add(completion_data)
+        return aggregator
+
+
+def _utc_offsets_us(epoch_us: np.ndarray, tz: tzinfo) -> np.ndarray:
+    """Offset UTC de tz (microssegundos) em cada instante
+    
+    Transições de horário de verão ocorrem em horas cheias UTC, então o
+    offset é consultado uma vez por hora distinta e espalhado pelo lote.
+    """
+    if isinstance(tz, timezone):
+        offset = tz.utcoffset(None) // timedelta(microseconds=1)
+        return np.full(len(epoch_us), offset, dtype=np.int64)
+    
+    hours, inverse = np.unique(epoch_us // _US_PER_HOUR, return_inverse=True)
+    offsets = np.fromiter(
+        (
+            datetime.fromtimestamp(int(hour) * 3600, tz).utcoffset() // timedelta(microseconds=1)
+            for hour in hours
+        ),
+        dtype=np.int64,
+        count=len(hours)
+    )
+    return offsets[inverse]
+
+
+class StudyTimeHeatmap:
+    """Mapa de calor de atividades (dia da semana × hora), geral e por turma
+    
+    Os timestamps são convertidos em lote para épocas int64 e agrupados com
+    bincount. Timestamps sem fuso são tratados como UTC e todos são
+    convertidos para tz (UTC se omitido) antes do agrupamento. As linhas do
+    mapa seguem datetime.weekday() (0 = segunda-feira).
+    """
+    
+    CHUNK_SIZE = 65536
+    CELLS = 7 * 24
+    
+    def __init__(self, tz=None):
+        self.tz = ZoneInfo(tz) if isinstance(tz, str) else (tz or timezone.utc)
+        self.class_ids: List[Optional[str]] = []
+        self._class_lookup: Dict[Optional[str], int] = {}
+        self._class_counts = np.zeros((0, 7, 24), dtype=np.int64)
+    
+    @property
+    def heatmap(self) -> np.ndarray:
+        """Contagens 7 × 24 de todas as turmas"""
+        return self._class_counts.sum(axis=0)
+    
+    @property
+    def hourly(self) -> np.ndarray:
+        """Contagens por hora do dia"""
+        return self.heatmap.sum(axis=0)
+    
+    @property
+    def total(self) -> int:
+        return int(self._class_counts.sum())
+    
+    def class_heatmaps(self) -> Dict[Optional[str], np.ndarray]:
+        """Mapa 7 × 24 de cada turma"""
+        return {class_id: self._class_counts[code] for code, class_id in enumerate(self.class_ids)}
+    
+    def peak_hours(self, top: int = 3) -> List[int]:
+        """Horas com mais atividades"""
+        return [int(hour) for hour in np.argsort(-self.hourly, kind='stable')[:top]]
+    
+    def _class_code(self, class_id: Optional[str]) -> int:
+        code = self._class_lookup.get(class_id)
+        if code is None:
+            code = self._class_lookup[class_id] = len(self.class_ids)
+            self.class_ids.append(class_id)
+        return code
+    
+    def _grow(self):
+        missing = len(self.class_ids) - len(self._class_counts)
+        if missing > 0:
+            self._class_counts = np.concatenate(
+                [self._class_counts, np.zeros((missing, 7, 24), dtype=np.int64)]
+            )
+    
+    def add_epochs(self, epoch_us: np.ndarray, class_codes: np.ndarray):
+        """Acumula épocas UTC (microssegundos) já convertidas"""
+        local_us = epoch_us + _utc_offsets_us(epoch_us, self.tz)
+        hours = (local_us // _US_PER_HOUR) % 24
+        # 01/01/1970 foi uma quinta-feira (weekday 3)
+        weekdays = (local_us // _US_PER_DAY + 3) % 7
+        
+        self._grow()
+        cells = class_codes.astype(np.int64) * self.CELLS + weekdays * 24 + hours
+        counts = np.bincount(cells, minlength=len(self.class_ids) * self.CELLS)
+        self._class_counts += counts.reshape(-1, 7, 24)
+    
+    def add_timestamps(self, timestamps: List[str], class_ids: Optional[List[Optional[str]]] = None):
+        """Acumula um lote de timestamps ISO-8601"""
+        if not timestamps:
+            return
+        if class_ids is None:
+            class_codes = np.full(len(timestamps), self._class_code(None), dtype=np.int64)
         else:
-            prediction = "Necessita intervenção urgente"
+            class_codes = np.fromiter(
+                (self._class_code(class_id) for class_id in class_ids),
+                dtype=np.int64,
+                count=len(class_ids)
+            )
+        self.add_epochs(_iso_to_epoch_us(timestamps), class_codes)
+    
+    def add(self, activity_data: Iterable[Dict], chunk_size: int = CHUNK_SIZE):
+        """Acumula atividades (dicts com timestamp e class_id opcional) em blocos"""
+        for chunk in iter_chunks(activity_data, chunk_size):
+            self.add_timestamps(
+                [activity['timestamp'] for activity in chunk],
+                [activity.get('class_id') for activity in chunk]
+            )
+    
+    def merge(self, other: 'StudyTimeHeatmap'):
+        """Incorpora as contagens de outro mapa"""
+        codes = [self._class_code(class_id) for class_id in other.class_ids]
+        self._grow()
+        if codes:
+            np.add.at(self._class_counts, codes, other._class_counts[:len(codes)])
+    
+    @classmethod
+    def from_activities(cls, activity_data: Iterable[Dict], tz=None, chunk_size: int = CHUNK_SIZE) -> 'StudyTimeHeatmap':
+        heatmap = cls(tz)
+        heatmap.add(activity_data, chunk_size)
+        return heatmap
+    
+    @classmethod
+    def from_csv(cls, filepath: str, tz=None, chunk_size: int = CHUNK_SIZE) -> 'StudyTimeHeatmap':
+        """Lê um CSV de atividades (colunas timestamp e class_id) em blocos"""
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            rows = (
+                {'timestamp': row['timestamp'], 'class_id': row.get('class_id') or None}
+                for row in csv.DictReader(f)
+            )
+            return cls.from_activities(rows, tz, chunk_size)
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """Valores distintos por ordenação (o np.unique com hash degrada com bits baixos repetidos)"""
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+# Pesos e metas (100%) do score de engajamento
+ENGAGEMENT_WEIGHTS = {
+    'login': 0.2,
+    'material': 0.3,
+    'quiz': 0.4,
+    'consistency': 0.1
+}
+ENGAGEMENT_TARGETS = {
+    'login': 30,  # 30 logins/mês = 100%
+    'material': 50,  # 50 visualizações = 100%
+    'quiz': 20,  # 20 tentativas = 100%
+    'consistency': 30  # 30 dias = 100%
+}
+
+
+class CohortEngagement:
+    """Contadores de engajamento de uma turma inteira em uma passada agrupada
+    
+    Cada linha do activity_log (user_id, activity_type, activity_date)
+    incrementa o contador do seu tipo; dias ativos são os pares
+    (aluno, dia) distintos. O score aplica os mesmos pesos e limites de
+    calculate_engagement_score, vetorizados para todos os alunos.
+    """
+    
+    COUNTERS = ('login', 'material', 'quiz')
+    
+    # activity_type do activity_log -> contador
+    ACTIVITY_TYPES = {
+        'login': 'login',
+        'material_read': 'material',
+        'material_view': 'material',
+        'quiz_attempt': 'quiz',
+        'quiz_completed': 'quiz',
+    }
+    
+    def __init__(self, activity_types: Optional[Dict[str, str]] = None):
+        activity_types = self.ACTIVITY_TYPES if activity_types is None else activity_types
+        self._type_codes = {
+            activity_type: self.COUNTERS.index(counter)
+            for activity_type, counter in activity_types.items()
+        }
         
-        return prediction, round(success_probability, 2)
+        self._student_lookup: Dict[str, int] = {}
+        self._day_lookup: Dict[str, int] = {}
+        # Uma coluna por contador e uma última com o total de atividades
+        self._counts = np.zeros((0, len(self.COUNTERS) + 1), dtype=np.int64)
+        self._active_days = np.empty(0, dtype=np.int64)
+        self._pending_days: List[np.ndarray] = []
+        self._pending_size = 0
+    
+    @property
+    def student_ids(self) -> List[str]:
+        return list(self._student_lookup)
+    
+    def _day_numbers(self, activity_dates: List) -> np.ndarray:
+        """Dias desde a época; cada data distinta é convertida uma única vez"""
+        lookup = self._day_lookup
+        missing = {value for value in activity_dates if value not in lookup}
+        if missing:
+            missing = list(missing)
+            days = np.array([str(value)[:10] for value in missing], dtype='datetime64[D]').astype(np.int64)
+            lookup.update(zip(missing, days.tolist()))
+        return np.array([lookup[value] for value in activity_dates], dtype=np.int64)
+    
+    def add_columns(self, student_ids: List[str], activity_types: List[str], activity_dates: List):
+        """Acumula um bloco em colunas (datas ISO; só o dia é considerado)"""
+        if not student_ids:
+            return
+        
+        lookup = self._student_lookup
+        type_codes = self._type_codes
+        students = np.array([lookup.setdefault(sid, len(lookup)) for sid in student_ids], dtype=np.int64)
+        counters = np.array([type_codes.get(activity_type, -1) for activity_type in activity_types], dtype=np.int64)
+        days = self._day_numbers(activity_dates)
+        
+        n_students = len(lookup)
+        if len(self._counts) < n_students:
+            self._counts = np.concatenate([
+                self._counts,
+                np.zeros((n_students - len(self._counts), self._counts.shape[1]), dtype=np.int64)
+            ])
+        
+        width = self._counts.shape[1]
+        counted = counters >= 0
+        cells = np.concatenate([
+            students[counted] * width + counters[counted],
+            students * width + len(self.COUNTERS)
+        ])
+        self._counts += np.bincount(cells, minlength=self._counts.size).reshape(self._counts.shape)
+        
+        # Pares (aluno, dia) distintos em uma chave int64
+        keys = _sorted_unique((students << 32) | (days & 0xFFFFFFFF))
+        self._pending_days.append(keys)
+        self._pending_size += len(keys)
+        
+        # Compacta só quando o pendente alcança o acumulado (custo amortizado)
+        if self._pending_size >= max(len(self._active_days), 1 << 20):
+            self._compact_days()
+    
+    def _compact_days(self):
+        if self._pending_days:
+            self._active_days = _sorted_unique(np.concatenate([self._active_days, *self._pending_days]))
+            self._pending_days = []
+            self._pending_size = 0
+    
+    def add(self, activity_data: Iterable[Dict], chunk_size: int = 65536):
+        """Acumula linhas do activity_log em blocos"""
+        for chunk in iter_chunks(activity_data, chunk_size):
+            self.add_columns(
+                [row['user_id'] for row in chunk],
+                [row['activity_type'] for row in chunk],
+                [row['activity_date'] for row in chunk]
+            )
+    
+    @classmethod
+    def from_csv(cls, filepath: str, chunk_size: int = 65536) -> 'CohortEngagement':
+        """Lê um CSV do activity_log (user_id, activity_type, activity_date) em blocos"""
+        cohort = cls()
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            cohort.add(csv.DictReader(f), chunk_size)
+        return cohort
+    
+    def counters(self) -> Dict[str, np.ndarray]:
+        """Os quatro contadores (e o total de atividades) de cada aluno, na ordem de student_ids"""
+        self._compact_days()
+        days_active = np.bincount(self._active_days >> 32, minlength=len(self._student_lookup))
+        counters = {name: self._counts[:, index] for index, name in enumerate(self.COUNTERS)}
+        counters['days_active'] = days_active
+        counters['total_activities'] = self._counts[:, len(self.COUNTERS)]
+        return counters
+    
+    def scores(self) -> np.ndarray:
+        """Score de engajamento de cada aluno, na ordem de student_ids"""
+        counters = self.counters()
+        
+        def normalized(name: str, counter: str) -> np.ndarray:
+            return np.minimum(counters[counter] / ENGAGEMENT_TARGETS[name], 1)
+        
+        engagement = (
+            normalized('login', 'login') * ENGAGEMENT_WEIGHTS['login'] +
+            normalized('material', 'material') * ENGAGEMENT_WEIGHTS['material'] +
+            normalized('quiz', 'quiz') * ENGAGEMENT_WEIGHTS['quiz'] +
+            normalized('consistency', 'days_active') * ENGAGEMENT_WEIGHTS['consistency']
+        ) * 100
+        
+        return np.where(counters['days_active'] == 0, 0.0, np.round(engagement, 2))
+    
+    def ranking(self) -> np.ndarray:
+        """Array estruturado ordenado pelo score (empates na ordem de chegada)"""
+        counters = self.counters()
+        scores = self.scores()
+        order = np.argsort(-scores, kind='stable')
+        
+        ranked = np.empty(len(order), dtype=[
+            ('student_id', object),
+            ('score', np.float64),
+            ('login', np.int64),
+            ('material', np.int64),
+            ('quiz', np.int64),
+            ('days_active', np.int64),
+            ('total_activities', np.int64),
+        ])
+        ranked['student_id'] = np.array(self.student_ids, dtype=object)[order]
+        ranked['score'] = scores[order]
+        for name, values in counters.items():
+            ranked[name] = values[order]
+        return ranked
 
 
 class LearningTrendsAnalyzer:
@@ -149,6 +892,15 @@ class LearningTrendsAnalyzer:
         
         return hourly_activity
     
+    @staticmethod
+    def analyze_peak_study_heatmap(
+        activity_data: Iterable[Dict],
+        tz=None,
+        chunk_size: int = StudyTimeHeatmap.CHUNK_SIZE
+    ) -> StudyTimeHeatmap:
+        """Analisa horários de pico em lote (dia da semana × hora, por turma)"""
+        return StudyTimeHeatmap.from_activities(activity_data, tz, chunk_size)
+    
     @staticmethod
     def calculate_engagement_score(
         login_count: int,
@@ -161,18 +913,13 @@ class LearningTrendsAnalyzer:
             return 0.0
         
         # Pesos para cada métrica
-        weights = {
-            'login': 0.2,
-            'material': 0.3,
-            'quiz': 0.4,
-            'consistency': 0.1
-        }
+        weights = ENGAGEMENT_WEIGHTS
         
         # Normaliza valores
-        normalized_login = min(login_count / 30, 1)  # 30 logins/mês = 100%
-        normalized_material = min(material_views / 50, 1)  # 50 visualizações = 100%
-        normalized_quiz = min(quiz_attempts / 20, 1)  # 20 tentativas = 100%
-        normalized_consistency = min(days_active / 30, 1)  # 30 dias = 100%
+        normalized_login = min(login_count / ENGAGEMENT_TARGETS['login'], 1)
+        normalized_material = min(material_views / ENGAGEMENT_TARGETS['material'], 1)
+        normalized_quiz = min(quiz_attempts / ENGAGEMENT_TARGETS['quiz'], 1)
+        normalized_consistency = min(days_active / ENGAGEMENT_TARGETS['consistency'], 1)
         
         engagement_score = (
             normalized_login * weights['login'] +
@@ -184,33 +931,20 @@ class LearningTrendsAnalyzer:
         return round(engagement_score, 2)
     
     @staticmethod
-    def identify_content_gaps(completion_data: List[Dict]) -> List[str]:
+    def calculate_cohort_engagement(
+        activity_data: Iterable[Dict],
+        chunk_size: int = 65536
+    ) -> np.ndarray:
+        """Calcula o engajamento de todos os alunos, ordenado do maior para o menor"""
+        cohort = CohortEngagement()
+        cohort.add(activity_data, chunk_size)
+        return cohort.ranking()
+    
+    @staticmethod
+    def identify_content_gaps(completion_data: Iterable[Dict]) -> List[str]:
         """Identifica lacunas no conteúdo estudado"""
-        all_materials = set(item['material_id'] for item in completion_data)
-        
-        completion_rates = {}
-        for material_id in all_materials:
-            material_attempts = [
-                item for item in completion_data 
-                if item['material_id'] == material_id
-            ]
-            
-            completed = len([
-                item for item in material_attempts 
-                if item.get('completed', False)
-            ])
-            
-            total = len(material_attempts)
-            completion_rates[material_id] = (completed / total) * 100 if total > 0 else 0
-        
         # Materiais com taxa de conclusão abaixo de 30%
-        gaps = [
-            material_id 
-            for material_id, rate in completion_rates.items() 
-            if rate < 30
-        ]
-        
-        return gaps
+        return ContentGapAggregator.from_rows(completion_data).gaps()
 
 
 def generate_comprehensive_report(student_id: str, data: Dict) -> str:
@@ -246,6 +980,175 @@ def generate_comprehensive_report(student_id: str, data: Dict) -> str:
     return report
 
 
+def build_report_inputs(
+    analyzer: ColumnarPerformanceAnalyzer,
+    engagement: Optional[CohortEngagement] = None
+) -> Dict[str, Dict]:
+    """Dados de generate_comprehensive_report de todos os alunos
+    
+    Usa um único group-by do analisador colunar (e os contadores da
+    CohortEngagement, se houver) em vez de chamar os métodos do
+    StudentPerformanceAnalyzer aluno a aluno.
+    """
+    groups = analyzer._students()
+    improvement_rates = analyzer.calculate_all_improvement_rates()
+    
+    engagement_rows = {}
+    if engagement is not None:
+        counters = engagement.counters()
+        scores = engagement.scores()
+        engagement_rows = {
+            student_id: (float(scores[code]), int(counters['total_activities'][code]),
+                         int(counters['days_active'][code]))
+            for code, student_id in enumerate(engagement.student_ids)
+        }
+    
+    inputs = {}
+    for code, student_id in enumerate(analyzer.student_ids):
+        average = float(groups['means'][code])
+        improvement = improvement_rates[student_id]
+        probability = average * 0.7 + improvement * 0.3
+        engagement_score, total_activities, days_active = engagement_rows.get(student_id, (0.0, 0, 0))
+        
+        inputs[student_id] = {
+            'average_score': average,
+            'median_score': float(groups['medians'][code]),
+            'std_deviation': float(groups['std'][code]),
+            'improvement_rate': improvement,
+            'engagement_score': engagement_score,
+            'total_activities': total_activities,
+            'days_active': days_active,
+            'prediction': f"{_prediction_label(probability)} ({round(probability, 2)}%)",
+            'recommendations': [],
+        }
+    return inputs
+
+
+def _render_report_chunk(task: Tuple[Optional[str], List[Tuple[str, Dict]]]) -> Tuple[Optional[str], str, int]:
+    """Renderiza os relatórios de um bloco de alunos de uma turma (worker)"""
+    class_id, items = task
+    text = ''.join(generate_comprehensive_report(student_id, data) for student_id, data in items)
+    return class_id, text, len(items)
+
+
+def _report_filename(class_id: Optional[str], taken: Iterable[str] = ()) -> str:
+    """Nome do arquivo da turma; nomes já usados ganham um hash do class_id
+    
+    Ids distintos podem coincidir após a limpeza (ex.: "a/b" e "a_b", ou uma
+    turma chamada "sem_turma" e None).
+    """
+    name = re.sub(r'[^\w.-]', '_', class_id) if class_id else 'sem_turma'
+    filename = f"relatorios_{name}.txt"
+    if filename in taken:
+        digest = hashlib.sha1(repr(class_id).encode('utf-8')).hexdigest()[:8]
+        filename = f"relatorios_{name}_{digest}.txt"
+    return filename
+
+
+def generate_batch_reports(
+    analyzer: ColumnarPerformanceAnalyzer,
+    output: str,
+    engagement: Optional[CohortEngagement] = None,
+    archive: bool = False,
+    processes: Optional[int] = None,
+    chunk_size: int = 500,
+    progress_every: int = 1000,
+    on_progress: Optional[Callable[[int, int, float], None]] = None
+) -> Dict:
+    """Gera os relatórios de todos os alunos, um arquivo por turma
+    
+    As entradas vêm de uma única passada de análise; a renderização roda em
+    um pool de processos e os blocos chegam em ordem de turma, então cada
+    arquivo é escrito de forma contínua em output (diretório) ou como membro
+    de um .zip (archive=True). Alunos em mais de uma turma aparecem em cada
+    uma delas. on_progress(escritos, total, segundos) é chamado a cada
+    progress_every relatórios.
+    """
+    started_at = time.perf_counter()
+    inputs = build_report_inputs(analyzer, engagement)
+    
+    # Pares (turma, aluno) distintos, agrupados por turma
+    n_students = len(analyzer.student_ids)
+    pairs = _sorted_unique(
+        analyzer.class_codes.astype(np.int64) * n_students + analyzer.student_codes
+    )
+    pair_classes = (pairs // max(n_students, 1)).tolist()
+    pair_students = (pairs % max(n_students, 1)).tolist()
+    
+    def tasks():
+        start = 0
+        while start < len(pairs):
+            class_code = pair_classes[start]
+            end = bisect.bisect_right(pair_classes, class_code, start)
+            for chunk_start in range(start, end, chunk_size):
+                students = pair_students[chunk_start:min(chunk_start + chunk_size, end)]
+                yield analyzer.class_ids[class_code], [
+                    (analyzer.student_ids[code], inputs[analyzer.student_ids[code]]) for code in students
+                ]
+            start = end
+    
+    def write_reports(results: Iterable[Tuple[Optional[str], str, int]]) -> Tuple[int, List[str]]:
+        if archive:
+            container = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(output, exist_ok=True)
+            container = None
+        
+        files = []
+        taken = set()
+        current_class = object()
+        handle = None
+        written = 0
+        next_progress = progress_every
+        
+        try:
+            for class_id, text, count in results:
+                # Blocos chegam agrupados por turma: um arquivo aberto por vez
+                if class_id != current_class:
+                    if handle is not None:
+                        handle.close()
+                    filename = _report_filename(class_id, taken)
+                    taken.add(filename)
+                    if container is not None:
+                        handle = io.TextIOWrapper(container.open(filename, 'w', force_zip64=True), encoding='utf-8')
+                    else:
+                        handle = open(os.path.join(output, filename), 'w', encoding='utf-8')
+                    files.append(filename)
+                    current_class = class_id
+                
+                handle.write(text)
+                written += count
+                
+                if on_progress is not None and progress_every and written >= next_progress:
+                    on_progress(written, len(pairs), time.perf_counter() - started_at)
+                    next_progress += progress_every
+        finally:
+            if handle is not None:
+                handle.close()
+            if container is not None:
+                container.close()
+        
+        return written, files
+    
+    processes = processes or os.cpu_count() or 1
+    if processes > 1:
+        # As tarefas são serializáveis: sem fork usa o contexto padrão (spawn)
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        with multiprocessing.get_context(start_method).Pool(processes) as pool:
+            written, files = write_reports(pool.imap(_render_report_chunk, tasks()))
+    else:
+        written, files = write_reports(map(_render_report_chunk, tasks()))
+    
+    elapsed = time.perf_counter() - started_at
+    return {
+        'reports': written,
+        'students': n_students,
+        'files': files,
+        'elapsed': elapsed,
+        'reports_per_second': written / elapsed if elapsed > 0 else 0.0,
+    }
+
+
 if __name__ == "__main__":
     # Exemplo de uso
     sample_data = [
@@ -5,18 +5,279 @@ Ferramentas para migração e transformação de dados
 
 import json
 import csv
-from typing import List, Dict, Any, Optional
+import gzip
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict, deque
+from functools import lru_cache, partial
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Callable
 from datetime import datetime
 import hashlib
 
+from services.class_code_allocator import ClassCodeAllocator, get_class_code_allocator
+from utils.helpers import iter_chunks
+
+
+class DateParser:
+    """Parser de datas com detecção do formato de cada coluna e cache LRU
+    
+    O formato vencedor de cada coluna é tentado primeiro nos registros
+    seguintes. Datas ausentes ou irreconhecíveis retornam None e são
+    contadas por coluna em missing/unparseable.
+    """
+    
+    STRPTIME_FORMATS = (
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d',
+        '%d/%m/%Y',
+        '%d/%m/%Y %H:%M:%S',
+    )
+    
+    def __init__(self, cache_size: int = 65536):
+        self.learned_formats: Dict[Optional[str], str] = {}
+        self.missing = Counter()
+        self.unparseable = Counter()
+        self._parsers = {'iso': datetime.fromisoformat, 'day_first': self._parse_day_first}
+        for fmt in self.STRPTIME_FORMATS:
+            self._parsers[fmt] = partial(self._strptime, fmt=fmt)
+        self._parse_cached = lru_cache(maxsize=cache_size)(self._parse_uncached)
+    
+    @staticmethod
+    def _strptime(value: str, fmt: str) -> datetime:
+        return datetime.strptime(value, fmt)
+    
+    @staticmethod
+    def _parse_day_first(value: str) -> datetime:
+        """Caminho rápido para dd/mm/YYYY e dd/mm/YYYY HH:MM:SS"""
+        if not (value.isascii() and value[2:3] == '/' and value[5:6] == '/'):
+            raise ValueError(value)
+        
+        if len(value) == 10:
+            fields = (value[6:10], value[3:5], value[0:2])
+        elif len(value) == 19 and value[10] == ' ' and value[13] == ':' and value[16] == ':':
+            fields = (value[6:10], value[3:5], value[0:2], value[11:13], value[14:16], value[17:19])
+        else:
+            raise ValueError(value)
+        
+        if not all(field.isdigit() for field in fields):
+            raise ValueError(value)
+        return datetime(*map(int, fields))
+    
+    def _parse_uncached(self, value: str, column: Optional[str]) -> Optional[str]:
+        learned = self.learned_formats.get(column)
+        if learned is not None:
+            try:
+                return self._parsers[learned](value).isoformat()
+            except ValueError:
+                pass
+        
+        for name, parser in self._parsers.items():
+            if name == learned:
+                continue
+            try:
+                result = parser(value).isoformat()
+            except ValueError:
+                continue
+            self.learned_formats[column] = name
+            return result
+        
+        return None
+    
+    def parse(self, value: Any, column: Optional[str] = None) -> Optional[str]:
+        """Converte uma data para ISO-8601"""
+        if not value:
+            self.missing[column] += 1
+            return None
+        
+        result = self._parse_cached(value, column) if isinstance(value, str) else None
+        if result is None:
+            self.unparseable[column] += 1
+        return result
+    
+    def report(self) -> Dict[Optional[str], Dict[str, int]]:
+        """Contagens de datas ausentes e irreconhecíveis por coluna"""
+        return {
+            column: {'missing': self.missing[column], 'unparseable': self.unparseable[column]}
+            for column in sorted(set(self.missing) | set(self.unparseable), key=str)
+        }
+    
+    def take_report(self) -> Dict[Optional[str], Dict[str, int]]:
+        """Retorna o relatório e zera as contagens (o cache é mantido)"""
+        report = self.report()
+        self.missing.clear()
+        self.unparseable.clear()
+        return report
+
+
+def merge_date_reports(total: Dict, report: Dict) -> Dict:
+    """Acumula um relatório de datas em outro"""
+    for column, counts in report.items():
+        entry = total.setdefault(column, {'missing': 0, 'unparseable': 0})
+        for key, value in counts.items():
+            entry[key] += value
+    return total
+
+
+class MigrationLog:
+    """Log de migração com contadores por tipo e gravação em streaming
+    
+    Sem filepath as entradas ficam em memória (execuções pequenas). Com
+    filepath são gravadas em NDJSON em lotes de buffer_size. errors_only
+    registra apenas erros (sucessos só nos contadores) e summary_every
+    acrescenta um resumo das contagens a cada N entidades processadas.
+    """
+    
+    def __init__(
+        self,
+        filepath: Optional[str] = None,
+        errors_only: bool = False,
+        summary_every: int = 0,
+        buffer_size: int = 1000,
+        append: bool = False
+    ):
+        self.filepath = filepath
+        self.errors_only = errors_only
+        self.summary_every = summary_every
+        self.buffer_size = buffer_size
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        self.processed = 0
+        self.entries: List[Dict] = []
+        self._file = open(filepath, 'a' if append else 'w', encoding='utf-8') if filepath else None
+    
+    def __getstate__(self) -> Dict:
+        # Logs de workers trafegam entre processos sem o arquivo
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+    
+    def record(self, status: str, entity_type: str, entity_name: Any, error: Optional[str] = None):
+        """Registra o resultado da migração de uma entidade"""
+        self.counts[entity_type][status] += 1
+        self.processed += 1
+        
+        if status == 'error' or not self.errors_only:
+            entry = {'status': status, 'type': entity_type, 'name': entity_name}
+            if error is not None:
+                entry['error'] = error
+            entry['timestamp'] = datetime.now().isoformat()
+            self._append(entry)
+        
+        if self.summary_every and self.processed % self.summary_every == 0:
+            self._append(self.summary_entry())
+    
+    def merge(self, other: 'MigrationLog'):
+        """Incorpora entradas e contadores de outro log (ex.: de um worker)"""
+        before = self.processed
+        for entity_type, counter in other.counts.items():
+            self.counts[entity_type].update(counter)
+        self.processed += other.processed
+        
+        for entry in other.entries:
+            self._append(entry)
+        
+        if self.summary_every and before // self.summary_every != self.processed // self.summary_every:
+            self._append(self.summary_entry())
+    
+    def restore_counts(self, summary: Dict[str, Dict[str, int]]):
+        """Restaura contadores salvos com summary()"""
+        for entity_type, counter in summary.items():
+            self.counts[entity_type].update(counter)
+            self.processed += sum(counter.values())
+    
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Contagens por tipo de entidade e status"""
+        return {entity_type: dict(counter) for entity_type, counter in self.counts.items()}
+    
+    def summary_entry(self) -> Dict:
+        return {
+            'status': 'summary',
+            'processed': self.processed,
+            'counts': self.summary(),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    @property
+    def error_count(self) -> int:
+        return sum(counter['error'] for counter in self.counts.values())
+    
+    def _append(self, entry: Dict):
+        self.entries.append(entry)
+        if self._file is not None and len(self.entries) >= self.buffer_size:
+            self.flush()
+    
+    def flush(self, sync: bool = False):
+        """Grava as entradas pendentes no arquivo"""
+        if self._file is None:
+            return
+        
+        self._file.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self.entries))
+        self.entries.clear()
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        """Grava as entradas pendentes e fecha o arquivo (pode ser repetido)"""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self) -> 'MigrationLog':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def iter_entries(self) -> Iterator[Dict]:
+        """Todas as entradas registradas, em ordem"""
+        if self.filepath is None:
+            yield from self.entries
+            return
+        
+        self.flush()
+        yield from _iter_ndjson(self.filepath)
+        yield from self.entries
+
 
 class DataMigrationTool:
     """Ferramenta para migração de dados entre sistemas"""
     
-    def __init__(self, source_format: str, target_format: str):
+    def __init__(
+        self,
+        source_format: str,
+        target_format: str,
+        log: Optional[MigrationLog] = None,
+        code_allocator: Optional[ClassCodeAllocator] = None
+    ):
         self.source_format = source_format
         self.target_format = target_format
-        self.migration_log = []
+        self.log = log if log is not None else MigrationLog()
+        self.date_parser = DateParser()
+        self.code_allocator = code_allocator if code_allocator is not None else get_class_code_allocator()
+    
+    @property
+    def migration_log(self) -> List[Dict]:
+        """Todas as entradas do log
+        
+        Com um log gravado em arquivo, o arquivo inteiro é lido de volta; em
+        execuções grandes prefira log.iter_entries().
+        """
+        if self.log.filepath is None:
+            return self.log.entries
+        return list(self.log.iter_entries())
+    
+    def close(self):
+        """Fecha o log de migração"""
+        self.log.close()
+    
+    def __enter__(self) -> 'DataMigrationTool':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
     
     def migrate_users(self, source_data: List[Dict]) -> List[Dict]:
         """Migra dados de usuários"""
@@ -25,11 +286,13 @@ class DataMigrationTool:
         for user in source_data:
             try:
                 migrated_user = {
-                    'id': self._generate_uuid(user.get('email', '')),
+                    'id': self.user_id_for(user),
                     'email': user.get('email', '').lower().strip(),
                     'full_name': user.get('name', user.get('full_name', '')),
                     'role': self._normalize_role(user.get('type', user.get('role', 'student'))),
-                    'created_at': self._parse_date(user.get('created_at', user.get('registration_date'))),
+                    'created_at': self._parse_date(
+                        user.get('created_at', user.get('registration_date')), 'user.created_at'
+                    ),
                     'avatar_url': user.get('avatar', user.get('profile_picture')),
                 }
                 
@@ -55,12 +318,12 @@ class DataMigrationTool:
                     continue
                 
                 migrated_class = {
-                    'id': self._generate_uuid(class_data.get('name', '') + str(teacher_id)),
+                    'id': self.class_id_for(class_data, teacher_id),
                     'name': class_data.get('name', class_data.get('title', '')),
                     'description': class_data.get('description', ''),
-                    'code': self._generate_class_code(),
+                    'code': None,
                     'teacher_id': teacher_id,
-                    'created_at': self._parse_date(class_data.get('created_at')),
+                    'created_at': self._parse_date(class_data.get('created_at'), 'class.created_at'),
                 }
                 
                 migrated_classes.append(migrated_class)
@@ -69,6 +332,10 @@ class DataMigrationTool:
             except Exception as e:
                 self._log_error('class', class_data.get('name'), str(e))
         
+        # Códigos reservados de uma vez, só para as turmas migradas
+        for migrated_class, code in zip(migrated_classes, self._generate_class_codes(len(migrated_classes))):
+            migrated_class['code'] = code
+        
         return migrated_classes
     
     def migrate_materials(self, source_data: List[Dict], mappings: Dict) -> List[Dict]:
@@ -93,7 +360,7 @@ class DataMigrationTool:
                     'class_id': class_id,
                     'video_type': self._detect_video_type(material.get('video_url')),
                     'video_url': material.get('video_url'),
-                    'created_at': self._parse_date(material.get('created_at')),
+                    'created_at': self._parse_date(material.get('created_at'), 'material.created_at'),
                 }
                 
                 migrated_materials.append(migrated_material)
@@ -104,6 +371,14 @@ class DataMigrationTool:
         
         return migrated_materials
     
+    def user_id_for(self, user: Dict) -> str:
+        """ID determinístico de um usuário legado"""
+        return self._generate_uuid(user.get('email', ''))
+    
+    def class_id_for(self, class_data: Dict, teacher_id: str) -> str:
+        """ID determinístico de uma turma legada"""
+        return self._generate_uuid(class_data.get('name', '') + str(teacher_id))
+    
     def _generate_uuid(self, seed: str) -> str:
         """Gera UUID determinístico baseado em seed"""
         hash_obj = hashlib.md5(seed.encode())
@@ -122,37 +397,19 @@ class DataMigrationTool:
         else:
             return 'student'  # default
     
-    def _parse_date(self, date_str: Optional[str]) -> str:
-        """Parseia e formata datas"""
-        if not date_str:
-            return datetime.now().isoformat()
-        
-        try:
-            # Tenta vários formatos
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d',
-                '%d/%m/%Y',
-                '%d/%m/%Y %H:%M:%S',
-            ]
-            
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    return dt.isoformat()
-                except ValueError:
-                    continue
-            
-            return datetime.now().isoformat()
-            
-        except Exception:
-            return datetime.now().isoformat()
+    def _parse_date(self, date_str: Optional[str], column: Optional[str] = None) -> Optional[str]:
+        """Parseia e formata datas (None se ausente ou em formato desconhecido)"""
+        return self.date_parser.parse(date_str, column)
     
     def _generate_class_code(self) -> str:
         """Gera código único de turma"""
-        import random
-        import string
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        return self._generate_class_codes(1)[0]
+    
+    def _generate_class_codes(self, count: int) -> List[Optional[str]]:
+        """Reserva códigos únicos de turma (None sem alocador, ex.: workers do pipeline)"""
+        if self.code_allocator is None:
+            return [None] * count
+        return self.code_allocator.reserve(count)
     
     def _detect_video_type(self, url: Optional[str]) -> Optional[str]:
         """Detecta tipo de vídeo pela URL"""
@@ -168,70 +425,184 @@ class DataMigrationTool:
     
     def _log_success(self, entity_type: str, entity_name: str):
         """Registra migração bem-sucedida"""
-        self.migration_log.append({
-            'status': 'success',
-            'type': entity_type,
-            'name': entity_name,
-            'timestamp': datetime.now().isoformat()
-        })
+        self.log.record('success', entity_type, entity_name)
     
     def _log_error(self, entity_type: str, entity_name: str, error: str):
         """Registra erro de migração"""
-        self.migration_log.append({
-            'status': 'error',
-            'type': entity_type,
-            'name': entity_name,
-            'error': error,
-            'timestamp': datetime.now().isoformat()
-        })
+        self.log.record('error', entity_type, entity_name, error)
     
     def export_migration_log(self, filepath: str):
         """Exporta log de migração"""
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.migration_log, f, indent=2, ensure_ascii=False)
+            json.dump(list(self.log.iter_entries()), f, indent=2, ensure_ascii=False)
+
+
+class ImportStats:
+    """Contadores de uma importação em streaming"""
+    
+    def __init__(self):
+        self.rows = 0
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+    
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+    
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+    
+    def __str__(self) -> str:
+        return f"{self.rows} linhas em {self.elapsed:.1f}s ({self.rows_per_second:,.0f} linhas/s)"
 
 
 class CSVImporter:
     """Importador de dados CSV"""
     
+    # Campo de destino → nomes de coluna aceitos, em ordem de prioridade
+    STUDENT_COLUMNS = {
+        'email': ('email', 'Email'),
+        'full_name': ('name', 'Name', 'full_name'),
+    }
+    GRADE_COLUMNS = {
+        'student_email': ('student_email', 'Student Email'),
+        'quiz_title': ('quiz', 'Quiz'),
+        'score': ('score', 'Score'),
+        'completed_at': ('date', 'Date'),
+    }
+    
     @staticmethod
-    def import_students_from_csv(filepath: str) -> List[Dict]:
-        """Importa alunos de arquivo CSV"""
-        students = []
+    def _open(filepath: str):
+        """Abre o CSV como texto, descompactando gzip de forma transparente"""
+        with open(filepath, 'rb') as f:
+            is_gzip = f.read(2) == b'\x1f\x8b'
+        
+        if is_gzip:
+            return gzip.open(filepath, 'rt', encoding='utf-8', newline='')
+        return open(filepath, 'r', encoding='utf-8', newline='')
+    
+    @staticmethod
+    def _resolve_columns(header: List[str], aliases: Dict[str, Tuple[str, ...]]) -> Dict[str, Optional[int]]:
+        """Resolve uma única vez o índice da coluna de cada campo"""
+        positions = {}
+        for index, name in enumerate(header):
+            # Como no DictReader, colunas repetidas usam a última ocorrência
+            positions[name] = index
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        return {
+            field: next((positions[name] for name in names if name in positions), None)
+            for field, names in aliases.items()
+        }
+    
+    @classmethod
+    def _iter_rows(
+        cls,
+        filepath: str,
+        aliases: Dict[str, Tuple[str, ...]],
+        build: Callable[[Callable[[str, Any], Any]], Dict],
+        stats: Optional[ImportStats],
+        progress_every: int,
+        on_progress: Optional[Callable[[ImportStats], None]]
+    ) -> Iterator[Dict]:
+        stats = stats if stats is not None else ImportStats()
+        
+        with cls._open(filepath) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                stats.finished_at = time.perf_counter()
+                return
+            
+            columns = cls._resolve_columns(header, aliases)
+            row = []
+            
+            def value(field: str, default: Any) -> Any:
+                index = columns[field]
+                if index is None:
+                    return default
+                # Linhas curtas: o DictReader preenche campos ausentes com None
+                return row[index] if index < len(row) else None
             
             for row in reader:
-                student = {
-                    'email': row.get('email', row.get('Email', '')),
-                    'full_name': row.get('name', row.get('Name', row.get('full_name', ''))),
-                    'role': 'student'
-                }
+                if not row:
+                    continue
                 
-                students.append(student)
+                yield build(value)
+                
+                stats.rows += 1
+                if on_progress is not None and progress_every and stats.rows % progress_every == 0:
+                    on_progress(stats)
+        
+        stats.finished_at = time.perf_counter()
+    
+    @classmethod
+    def iter_students_from_csv(
+        cls,
+        filepath: str,
+        stats: Optional[ImportStats] = None,
+        progress_every: int = 0,
+        on_progress: Optional[Callable[[ImportStats], None]] = None
+    ) -> Iterator[Dict]:
+        """Importa alunos de arquivo CSV (ou .csv.gz) em streaming
         
-        return students
+        on_progress(stats) é chamado a cada progress_every linhas.
+        """
+        return cls._iter_rows(
+            filepath,
+            cls.STUDENT_COLUMNS,
+            lambda value: {
+                'email': value('email', ''),
+                'full_name': value('full_name', ''),
+                'role': 'student'
+            },
+            stats,
+            progress_every,
+            on_progress
+        )
+    
+    @classmethod
+    def iter_grades_from_csv(
+        cls,
+        filepath: str,
+        stats: Optional[ImportStats] = None,
+        progress_every: int = 0,
+        on_progress: Optional[Callable[[ImportStats], None]] = None
+    ) -> Iterator[Dict]:
+        """Importa notas de arquivo CSV (ou .csv.gz) em streaming
+        
+        on_progress(stats) é chamado a cada progress_every linhas.
+        """
+        return cls._iter_rows(
+            filepath,
+            cls.GRADE_COLUMNS,
+            lambda value: {
+                'student_email': value('student_email', ''),
+                'quiz_title': value('quiz_title', ''),
+                'score': float(value('score', 0)),
+                'completed_at': value('completed_at', ''),
+            },
+            stats,
+            progress_every,
+            on_progress
+        )
+    
+    @staticmethod
+    def iter_batches(rows: Iterable[Dict], batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """Agrupa linhas importadas em lotes de tamanho fixo"""
+        return iter_chunks(rows, batch_size)
+    
+    @staticmethod
+    def import_students_from_csv(filepath: str) -> List[Dict]:
+        """Importa alunos de arquivo CSV"""
+        return list(CSVImporter.iter_students_from_csv(filepath))
     
     @staticmethod
     def import_grades_from_csv(filepath: str) -> List[Dict]:
         """Importa notas de arquivo CSV"""
-        grades = []
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            for row in reader:
-                grade = {
-                    'student_email': row.get('student_email', row.get('Student Email', '')),
-                    'quiz_title': row.get('quiz', row.get('Quiz', '')),
-                    'score': float(row.get('score', row.get('Score', 0))),
-                    'completed_at': row.get('date', row.get('Date', '')),
-                }
-                
-                grades.append(grade)
-        
-        return grades
+        return list(CSVImporter.iter_grades_from_csv(filepath))
 
 
 class JSONExporter:
@@ -289,6 +660,7 @@ def batch_migrate_from_legacy_system(
     
     # Exporta log
     migrator.export_migration_log(f"{output_dir}/migration_log.json")
+    migrator.close()
     
     print(f"Migração concluída!")
     print(f"- Usuários migrados: {len(migrated_users)}")
@@ -297,10 +669,392 @@ def batch_migrate_from_legacy_system(
     return {
         'users': migrated_users,
         'classes': migrated_classes,
-        'log': migrator.migration_log
+        'log': migrator.migration_log,
+        'dates': migrator.date_parser.report()
     }
 
 
+def iter_json_array(filepath: str, read_size: int = 1 << 16) -> Iterator[Any]:
+    """Lê os elementos de um array JSON de forma incremental
+    
+    Apenas o elemento corrente e um bloco de read_size caracteres ficam em
+    memória, independente do tamanho do arquivo.
+    """
+    decoder = json.JSONDecoder()
+    
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+        state = 'start'
+        
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            
+            if position == len(buffer) or state == 'value':
+                # Valores só são aceitos se não terminarem no fim do bloco
+                # (um número como 12|34 pode continuar no próximo bloco)
+                if state == 'value' and position < len(buffer):
+                    try:
+                        item, end = decoder.raw_decode(buffer, position)
+                        if end < len(buffer) or eof:
+                            yield item
+                            position = end
+                            state = 'separator'
+                            continue
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                
+                if eof:
+                    raise ValueError(f"Array JSON incompleto em {filepath}")
+                
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            
+            char = buffer[position]
+            
+            if state == 'start':
+                if char != '[':
+                    raise ValueError(f"{filepath} não contém um array JSON")
+                state = 'first'
+                position += 1
+            elif state == 'first':
+                if char == ']':
+                    return
+                state = 'value'
+            elif char == ',':
+                state = 'value'
+                position += 1
+            elif char == ']':
+                return
+            else:
+                raise ValueError(f"Separador inesperado {char!r} em {filepath}")
+
+
+_pipeline_state = {}
+_pipeline_date_parser = None
+
+
+def _pipeline_migrator() -> DataMigrationTool:
+    """Migrador de um chunk, reaproveitando o parser de datas do processo"""
+    global _pipeline_date_parser
+    if _pipeline_date_parser is None:
+        _pipeline_date_parser = DateParser()
+    
+    # Códigos de turma são reservados pelo processo principal, evitando
+    # colisões entre workers
+    migrator = DataMigrationTool(
+        'legacy', 'lumina', MigrationLog(errors_only=_pipeline_state.get('errors_only', False))
+    )
+    migrator.code_allocator = None
+    migrator.date_parser = _pipeline_date_parser
+    return migrator
+
+
+def _init_pipeline_worker(state: Dict):
+    """Inicializa um worker do pipeline de migração"""
+    global _pipeline_state
+    _pipeline_state = state
+
+
+def _migrate_users_chunk(chunk: List[Dict]) -> Tuple[List[Dict], MigrationLog, Dict]:
+    """Migra um chunk de usuários, retornando registros, log e relatório de datas"""
+    migrator = _pipeline_migrator()
+    migrated = migrator.migrate_users(chunk)
+    return migrated, migrator.log, migrator.date_parser.take_report()
+
+
+def _migrate_classes_chunk(chunk: List[Dict]) -> Tuple[List[Dict], MigrationLog, Dict]:
+    """Migra um chunk de turmas com o mapeamento de usuários do worker"""
+    migrator = _pipeline_migrator()
+    migrated = migrator.migrate_classes(chunk, _pipeline_state['user_mapping'])
+    return migrated, migrator.log, migrator.date_parser.take_report()
+
+
+def _map_chunks(
+    func: Callable,
+    chunks: Iterable[List[Dict]],
+    processes: Optional[int],
+    state: Dict
+) -> Iterator[Tuple[List[Dict], MigrationLog, Dict]]:
+    """Aplica func aos chunks em ordem, com até 2 chunks pendentes por processo"""
+    global _pipeline_state
+    
+    if not processes or processes <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        _pipeline_state = state
+        try:
+            for chunk in chunks:
+                yield func(chunk)
+        finally:
+            _pipeline_state = {}
+        return
+    
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes, initializer=_init_pipeline_worker, initargs=(state,)) as pool:
+        # Pool.imap consumiria toda a entrada; a fila limitada mantém a memória
+        # proporcional ao tamanho do chunk
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(func, (chunk,)))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+        
+        while pending:
+            yield pending.popleft().get()
+
+
+CHECKPOINT_FILE = 'migration_checkpoint.json'
+CHECKPOINT_VERSION = 1
+PIPELINE_PHASES = ('users', 'classes')
+
+
+def _load_checkpoint(path: str) -> Optional[Dict]:
+    """Carrega o checkpoint de uma migração, se existir"""
+    if not os.path.exists(path):
+        return None
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Versão de checkpoint não suportada: {state.get('version')}")
+    return state
+
+
+def _save_checkpoint(path: str, state: Dict):
+    """Grava o checkpoint de forma atômica"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _input_fingerprint(legacy_data_dir: str) -> Dict[str, List[int]]:
+    """Tamanho e mtime de cada arquivo de entrada, gravados no checkpoint"""
+    fingerprint = {}
+    for phase in PIPELINE_PHASES:
+        stat = os.stat(f"{legacy_data_dir}/{phase}.json")
+        fingerprint[phase] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def _iter_ndjson(filepath: str) -> Iterator[Dict]:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def pipelined_migrate_from_legacy_system(
+    legacy_data_dir: str,
+    output_dir: str,
+    chunk_size: int = 5000,
+    processes: Optional[int] = None,
+    checkpoint_every: Optional[int] = 10,
+    resume: bool = True,
+    errors_only: bool = False,
+    summary_every: int = 0,
+    code_allocator: Optional[ClassCodeAllocator] = None
+) -> Dict[str, Any]:
+    """Executa migração de sistema legado em pipeline
+    
+    Os arrays de entrada são lidos incrementalmente e migrados em chunks
+    (em um pool de processos quando processes > 1). Usuários, turmas e log
+    são gravados em NDJSON à medida que cada chunk termina, na ordem de
+    entrada. Retorna apenas contagens (incluindo datas ausentes ou não
+    reconhecidas por coluna) e caminhos dos arquivos gerados.
+    
+    A cada checkpoint_every chunks o progresso (posição em cada arquivo de
+    entrada e tamanho das saídas) é gravado em migration_checkpoint.json.
+    Com resume, uma nova execução descarta o que foi gravado após o último
+    checkpoint e continua dali; o mapeamento de usuários é reconstruído a
+    partir de migrated_users.ndjson. O checkpoint guarda tamanho e mtime dos
+    arquivos de entrada e é ignorado (a migração recomeça) se eles mudaram.
+    
+    Entidades cujo ID determinístico já foi migrado com sucesso são
+    ignoradas e contadas em 'skipped'. O conjunto de IDs migrados e o
+    mapeamento de usuários ficam em memória e crescem com o número de
+    entidades distintas, não com chunk_size.
+    
+    O log é gravado em lotes (ver MigrationLog); com errors_only apenas
+    erros e, se summary_every > 0, resumos periódicos são registrados.
+    
+    Os códigos das turmas são reservados por chunk em code_allocator (o
+    alocador compartilhado, se omitido), que recebe também os códigos já
+    gravados em uma retomada.
+    """
+    outputs = {
+        'users': f"{output_dir}/migrated_users.ndjson",
+        'classes': f"{output_dir}/migrated_classes.ndjson",
+        'log': f"{output_dir}/migration_log.ndjson",
+    }
+    checkpoint_path = f"{output_dir}/{CHECKPOINT_FILE}"
+    
+    inputs = _input_fingerprint(legacy_data_dir)
+    state = _load_checkpoint(checkpoint_path) if resume and checkpoint_every else None
+    if state is not None and state.get('inputs') != inputs:
+        print("Arquivos de entrada alterados desde o checkpoint; recomeçando a migração.")
+        state = None
+    
+    if state is None:
+        print("Iniciando migração de dados (pipeline)...")
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'inputs': inputs,
+            'phase': PIPELINE_PHASES[0],
+            'offsets': {phase: 0 for phase in PIPELINE_PHASES},
+            'sizes': {name: 0 for name in outputs},
+            'counts': {'users': 0, 'classes': 0, 'errors': 0, 'skipped': 0},
+            'dates': {},
+            'log': {},
+        }
+    elif state['phase'] == 'done':
+        print("Migração já concluída (checkpoint encontrado).")
+        return {**state['counts'], 'dates': state['dates'], 'log': state.get('log', {}), 'outputs': outputs}
+    else:
+        print(f"Retomando migração de dados: {state['phase']} a partir do registro "
+              f"{state['offsets'][state['phase']]}...")
+    
+    counts = state['counts']
+    dates = state['dates']
+    
+    # Descarta o que foi gravado após o último checkpoint
+    for name, path in outputs.items():
+        with open(path, 'a'):
+            pass
+        os.truncate(path, state['sizes'][name])
+    
+    # Reconstrói o mapeamento e os IDs já migrados a partir das saídas
+    user_mapping = {}
+    migrated_ids = {'users': set(), 'classes': set()}
+    for user in _iter_ndjson(outputs['users']):
+        user_mapping[user['email']] = user['id']
+        migrated_ids['users'].add(user['id'])
+    existing_codes = []
+    for class_data in _iter_ndjson(outputs['classes']):
+        migrated_ids['classes'].add(class_data['id'])
+        existing_codes.append(class_data['code'])
+    
+    if code_allocator is None:
+        code_allocator = get_class_code_allocator()
+    code_allocator.add_used(existing_codes)
+    del existing_codes
+    
+    id_tool = DataMigrationTool('legacy', 'lumina')
+    
+    def class_id(class_data: Dict) -> Optional[str]:
+        teacher_id = user_mapping.get(class_data.get('teacher_email', class_data.get('instructor')))
+        return id_tool.class_id_for(class_data, teacher_id) if teacher_id else None
+    
+    entity_ids = {'users': id_tool.user_id_for, 'classes': class_id}
+    workers = {'users': _migrate_users_chunk, 'classes': _migrate_classes_chunk}
+    
+    log = MigrationLog(outputs['log'], errors_only, summary_every, append=True)
+    log.restore_counts(state.get('log', {}))
+    
+    def save_checkpoint(out):
+        out.flush()
+        os.fsync(out.fileno())
+        log.flush(sync=True)
+        state['sizes'] = {name: os.path.getsize(path) for name, path in outputs.items()}
+        state['log'] = log.summary()
+        _save_checkpoint(checkpoint_path, state)
+    
+    worker_state = {'errors_only': errors_only}
+    
+    try:
+        for phase_index, phase in enumerate(PIPELINE_PHASES):
+            if phase_index < PIPELINE_PHASES.index(state['phase']):
+                continue
+            
+            # (registros lidos, registros ignorados) de cada chunk em andamento
+            pending_chunks = deque()
+            
+            def source_chunks(phase=phase) -> Iterator[List[Dict]]:
+                items = iter_json_array(f"{legacy_data_dir}/{phase}.json")
+                for _ in islice(items, state['offsets'][phase]):
+                    pass
+                
+                for chunk in iter_chunks(items, chunk_size):
+                    pending = []
+                    for record in chunk:
+                        try:
+                            entity_id = entity_ids[phase](record)
+                        except Exception:
+                            # Registros inválidos seguem para o worker, que registra o erro
+                            entity_id = None
+                        
+                        # IDs só entram em migrated_ids depois de migrados com
+                        # sucesso; duplicatas ainda em andamento são filtradas
+                        # ao receber o resultado
+                        if entity_id is not None and entity_id in migrated_ids[phase]:
+                            continue
+                        pending.append(record)
+                    
+                    pending_chunks.append((len(chunk), len(chunk) - len(pending)))
+                    yield pending
+            
+            if phase == 'classes':
+                worker_state['user_mapping'] = user_mapping
+            
+            with open(outputs[phase], 'a') as out:
+                results = _map_chunks(workers[phase], source_chunks(), processes, worker_state)
+                for done, (migrated, chunk_log, date_report) in enumerate(results, 1):
+                    read, skipped = pending_chunks.popleft()
+                    
+                    unique = []
+                    for record in migrated:
+                        if record['id'] in migrated_ids[phase]:
+                            skipped += 1
+                            continue
+                        migrated_ids[phase].add(record['id'])
+                        unique.append(record)
+                    migrated = unique
+                    
+                    if phase == 'classes':
+                        for record, code in zip(migrated, code_allocator.reserve(len(migrated))):
+                            record['code'] = code
+                    
+                    for record in migrated:
+                        if phase == 'users':
+                            user_mapping[record['email']] = record['id']
+                        out.write(json.dumps(record) + '\n')
+                    
+                    counts[phase] += len(migrated)
+                    counts['skipped'] += skipped
+                    counts['errors'] += chunk_log.error_count
+                    log.merge(chunk_log)
+                    merge_date_reports(dates, date_report)
+                    state['offsets'][phase] += read
+                    
+                    if checkpoint_every and done % checkpoint_every == 0:
+                        save_checkpoint(out)
+                
+                next_index = phase_index + 1
+                state['phase'] = PIPELINE_PHASES[next_index] if next_index < len(PIPELINE_PHASES) else 'done'
+                if checkpoint_every:
+                    save_checkpoint(out)
+    finally:
+        log.close()
+    
+    print(f"Migração concluída!")
+    print(f"- Usuários migrados: {counts['users']}")
+    print(f"- Turmas migradas: {counts['classes']}")
+    if counts['skipped']:
+        print(f"- Registros já migrados ignorados: {counts['skipped']}")
+    for column, date_counts in dates.items():
+        if date_counts['unparseable']:
+            print(f"- Datas não reconhecidas em {column}: {date_counts['unparseable']}")
+    
+    return {**counts, 'dates': dates, 'log': log.summary(), 'outputs': outputs}
+
+
 if __name__ == "__main__":
     # Exemplo de uso
     print("Data Migration Tool - LUMINA")
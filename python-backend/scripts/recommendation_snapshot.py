@@ -0,0 +1,248 @@
+"""
+Snapshots do Motor de Recomendação
+Persistência das estruturas derivadas em arrays planos para memory-map
+"""
+
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from scripts.ai_recommendations import (
+    ContentCatalog,
+    ContentRecommendationEngine,
+    UserItemIndex,
+    UserProfileStore,
+)
+
+
+MANIFEST_FILE = 'manifest.json'
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotUserItemIndex:
+    """Índice invertido somente leitura sobre arrays CSR (usuário ↔ item)
+    
+    Oferece a mesma interface de consulta de UserItemIndex. Os códigos de
+    usuário seguem a ordem de inserção original, usada nos desempates.
+    """
+    
+    def __init__(
+        self,
+        user_ids: List[str],
+        item_ids: List[str],
+        user_indptr: np.ndarray,
+        user_items: np.ndarray,
+        item_indptr: np.ndarray,
+        item_users: np.ndarray
+    ):
+        self.source = None
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_position = {user_id: code for code, user_id in enumerate(user_ids)}
+        self.user_indptr = user_indptr
+        self.user_items = user_items
+        self.item_indptr = item_indptr
+        self.item_users = item_users
+        self.user_sizes = np.diff(user_indptr)
+    
+    def thaw(self) -> UserItemIndex:
+        """Materializa uma cópia mutável (UserItemIndex) do índice"""
+        return UserItemIndex({user_id: self.items_of(user_id) for user_id in self.user_ids})
+    
+    def _item_codes(self, code: int) -> np.ndarray:
+        return self.user_items[self.user_indptr[code]:self.user_indptr[code + 1]]
+    
+    def items_of(self, user_id: str) -> List[str]:
+        """Itens distintos do usuário na ordem da primeira interação"""
+        code = self.user_position.get(user_id)
+        if code is None:
+            return []
+        return [self.item_ids[item] for item in self._item_codes(code)]
+    
+    def similar_users(
+        self,
+        user_id: str,
+        threshold: float = 0.3,
+        limit: int = 5
+    ) -> List[Tuple[str, float]]:
+        """Retorna os usuários mais similares (Jaccard) acima do threshold"""
+        code = self.user_position.get(user_id)
+        if code is None:
+            return []
+        
+        items = self._item_codes(code)
+        if not len(items):
+            return []
+        
+        # Concatena as listas de usuários de cada item do usuário
+        lengths = self.item_indptr[items + 1] - self.item_indptr[items]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        postings = self.item_users[np.repeat(self.item_indptr[items], lengths) + offsets]
+        
+        others, intersections = np.unique(postings, return_counts=True)
+        keep = others != code
+        others = others[keep]
+        intersections = intersections[keep]
+        
+        union = len(items) + self.user_sizes[others] - intersections
+        similarity = intersections / union
+        
+        above = similarity > threshold
+        others = others[above]
+        similarity = similarity[above]
+        
+        order = np.lexsort((others, -similarity))[:limit]
+        return [(self.user_ids[others[i]], float(similarity[i])) for i in order]
+
+
+def _index_arrays(index: UserItemIndex) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Converte o índice mutável em arrays CSR"""
+    item_position = {}
+    user_indptr = [0]
+    user_items = []
+    
+    for user_id in index.user_order:
+        # Itens distintos na ordem da primeira interação
+        for item_id in dict.fromkeys(index.items_of(user_id)):
+            user_items.append(item_position.setdefault(item_id, len(item_position)))
+        user_indptr.append(len(user_items))
+    
+    user_indptr = np.array(user_indptr, dtype=np.int64)
+    user_items = np.array(user_items, dtype=np.int32)
+    
+    # Transposta: item → usuários, ordenados por código de usuário
+    item_of_entry = user_items
+    user_of_entry = np.repeat(np.arange(len(user_indptr) - 1, dtype=np.int32), np.diff(user_indptr))
+    order = np.argsort(item_of_entry, kind='stable')
+    item_indptr = np.concatenate((
+        [0], np.cumsum(np.bincount(item_of_entry, minlength=len(item_position)))
+    )).astype(np.int64)
+    
+    labels = {'user_ids': list(index.user_order), 'item_ids': list(item_position)}
+    arrays = {
+        'user_indptr': user_indptr,
+        'user_items': user_items,
+        'item_indptr': item_indptr,
+        'item_users': user_of_entry[order],
+    }
+    return labels, arrays
+
+
+def save_engine_snapshot(engine: ContentRecommendationEngine, directory: str):
+    """Salva índice de interações, catálogo e perfis do motor em um diretório
+    
+    Cada estrutura vira um conjunto de arquivos .npy planos; os ids ficam
+    em manifest.json. Estruturas ainda não construídas são omitidas.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'version': SNAPSHOT_VERSION}
+    arrays = {}
+    
+    index = engine.user_item_index
+    if index is not None:
+        if isinstance(index, SnapshotUserItemIndex):
+            labels = {'user_ids': index.user_ids, 'item_ids': index.item_ids}
+            index_arrays = {
+                'user_indptr': index.user_indptr,
+                'user_items': index.user_items,
+                'item_indptr': index.item_indptr,
+                'item_users': index.item_users,
+            }
+        else:
+            labels, index_arrays = _index_arrays(index)
+        manifest['index'] = labels
+        arrays.update({f"index_{name}": value for name, value in index_arrays.items()})
+    
+    catalog = engine.content_catalog
+    if catalog is not None:
+        manifest['catalog'] = {
+            'content_ids': catalog.content_ids,
+            'tag_vocabulary': list(catalog.tag_vocabulary),
+        }
+        arrays.update({
+            'catalog_indptr': catalog.indptr,
+            'catalog_tag_indices': catalog.tag_indices,
+            'catalog_row_of_entry': catalog.row_of_entry,
+            'catalog_difficulties': catalog.difficulties,
+        })
+    
+    profiles = engine.user_profiles
+    if isinstance(profiles, UserProfileStore):
+        if profiles.overrides:
+            profiles = profiles.compacted(catalog)
+        manifest['profiles'] = {
+            'user_ids': profiles.user_ids,
+            'n_tags': profiles.n_tags,
+            'n_content': profiles.n_content,
+        }
+        arrays.update({
+            'profiles_indptr': profiles.indptr,
+            'profiles_tags': profiles.tags,
+            'profiles_weights': profiles.weights,
+            'profiles_difficulty_sums': profiles.difficulty_sums,
+            'profiles_history_counts': profiles.history_counts,
+            'profiles_consumed_indptr': profiles.consumed_indptr,
+            'profiles_consumed_positions': profiles.consumed_positions,
+        })
+    
+    for name, value in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.asarray(value))
+    
+    # O manifest é gravado por último: sua presença indica snapshot completo
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def load_engine_snapshot(directory: str, mmap: bool = True) -> ContentRecommendationEngine:
+    """Carrega um snapshot; com mmap os arrays são compartilhados entre processos"""
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Versão de snapshot não suportada: {manifest.get('version')}")
+    
+    mmap_mode = 'r' if mmap else None
+    
+    def array(name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+    
+    engine = ContentRecommendationEngine()
+    
+    if 'index' in manifest:
+        engine.user_item_index = SnapshotUserItemIndex(
+            manifest['index']['user_ids'],
+            manifest['index']['item_ids'],
+            array('index_user_indptr'),
+            array('index_user_items'),
+            array('index_item_indptr'),
+            array('index_item_users')
+        )
+    
+    if 'catalog' in manifest:
+        engine.content_catalog = ContentCatalog.from_arrays(
+            manifest['catalog']['content_ids'],
+            manifest['catalog']['tag_vocabulary'],
+            array('catalog_indptr'),
+            array('catalog_tag_indices'),
+            array('catalog_row_of_entry'),
+            array('catalog_difficulties')
+        )
+        engine.content_metadata = engine.content_catalog.content_by_id
+    
+    if 'profiles' in manifest:
+        engine.user_profiles = UserProfileStore(
+            manifest['profiles']['user_ids'],
+            manifest['profiles']['n_tags'],
+            manifest['profiles']['n_content'],
+            array('profiles_indptr'),
+            array('profiles_tags'),
+            array('profiles_weights'),
+            array('profiles_difficulty_sums'),
+            array('profiles_history_counts'),
+            array('profiles_consumed_indptr'),
+            array('profiles_consumed_positions')
+        )
+    
+    return engine
@@ -3,23 +3,27 @@ Serviço de Autenticação
 Gerencia login, registro e autenticação de usuários
 """
 
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 import bcrypt
 
+from config.settings import settings
+from services.jwt_keys import get_jwt_key_store
+from services.password_hash_pool import get_password_hash_pool
+from services.token_cache import get_token_cache
+
 
 class AuthService:
     """Serviço de autenticação de usuários"""
     
-    SECRET_KEY = "your-secret-key-here"
-    ALGORITHM = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
+    ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
     
     @staticmethod
     def hash_password(password: str) -> str:
         """Gera hash da senha"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
@@ -31,6 +35,18 @@ class AuthService:
             hashed_password.encode('utf-8')
         )
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Gera hash da senha no pool de bcrypt (PasswordHashPoolSaturated se cheio)"""
+        return await get_password_hash_pool().run(AuthService.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha no pool de bcrypt (PasswordHashPoolSaturated se cheio)"""
+        return await get_password_hash_pool().run(
+            AuthService.verify_password, plain_password, hashed_password
+        )
+    
     @classmethod
     def create_access_token(cls, user_id: str, email: str) -> str:
         """Cria token JWT de acesso"""
@@ -39,19 +55,39 @@ class AuthService:
         payload = {
             "sub": user_id,
             "email": email,
+            "iat": time.time(),  # fracionário para ordenar revogações no mesmo segundo
             "exp": expire
         }
         
-        token = jwt.encode(payload, cls.SECRET_KEY, algorithm=cls.ALGORITHM)
+        token = get_jwt_key_store().sign(payload)
         return token
     
     @classmethod
     def decode_token(cls, token: str) -> Optional[dict]:
-        """Decodifica e valida token JWT"""
+        """Decodifica e valida token JWT (payloads verificados ficam em cache)"""
+        cache = get_token_cache()
+        payload = cache.get(token)
+        if payload is None:
+            try:
+                payload = get_jwt_key_store().verify(token)
+            except jwt.InvalidTokenError:
+                return None
+            
+            if not cache.put_if_not_revoked(token, payload):
+                return None
+        
+        return dict(payload)
+    
+    @staticmethod
+    def revoke_token(token: str):
+        """Invalida um token (logout)"""
         try:
-            payload = jwt.decode(token, cls.SECRET_KEY, algorithms=[cls.ALGORITHM])
-            return payload
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.JWTError:
-            return None
+            payload = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            payload = {}
+        get_token_cache().revoke_token(token, payload.get("exp"))
+    
+    @staticmethod
+    def revoke_user_tokens(user_id: str):
+        """Invalida os tokens já emitidos para o usuário (troca de senha)"""
+        get_token_cache().revoke_subject(user_id)
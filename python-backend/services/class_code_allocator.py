@@ -0,0 +1,166 @@
+"""
+Alocador de Códigos de Turma
+Reserva códigos únicos em lote, sem colisões com códigos já usados
+"""
+
+import math
+import secrets
+import string
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+class ClassCodeAllocator:
+    """Alocador de códigos de turma com filtro de Bloom dos códigos usados
+    
+    Os códigos usados são carregados uma única vez em um filtro de Bloom;
+    cada código reservado também entra no filtro, então nenhum código é
+    emitido duas vezes. Falsos positivos apenas descartam candidatos livres.
+    Os candidatos vêm de um gerador seguro (secrets).
+    """
+    
+    # Ordem de int(code, 36): dígitos e depois letras
+    ALPHABET = string.digits + string.ascii_uppercase
+    CODE_LENGTH = 6
+    MAX_IDLE_ROUNDS = 64
+    
+    def __init__(
+        self,
+        used_codes: Iterable[str] = (),
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+        length: int = CODE_LENGTH
+    ):
+        self.length = length
+        self.space = len(self.ALPHABET) ** length
+        
+        bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_bits = np.uint64(bits)
+        self.n_hashes = max(1, round(bits / capacity * math.log(2)))
+        self.bits = np.zeros((bits + 7) // 8, dtype=np.uint8)
+        self.reserved = 0
+        self._lock = threading.Lock()
+        
+        self.add_used(used_codes)
+    
+    def _encode(self, values: np.ndarray) -> List[str]:
+        """Converte índices em códigos"""
+        powers = len(self.ALPHABET) ** np.arange(self.length - 1, -1, -1, dtype=np.uint64)
+        digits = (values[:, None] // powers) % np.uint64(len(self.ALPHABET))
+        alphabet = np.frombuffer(self.ALPHABET.encode('ascii'), dtype=np.uint8)
+        text = alphabet[digits].tobytes().decode('ascii')
+        return [text[i:i + self.length] for i in range(0, len(text), self.length)]
+    
+    def _bit_positions(self, values: np.ndarray) -> np.ndarray:
+        """Posições no filtro (hashing duplo), uma linha por valor"""
+        with np.errstate(over='ignore'):
+            h1 = values * np.uint64(0x9E3779B97F4A7C15)
+            h2 = ((values ^ (values >> np.uint64(31))) * np.uint64(0xBF58476D1CE4E5B9)) | np.uint64(1)
+            steps = np.arange(self.n_hashes, dtype=np.uint64)
+            return (h1[:, None] + steps * h2[:, None]) % self.n_bits
+    
+    def _contains(self, values: np.ndarray) -> np.ndarray:
+        positions = self._bit_positions(values)
+        present = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return present.all(axis=1)
+    
+    def _add(self, values: np.ndarray):
+        positions = self._bit_positions(values).ravel()
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.intp), masks)
+    
+    def add_used(self, codes: Iterable[str]):
+        """Marca códigos existentes como usados (códigos inválidos são ignorados)"""
+        values = np.fromiter(
+            (
+                int(code, 36) for code in codes
+                if isinstance(code, str) and len(code) == self.length and code.isalnum()
+                and code.isascii()
+            ),
+            dtype=np.uint64
+        )
+        if len(values):
+            with self._lock:
+                self._add(values)
+    
+    def _random_values(self, count: int) -> np.ndarray:
+        """Índices uniformes no espaço de códigos (rejeição evita viés do módulo)"""
+        limit = np.uint64((2 ** 64 // self.space) * self.space)
+        values = np.frombuffer(secrets.token_bytes(8 * count), dtype=np.uint64)
+        return values[values < limit] % np.uint64(self.space)
+    
+    def reserve(self, count: int) -> List[str]:
+        """Reserva count códigos únicos em uma chamada"""
+        if count <= 0:
+            return []
+        
+        accepted = []
+        missing = count
+        idle_rounds = 0
+        
+        with self._lock:
+            while missing:
+                # Sobra de candidatos cobre rejeições sem novas rodadas
+                candidates = self._random_values(missing + missing // 4 + 16)
+                
+                # Códigos só com dígitos não passam em validate_class_code
+                candidates = candidates[~self._all_digits(candidates)]
+                
+                # Remove repetidos mantendo a ordem sorteada
+                _, first = np.unique(candidates, return_index=True)
+                candidates = candidates[np.sort(first)]
+                
+                candidates = candidates[~self._contains(candidates)][:missing]
+                
+                if len(candidates):
+                    self._add(candidates)
+                    accepted.append(candidates)
+                    missing -= len(candidates)
+                    idle_rounds = 0
+                else:
+                    idle_rounds += 1
+                    if idle_rounds >= self.MAX_IDLE_ROUNDS:
+                        raise RuntimeError("Espaço de códigos de turma esgotado")
+            
+            self.reserved += count
+        
+        return self._encode(np.concatenate(accepted))
+    
+    def _all_digits(self, values: np.ndarray) -> np.ndarray:
+        base = np.uint64(len(self.ALPHABET))
+        digits_only = np.ones(len(values), dtype=bool)
+        remaining = values.copy()
+        for _ in range(self.length):
+            digits_only &= (remaining % base) < 10
+            remaining //= base
+        return digits_only
+
+
+_default_allocator: Optional[ClassCodeAllocator] = None
+_default_lock = threading.Lock()
+
+
+def get_class_code_allocator() -> ClassCodeAllocator:
+    """Alocador compartilhado do processo, iniciado com os códigos já gravados
+    
+    O filtro é local ao processo: códigos reservados ao mesmo tempo por
+    outros processos (workers da API, migrações concorrentes) não são
+    vistos, então a restrição de unicidade da coluna code no banco continua
+    sendo a garantia final na inserção.
+    """
+    global _default_allocator
+    with _default_lock:
+        if _default_allocator is None:
+            from services.class_service import ClassService
+            
+            _default_allocator = ClassCodeAllocator(ClassService.get_all_class_codes())
+        return _default_allocator
+
+
+def set_class_code_allocator(allocator: ClassCodeAllocator):
+    """Substitui o alocador compartilhado (ex.: após carregar os códigos do banco)"""
+    global _default_allocator
+    with _default_lock:
+        _default_allocator = allocator
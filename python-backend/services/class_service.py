@@ -3,21 +3,25 @@ Serviço de Turmas
 Gerencia operações relacionadas a turmas
 """
 
-import random
-import string
 from typing import List, Optional
 from datetime import datetime
 
+from services.class_code_allocator import ClassCodeAllocator, get_class_code_allocator
+
 
 class ClassService:
     """Serviço para gerenciamento de turmas"""
     
     @staticmethod
-    def generate_class_code() -> str:
+    def generate_class_code(allocator: Optional[ClassCodeAllocator] = None) -> str:
         """Gera código único de 6 caracteres para a turma"""
-        characters = string.ascii_uppercase + string.digits
-        code = ''.join(random.choices(characters, k=6))
-        return code
+        return ClassService.reserve_class_codes(1, allocator)[0]
+    
+    @staticmethod
+    def reserve_class_codes(count: int, allocator: Optional[ClassCodeAllocator] = None) -> List[str]:
+        """Reserva códigos únicos para a criação de turmas em lote"""
+        allocator = allocator if allocator is not None else get_class_code_allocator()
+        return allocator.reserve(count)
     
     @staticmethod
     def validate_class_code(code: str) -> bool:
@@ -41,6 +45,12 @@ class ClassService:
         # Implementação de consulta ao banco
         return []
     
+    @staticmethod
+    def get_all_class_codes() -> List[str]:
+        """Retorna os códigos de todas as turmas gravadas"""
+        # Implementação de consulta ao banco
+        return []
+    
     @staticmethod
     def get_teacher_classes(teacher_id: str) -> List[dict]:
         """Retorna turmas do professor"""
@@ -0,0 +1,217 @@
+"""
+Análise de Itens
+Dificuldade (p-value) e discriminação (ponto-bisserial) das questões de quizzes
+"""
+
+import csv
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.quiz_service import AnswerKey
+from utils.helpers import iter_chunks
+
+
+class ItemAnalysis:
+    """Análise de itens acumulada em blocos da matriz de acertos
+    
+    Cada bloco (tentativas × questões, 1 = acerto) atualiza apenas somas
+    suficientes, então a matriz nunca precisa estar inteira em memória e
+    análises parciais de processos diferentes podem ser mescladas. O escore
+    total de cada tentativa é o número de acertos, ou a soma de pontos com
+    points.
+    """
+    
+    # Limites usados para sinalizar questões no relatório
+    HARD_THRESHOLD = 0.2
+    EASY_THRESHOLD = 0.9
+    LOW_DISCRIMINATION = 0.2
+    
+    def __init__(
+        self,
+        n_questions: int,
+        question_ids: Optional[Sequence[str]] = None,
+        points: Optional[Sequence[int]] = None
+    ):
+        if question_ids is not None and len(question_ids) != n_questions:
+            raise ValueError("question_ids deve ter uma entrada por questão")
+        
+        self.n_questions = n_questions
+        self.question_ids = list(question_ids) if question_ids is not None else [
+            str(index + 1) for index in range(n_questions)
+        ]
+        self.points = np.ones(n_questions, dtype=np.int64) if points is None else np.asarray(points, dtype=np.int64)
+        
+        self.attempts = 0
+        self.correct = np.zeros(n_questions, dtype=np.int64)
+        self.total_sum = 0
+        self.total_squares = 0
+        self.cross = np.zeros(n_questions, dtype=np.int64)
+    
+    def update(self, correct: np.ndarray):
+        """Acumula um bloco da matriz de acertos"""
+        correct = np.asarray(correct)
+        if correct.ndim != 2 or correct.shape[1] != self.n_questions:
+            raise ValueError("O bloco deve ter uma coluna por questão")
+        
+        block = correct.astype(np.int64)
+        totals = block @ self.points
+        
+        self.attempts += len(block)
+        self.correct += block.sum(axis=0)
+        self.total_sum += int(totals.sum())
+        self.total_squares += int((totals * totals).sum())
+        self.cross += totals @ block
+    
+    def update_responses(self, responses: np.ndarray, key: AnswerKey):
+        """Acumula um bloco de respostas (índices de opção) corrigido pelo gabarito"""
+        self.update(np.asarray(responses) == key.correct_options)
+    
+    def merge(self, other: 'ItemAnalysis'):
+        """Incorpora somas de outra análise das mesmas questões"""
+        if other.n_questions != self.n_questions:
+            raise ValueError("Análises de quizzes diferentes")
+        
+        self.attempts += other.attempts
+        self.correct += other.correct
+        self.total_sum += other.total_sum
+        self.total_squares += other.total_squares
+        self.cross += other.cross
+    
+    def _correlations(self, cross: np.ndarray, total_sum: np.ndarray, total_squares: np.ndarray) -> np.ndarray:
+        """Correlação de Pearson entre acerto (0/1) e escore, por questão"""
+        n = float(self.attempts)
+        correct = self.correct.astype(np.float64)
+        total_sum = total_sum.astype(np.float64)
+        
+        item_var = n * correct - correct ** 2
+        total_var = n * total_squares.astype(np.float64) - total_sum ** 2
+        covariance = n * cross.astype(np.float64) - correct * total_sum
+        
+        denominator = np.sqrt(item_var * total_var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator > 0, covariance / denominator, np.nan)
+    
+    def results(self) -> List[Dict]:
+        """Índices de cada questão
+        
+        p_value é a proporção de acertos; point_biserial correlaciona o
+        acerto com o escore total e corrected_point_biserial com o escore
+        sem a própria questão. Índices indefinidos (sem variância) são None.
+        """
+        n = self.attempts
+        if not n:
+            return [
+                {'question_id': question_id, 'attempts': 0, 'correct': 0, 'p_value': None,
+                 'point_biserial': None, 'corrected_point_biserial': None}
+                for question_id in self.question_ids
+            ]
+        
+        totals = np.full(self.n_questions, self.total_sum, dtype=np.int64)
+        squares = np.full(self.n_questions, self.total_squares, dtype=np.int64)
+        point_biserial = self._correlations(self.cross, totals, squares)
+        
+        # Escore sem a questão: T - w·x, com x² = x
+        rest_cross = self.cross - self.points * self.correct
+        rest_totals = totals - self.points * self.correct
+        rest_squares = squares - 2 * self.points * self.cross + self.points ** 2 * self.correct
+        corrected = self._correlations(rest_cross, rest_totals, rest_squares)
+        
+        p_values = self.correct / n
+        
+        def value(number: float) -> Optional[float]:
+            return None if math.isnan(number) else float(number)
+        
+        return [
+            {
+                'question_id': self.question_ids[index],
+                'attempts': n,
+                'correct': int(self.correct[index]),
+                'p_value': float(p_values[index]),
+                'point_biserial': value(point_biserial[index]),
+                'corrected_point_biserial': value(corrected[index]),
+            }
+            for index in range(self.n_questions)
+        ]
+    
+    def flags(self, result: Dict) -> List[str]:
+        """Alertas de revisão de uma questão"""
+        flags = []
+        p_value = result['p_value']
+        discrimination = result['corrected_point_biserial']
+        
+        if p_value is not None and p_value < self.HARD_THRESHOLD:
+            flags.append('muito difícil')
+        if p_value is not None and p_value > self.EASY_THRESHOLD:
+            flags.append('muito fácil')
+        if discrimination is None or discrimination < self.LOW_DISCRIMINATION:
+            flags.append('baixa discriminação')
+        return flags
+    
+    @classmethod
+    def from_blocks(
+        cls,
+        blocks: Iterable[np.ndarray],
+        question_ids: Optional[Sequence[str]] = None,
+        points: Optional[Sequence[int]] = None
+    ) -> 'ItemAnalysis':
+        """Analisa uma sequência de blocos da matriz de acertos"""
+        analysis = None
+        for block in blocks:
+            if analysis is None:
+                analysis = cls(np.asarray(block).shape[1], question_ids, points)
+            analysis.update(block)
+        
+        if analysis is None:
+            analysis = cls(len(question_ids) if question_ids is not None else 0, question_ids, points)
+        return analysis
+
+
+def iter_correctness_blocks(filepath: str, block_size: int = 10000) -> Tuple[List[str], Iterator[np.ndarray]]:
+    """Lê uma matriz de acertos em blocos
+    
+    Aceita .npy (lido por memory-map) ou CSV com cabeçalho de ids das
+    questões e uma linha de 0/1 por tentativa.
+    """
+    if filepath.endswith('.npy'):
+        matrix = np.load(filepath, mmap_mode='r')
+        question_ids = [str(index + 1) for index in range(matrix.shape[1])]
+        blocks = (matrix[start:start + block_size] for start in range(0, len(matrix), block_size))
+        return question_ids, blocks
+    
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        question_ids = next(csv.reader(f), [])
+    
+    def blocks() -> Iterator[np.ndarray]:
+        # O arquivo só é aberto quando a iteração começa e é fechado mesmo
+        # que o consumidor pare antes do fim
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for rows in iter_chunks((row for row in reader if row), block_size):
+                yield np.array(rows, dtype=np.int8)
+    
+    return question_ids, blocks()
+
+
+def format_item_report(analysis: ItemAnalysis) -> str:
+    """Relatório de análise de itens em texto"""
+    lines = [
+        f"Tentativas analisadas: {analysis.attempts}",
+        "-" * 80,
+        f"{'Questão':<20} {'Acertos':>8} {'p':>7} {'r_pb':>7} {'r_pb corr.':>11}  Alertas",
+        "-" * 80,
+    ]
+    
+    def number(value: Optional[float]) -> str:
+        return '-' if value is None else f"{value:.3f}"
+    
+    for result in analysis.results():
+        lines.append(
+            f"{result['question_id']:<20} {result['correct']:>8} {number(result['p_value']):>7} "
+            f"{number(result['point_biserial']):>7} {number(result['corrected_point_biserial']):>11}  "
+            f"{', '.join(analysis.flags(result))}"
+        )
+    
+    return '\n'.join(lines)
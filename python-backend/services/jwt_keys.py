@@ -0,0 +1,168 @@
+"""
+Chaves JWT
+Chaves de assinatura e verificação carregadas uma vez a partir das configurações
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import jwt
+
+from config.settings import settings
+
+
+class JWTKeyStore:
+    """Chaves JWT pré-processadas, indexadas pelo kid
+    
+    Com HS256 o segredo compartilhado assina e verifica. Com RS256/EdDSA as
+    chaves públicas vêm de um arquivo JWKS e a chave privada (PEM) só é
+    necessária nos nós que emitem tokens; nós apenas de verificação não a
+    recebem. Para rotacionar, publique a nova chave no JWKS, troque o kid de
+    assinatura e remova a antiga depois que seus tokens expirarem; um kid
+    desconhecido faz o JWKS ser relido se o arquivo mudou.
+    
+    O JWKS deve ser substituído de forma atômica (escrever em um arquivo
+    temporário e renomeá-lo por cima do original). Se uma releitura falhar,
+    as chaves anteriores continuam valendo e o token é rejeitado.
+    """
+    
+    def __init__(
+        self,
+        algorithm: str = "HS256",
+        secret_key: Optional[str] = None,
+        jwks_file: Optional[str] = None,
+        private_key_file: Optional[str] = None,
+        signing_kid: Optional[str] = None
+    ):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.jwks_file = jwks_file
+        self.private_key_file = private_key_file
+        self.signing_kid = signing_kid
+        
+        self._verification_keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._jwks_mtime: Optional[float] = None
+        self._signing_key = None
+        self._lock = threading.Lock()
+        
+        self.reload()
+    
+    @property
+    def is_symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+    
+    @property
+    def can_sign(self) -> bool:
+        return self._signing_key is not None
+    
+    @property
+    def kids(self) -> List[str]:
+        return sorted(kid for kid in self._verification_keys if kid is not None)
+    
+    def reload(self):
+        """Carrega (ou recarrega) as chaves configuradas"""
+        with self._lock:
+            keys: Dict[Optional[str], jwt.PyJWK] = {}
+            signing_key = None
+            
+            if self.is_symmetric and self.secret_key:
+                keys[None] = jwt.PyJWK.from_dict({
+                    "kty": "oct",
+                    "k": jwt.utils.base64url_encode(self.secret_key.encode('utf-8')).decode('ascii'),
+                    "alg": self.algorithm,
+                })
+                signing_key = self.secret_key
+            
+            if self.jwks_file:
+                keys.update(self._read_jwks())
+            
+            if not self.is_symmetric and self.private_key_file:
+                from cryptography.hazmat.primitives import serialization
+                
+                with open(self.private_key_file, 'rb') as f:
+                    signing_key = serialization.load_pem_private_key(f.read(), password=None)
+            
+            if not keys:
+                raise ValueError("Nenhuma chave de verificação JWT configurada")
+            
+            self._verification_keys = keys
+            self._signing_key = signing_key
+    
+    def _read_jwks(self) -> Dict[Optional[str], jwt.PyJWK]:
+        mtime = os.stat(self.jwks_file).st_mtime
+        with open(self.jwks_file, 'r', encoding='utf-8') as f:
+            jwks = json.load(f)
+        
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("use", "sig") != "sig":
+                continue
+            keys[jwk.get("kid")] = jwt.PyJWK.from_dict(jwk, algorithm=jwk.get("alg", self.algorithm))
+        
+        # Só marca como lido depois de um parse completo; um arquivo inválido
+        # volta a ser tentado na próxima consulta
+        self._jwks_mtime = mtime
+        return keys
+    
+    def _jwks_changed(self) -> bool:
+        try:
+            return os.stat(self.jwks_file).st_mtime != self._jwks_mtime
+        except OSError:
+            return False
+    
+    def _verification_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        key = self._verification_keys.get(kid)
+        if key is None and self.jwks_file and self._jwks_changed():
+            try:
+                self.reload()
+            except (OSError, ValueError, jwt.PyJWTError) as exc:
+                # Ex.: JWKS lido no meio de uma escrita; mantém as chaves atuais
+                raise jwt.InvalidTokenError(f"Falha ao recarregar o JWKS: {exc}") from exc
+            key = self._verification_keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Chave JWT desconhecida: {kid}")
+        return key
+    
+    def sign(self, payload: Dict) -> str:
+        """Assina um payload com a chave de assinatura atual"""
+        if self._signing_key is None:
+            raise RuntimeError("Este nó não possui chave de assinatura JWT")
+        
+        headers = {"kid": self.signing_kid} if self.signing_kid else None
+        return jwt.encode(payload, self._signing_key, algorithm=self.algorithm, headers=headers)
+    
+    def verify(self, token: str) -> Dict:
+        """Verifica assinatura e expiração (levanta jwt.InvalidTokenError)"""
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._verification_key(kid)
+        
+        # Cada chave só aceita o próprio algoritmo (evita confusão de algoritmos)
+        return jwt.decode(token, key.key, algorithms=[key.algorithm_name])
+
+
+_default_store: Optional[JWTKeyStore] = None
+_default_lock = threading.Lock()
+
+
+def get_jwt_key_store() -> JWTKeyStore:
+    """Chaves compartilhadas do processo, carregadas das configurações"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = JWTKeyStore(
+                settings.ALGORITHM,
+                settings.SECRET_KEY,
+                settings.JWT_JWKS_FILE,
+                settings.JWT_PRIVATE_KEY_FILE,
+                settings.JWT_SIGNING_KID
+            )
+        return _default_store
+
+
+def set_jwt_key_store(store: JWTKeyStore):
+    """Substitui as chaves compartilhadas (ex.: em testes ou após rotação)"""
+    global _default_store
+    with _default_lock:
+        _default_store = store
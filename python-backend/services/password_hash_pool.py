@@ -0,0 +1,113 @@
+"""
+Pool de Hash de Senhas
+Executa bcrypt fora do event loop, com fila limitada e métricas
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from config.settings import settings
+
+
+class PasswordHashPoolSaturated(Exception):
+    """Pool de hash sem capacidade; a API responde 503"""
+
+
+class PasswordHashPool:
+    """Pool limitado de threads para bcrypt
+    
+    O bcrypt libera o GIL durante o hash, então threads bastam para usar
+    todos os núcleos. Além de max_workers tarefas em execução, no máximo
+    max_queue aguardam na fila; acima disso as chamadas são rejeitadas
+    imediatamente com PasswordHashPoolSaturated.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 64):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+    
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+    
+    def _acquire(self):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PasswordHashPoolSaturated(
+                    f"Pool de hash saturado ({self.in_flight} tarefas pendentes)"
+                )
+            self.in_flight += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.in_flight - self.running)
+    
+    def _wrap(self, func: Callable, args: tuple) -> Callable:
+        def task():
+            with self._lock:
+                self.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+        return task
+    
+    def _release(self, future):
+        # Roda também quando a tarefa é cancelada ainda na fila (cliente
+        # desconectou), caso em que o wrapper nunca executa
+        with self._lock:
+            self.in_flight -= 1
+    
+    async def run(self, func: Callable, *args):
+        """Executa func(*args) no pool sem bloquear o event loop"""
+        self._acquire()
+        try:
+            future = self._executor.submit(self._wrap(func, args))
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+    
+    def metrics(self) -> Dict[str, int]:
+        """Profundidade da fila e contadores do pool"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self.running,
+                'queue_depth': self.in_flight - self.running,
+                'peak_queue_depth': self.peak_queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+    
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[PasswordHashPool] = None
+_default_lock = threading.Lock()
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    """Pool compartilhado do processo, dimensionado pelas configurações"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = PasswordHashPool(
+                settings.PASSWORD_HASH_WORKERS,
+                settings.PASSWORD_HASH_MAX_QUEUE
+            )
+        return _default_pool
@@ -3,9 +3,79 @@ Serviço de Quizzes
 Gerencia operações relacionadas a quizzes e avaliações
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Sequence
 from datetime import datetime
 
+import numpy as np
+
+from services.quiz_statistics import get_quiz_statistics_store
+
+
+UNANSWERED = -1
+
+
+class AnswerKey:
+    """Gabarito codificado: índice da opção correta e pontos de cada questão
+    
+    As respostas são matrizes (tentativas × questões) de índices de opção,
+    com UNANSWERED para questões sem resposta.
+    """
+    
+    def __init__(self, correct_options: Sequence[int], points: Optional[Sequence[int]] = None):
+        self.correct_options = np.asarray(correct_options, dtype=np.int32)
+        if points is None:
+            points = np.ones(len(self.correct_options), dtype=np.int64)
+        self.points = np.asarray(points, dtype=np.int64)
+        if self.points.shape != self.correct_options.shape:
+            raise ValueError("Gabarito e pontos devem ter uma entrada por questão")
+        self.total_points = int(self.points.sum())
+        self.option_indexes: Optional[List[Dict]] = None
+    
+    @property
+    def n_questions(self) -> int:
+        return len(self.correct_options)
+    
+    @classmethod
+    def from_correct_answers(
+        cls,
+        correct_answers: List[Dict],
+        questions: Optional[List[Dict]] = None
+    ) -> 'AnswerKey':
+        """Codifica o gabarito no formato de calculate_score
+        
+        Cada option_id recebe um índice por questão (a correta é 0). Com
+        questions, os pontos seguem calculate_total_points.
+        """
+        points = None
+        if questions is not None:
+            if len(questions) != len(correct_answers):
+                raise ValueError("questions e correct_answers devem ter o mesmo tamanho")
+            points = [question.get("points", 1) for question in questions]
+        
+        key = cls(np.zeros(len(correct_answers), dtype=np.int32), points)
+        if questions is not None:
+            key.total_points = QuizService.calculate_total_points(questions)
+        key.option_indexes = [{correct.get("correct_option_id"): 0} for correct in correct_answers]
+        return key
+    
+    def encode(self, submissions: Iterable[List[Dict]]) -> np.ndarray:
+        """Converte respostas no formato de calculate_score em matriz de índices"""
+        if self.option_indexes is None:
+            raise ValueError("Gabarito sem option_ids; use from_correct_answers")
+        
+        rows = []
+        indexes = self.option_indexes
+        for answers in submissions:
+            # Como em calculate_score, respostas são pareadas por posição
+            row = [
+                index.setdefault(answer.get("option_id"), len(index))
+                for answer, index in zip(answers, indexes)
+            ]
+            row.extend([UNANSWERED] * (self.n_questions - len(row)))
+            rows.append(row)
+        
+        return np.array(rows, dtype=np.int32).reshape(len(rows), self.n_questions)
+
 
 class QuizService:
     """Serviço para gerenciamento de quizzes"""
@@ -26,6 +96,57 @@ class QuizService:
         score = int((correct_count / total_questions) * 100)
         return score
     
+    @staticmethod
+    def grade_batch(
+        responses: np.ndarray,
+        key: AnswerKey,
+        passing_score: int = 60,
+        quiz_id: Optional[str] = None
+    ) -> Dict:
+        """Corrige uma matriz de tentativas em uma passada vetorizada
+        
+        Retorna por tentativa: scores (idênticos a calculate_score), passed
+        (is_passing_score), correct_counts e points; e por questão:
+        question_correct_counts. Com quiz_id as notas entram nas estatísticas
+        do quiz.
+        """
+        responses = np.asarray(responses, dtype=np.int32)
+        if responses.ndim != 2 or responses.shape[1] != key.n_questions:
+            raise ValueError("responses deve ter uma coluna por questão do gabarito")
+        
+        correct = responses == key.correct_options
+        correct_counts = correct.sum(axis=1)
+        
+        if key.n_questions:
+            # Mesma ordem de operações de calculate_score: int((acertos / total) * 100)
+            scores = ((correct_counts / key.n_questions) * 100).astype(np.int64)
+        else:
+            scores = np.zeros(len(responses), dtype=np.int64)
+        
+        if quiz_id is not None:
+            QuizService.record_attempt_scores(quiz_id, scores)
+        
+        return {
+            "scores": scores,
+            "passed": scores >= passing_score,
+            "correct_counts": correct_counts,
+            "points": correct.astype(np.int64) @ key.points,
+            "total_points": key.total_points,
+            "question_correct_counts": correct.sum(axis=0),
+        }
+    
+    @staticmethod
+    def grade_submissions(
+        submissions: List[List[Dict]],
+        correct_answers: List[Dict],
+        questions: Optional[List[Dict]] = None,
+        passing_score: int = 60,
+        quiz_id: Optional[str] = None
+    ) -> Dict:
+        """Corrige em lote respostas no formato de calculate_score"""
+        key = AnswerKey.from_correct_answers(correct_answers, questions)
+        return QuizService.grade_batch(key.encode(submissions), key, passing_score, quiz_id)
+    
     @staticmethod
     def is_passing_score(score: int, passing_score: int = 60) -> bool:
         """Verifica se pontuação é suficiente para aprovação"""
@@ -51,13 +172,22 @@ class QuizService:
         # - Não excedeu número de tentativas
         return True
     
+    @staticmethod
+    def record_attempt_started(quiz_id: str):
+        """Registra o início de uma tentativa (base da taxa de conclusão)"""
+        get_quiz_statistics_store().record_started(quiz_id)
+    
+    @staticmethod
+    def record_attempt_score(quiz_id: str, score: int):
+        """Registra a nota de uma tentativa corrigida"""
+        get_quiz_statistics_store().record_score(quiz_id, score)
+    
+    @staticmethod
+    def record_attempt_scores(quiz_id: str, scores: Sequence[int]):
+        """Registra as notas de um lote de tentativas corrigidas"""
+        get_quiz_statistics_store().record_scores(quiz_id, scores)
+    
     @staticmethod
     def get_quiz_statistics(quiz_id: str) -> Dict:
         """Retorna estatísticas do quiz"""
-        return {
-            "total_attempts": 0,
-            "average_score": 0.0,
-            "highest_score": 0,
-            "lowest_score": 0,
-            "completion_rate": 0.0
-        }
+        return get_quiz_statistics_store().summary(quiz_id)
@@ -0,0 +1,190 @@
+"""
+Estatísticas de Quizzes
+Estatísticas incrementais e mescláveis das tentativas de cada quiz
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class QuizStatistics:
+    """Acumulador de estatísticas de um quiz
+    
+    Média e variância seguem Welford (com a fórmula de Chan para lotes e
+    mesclas). Os quantis vêm de um histograma por ponto de 0 a 100 — exato
+    para as notas inteiras de calculate_score; notas fora da faixa entram no
+    bin mais próximo. Todo o estado é mesclável entre processos.
+    """
+    
+    MAX_SCORE = 100
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_score: Optional[float] = None
+        self.max_score: Optional[float] = None
+        self.started = 0
+        self.histogram = np.zeros(self.MAX_SCORE + 1, dtype=np.int64)
+    
+    def record_started(self, count: int = 1):
+        """Registra tentativas iniciadas"""
+        self.started += count
+    
+    def add(self, score: float):
+        """Registra a nota de uma tentativa concluída"""
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+        self.histogram[self._bin(score)] += 1
+    
+    def add_many(self, scores: Iterable[float]):
+        """Registra um lote de notas"""
+        if isinstance(scores, np.ndarray):
+            scores = scores.astype(np.float64)
+        else:
+            scores = np.fromiter(scores, dtype=np.float64)
+        if not len(scores):
+            return
+        
+        batch = QuizStatistics()
+        batch.count = len(scores)
+        batch.mean = float(scores.mean())
+        batch.m2 = float(((scores - batch.mean) ** 2).sum())
+        batch.min_score = self._as_number(scores.min())
+        batch.max_score = self._as_number(scores.max())
+        batch.histogram = np.bincount(
+            np.clip(np.rint(scores), 0, self.MAX_SCORE).astype(np.int64),
+            minlength=self.MAX_SCORE + 1
+        )
+        self.merge(batch)
+    
+    def merge(self, other: 'QuizStatistics'):
+        """Incorpora o estado de outro acumulador"""
+        self.started += other.started
+        if not other.count:
+            return
+        
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min_score, self.max_score = other.min_score, other.max_score
+            self.histogram = other.histogram.copy()
+            return
+        
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        
+        self.min_score = min(self.min_score, other.min_score)
+        self.max_score = max(self.max_score, other.max_score)
+        self.histogram += other.histogram
+    
+    @staticmethod
+    def _as_number(value: float):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    
+    def _bin(self, score: float) -> int:
+        return min(max(int(round(score)), 0), self.MAX_SCORE)
+    
+    @property
+    def variance(self) -> float:
+        """Variância amostral (como statistics.variance)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def completion_rate(self) -> float:
+        """Percentual de tentativas iniciadas que foram concluídas"""
+        started = max(self.started, self.count)
+        return self.count / started * 100 if started else 0.0
+    
+    def quantile(self, q: float) -> float:
+        """Quantil q (0 a 1) com interpolação linear entre posições"""
+        if not self.count:
+            return 0.0
+        
+        cumulative = np.cumsum(self.histogram)
+        position = q * (self.count - 1)
+        lower = math.floor(position)
+        upper = math.ceil(position)
+        
+        low_value = int(np.searchsorted(cumulative, lower, side='right'))
+        high_value = int(np.searchsorted(cumulative, upper, side='right'))
+        return low_value + (high_value - low_value) * (position - lower)
+    
+    def summary(self) -> Dict:
+        """Estatísticas no formato de QuizService.get_quiz_statistics"""
+        return {
+            "total_attempts": self.count,
+            "average_score": self.mean if self.count else 0.0,
+            "highest_score": self.max_score if self.count else 0,
+            "lowest_score": self.min_score if self.count else 0,
+            "completion_rate": self.completion_rate,
+            "std_dev": math.sqrt(self.variance),
+            "median_score": self.quantile(0.5),
+            "percentiles": {
+                p: self.quantile(p / 100) for p in (10, 25, 75, 90)
+            },
+        }
+
+
+class QuizStatisticsStore:
+    """Estatísticas por quiz, atualizadas conforme as tentativas são corrigidas"""
+    
+    def __init__(self):
+        self.quizzes: Dict[str, QuizStatistics] = {}
+        self._lock = threading.Lock()
+    
+    def __getstate__(self) -> Dict:
+        # Estado transportável entre processos (sem o lock)
+        return {'quizzes': self.quizzes}
+    
+    def __setstate__(self, state: Dict):
+        self.quizzes = state['quizzes']
+        self._lock = threading.Lock()
+    
+    def _quiz(self, quiz_id: str) -> QuizStatistics:
+        stats = self.quizzes.get(quiz_id)
+        if stats is None:
+            stats = self.quizzes[quiz_id] = QuizStatistics()
+        return stats
+    
+    def record_started(self, quiz_id: str, count: int = 1):
+        with self._lock:
+            self._quiz(quiz_id).record_started(count)
+    
+    def record_score(self, quiz_id: str, score: float):
+        with self._lock:
+            self._quiz(quiz_id).add(score)
+    
+    def record_scores(self, quiz_id: str, scores: Iterable[float]):
+        with self._lock:
+            self._quiz(quiz_id).add_many(scores)
+    
+    def merge(self, other: 'QuizStatisticsStore'):
+        """Mescla estatísticas de outro processo"""
+        with self._lock:
+            for quiz_id, stats in other.quizzes.items():
+                self._quiz(quiz_id).merge(stats)
+    
+    def summary(self, quiz_id: str) -> Dict:
+        with self._lock:
+            stats = self.quizzes.get(quiz_id)
+            return (stats if stats is not None else QuizStatistics()).summary()
+
+
+_default_store = QuizStatisticsStore()
+
+
+def get_quiz_statistics_store() -> QuizStatisticsStore:
+    """Estatísticas compartilhadas do processo"""
+    return _default_store
@@ -0,0 +1,172 @@
+"""
+Cache de Tokens Verificados
+Evita repetir a verificação de assinatura JWT a cada requisição
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+
+
+class TokenCache:
+    """Cache LRU/TTL de payloads JWT já verificados, com revogação
+    
+    As entradas são indexadas pelo SHA-256 do token e expiram após ttl
+    segundos ou no exp do próprio token, o que vier primeiro. Revogar um
+    token (logout) ou todos os tokens de um usuário emitidos até agora
+    (troca de senha) remove as entradas e faz as próximas verificações
+    falharem. O estado é local ao processo.
+    
+    Revogações por usuário são descartadas após max_token_age segundos
+    (a validade dos tokens de acesso): nenhum token emitido antes disso
+    ainda passa na verificação de exp.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300,
+        max_token_age: Optional[float] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_token_age = (
+            max_token_age if max_token_age is not None
+            else settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+        self._entries: 'OrderedDict[bytes, Tuple[Dict, float]]' = OrderedDict()
+        self._subject_keys: Dict[str, set] = {}
+        self._revoked_tokens: Dict[bytes, float] = {}
+        self._revoked_subjects: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def token_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def _remove(self, key: bytes):
+        payload, _ = self._entries.pop(key)
+        keys = self._subject_keys.get(payload.get('sub'))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._subject_keys[payload.get('sub')]
+    
+    def get(self, token: str) -> Optional[Dict]:
+        """Payload em cache ou None"""
+        key = self.token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+    
+    def put(self, token: str, payload: Dict):
+        """Guarda um payload recém-verificado"""
+        with self._lock:
+            self._insert(token, payload)
+    
+    def put_if_not_revoked(self, token: str, payload: Dict) -> bool:
+        """Guarda o payload se o token não foi revogado (verificação atômica)"""
+        with self._lock:
+            if self._is_revoked(token, payload):
+                return False
+            self._insert(token, payload)
+            return True
+    
+    def _insert(self, token: str, payload: Dict):
+        if self.max_entries <= 0:
+            return
+        
+        expires_at = time.time() + self.ttl_seconds
+        if 'exp' in payload:
+            expires_at = min(expires_at, float(payload['exp']))
+        
+        key = self.token_key(token)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (payload, expires_at)
+        self._subject_keys.setdefault(payload.get('sub'), set()).add(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+    
+    def is_revoked(self, token: str, payload: Dict) -> bool:
+        """Verifica se o token foi revogado"""
+        with self._lock:
+            return self._is_revoked(token, payload)
+    
+    def _is_revoked(self, token: str, payload: Dict) -> bool:
+        if self.token_key(token) in self._revoked_tokens:
+            return True
+        cutoff = self._revoked_subjects.get(payload.get('sub'))
+        return cutoff is not None and payload.get('iat', 0) < cutoff
+    
+    def revoke_token(self, token: str, expires_at: Optional[float] = None):
+        """Revoga um token (ex.: logout) até sua expiração"""
+        key = self.token_key(token)
+        with self._lock:
+            self._prune_revoked()
+            self._revoked_tokens[key] = expires_at if expires_at is not None else float('inf')
+            if key in self._entries:
+                self._remove(key)
+    
+    def revoke_subject(self, subject: str):
+        """Revoga os tokens já emitidos para um usuário (ex.: troca de senha)"""
+        with self._lock:
+            self._prune_revoked()
+            self._revoked_subjects[subject] = time.time()
+            for key in list(self._subject_keys.get(subject, ())):
+                self._remove(key)
+    
+    def _prune_revoked(self):
+        now = time.time()
+        for key in [key for key, expires_at in self._revoked_tokens.items() if expires_at <= now]:
+            del self._revoked_tokens[key]
+        
+        oldest = now - self.max_token_age
+        for subject in [subject for subject, cutoff in self._revoked_subjects.items() if cutoff <= oldest]:
+            del self._revoked_subjects[subject]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._subject_keys.clear()
+    
+    def stats(self) -> Dict[str, float]:
+        """Contadores de acertos e falhas do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'revoked_tokens': len(self._revoked_tokens),
+                'revoked_subjects': len(self._revoked_subjects),
+            }
+
+
+_default_cache: Optional[TokenCache] = None
+_default_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Cache compartilhado do processo, dimensionado pelas configurações"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+        return _default_cache
@@ -0,0 +1,1385 @@
+"""
+Testes Unitários - Scripts
+Testes para os scripts de análise, recomendação e migração
+"""
+
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import unittest
+import warnings
+import zipfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+import numpy as np
+from scripts.data_analysis import (
+    CohortEngagement,
+    ColumnarPerformanceAnalyzer,
+    ContentGapAggregator,
+    LearningTrendsAnalyzer,
+    StudentPerformanceAnalyzer,
+    StudyTimeHeatmap,
+    build_report_inputs,
+    generate_batch_reports,
+)
+from scripts.ai_recommendations import (
+    ContentRecommendationEngine,
+    ItemNeighbourTable,
+    PrerequisiteCycleError,
+    PrerequisiteGraph,
+    StudyPathOptimizer,
+)
+from scripts import data_migration
+from scripts.data_migration import (
+    CSVImporter,
+    DataMigrationTool,
+    DateParser,
+    ImportStats,
+    MigrationLog,
+    batch_migrate_from_legacy_system,
+    iter_json_array,
+    pipelined_migrate_from_legacy_system,
+)
+from services.class_code_allocator import ClassCodeAllocator
+from services.class_service import ClassService
+from scripts._reference import (
+    collaborative_filtering_scan,
+    content_based_filtering_scan,
+    parse_date_strptime,
+    sample_catalog,
+    sample_history,
+)
+
+
+def _sample_attempts():
+    """Tentativas de exemplo com empates de data e turmas distintas"""
+    return [
+        {'student_id': 's1', 'class_id': 'c1', 'score': 75, 'completed_at': '2024-01-15T10:00:00'},
+        {'student_id': 's1', 'class_id': 'c1', 'score': 82, 'completed_at': '2024-01-20T14:30:00'},
+        {'student_id': 's1', 'class_id': 'c2', 'score': 90, 'completed_at': '2024-01-20T14:30:00'},
+        {'student_id': 's2', 'class_id': 'c1', 'score': 40, 'completed_at': '2024-01-18T09:00:00'},
+        {'student_id': 's2', 'class_id': 'c1', 'score': 55, 'completed_at': '2024-01-10T09:00:00'},
+        {'student_id': 's3', 'class_id': 'c2', 'score': 60, 'completed_at': '2024-02-01T08:00:00'},
+    ]
+
+
+class TestStudentPerformanceAnalyzer(unittest.TestCase):
+    """Testes para o analisador de desempenho"""
+    
+    def setUp(self):
+        self.data = _sample_attempts()
+        self.analyzer = StudentPerformanceAnalyzer(self.data)
+    
+    def test_student_metrics(self):
+        """Testa média, mediana e desvio padrão por aluno"""
+        scores = [75, 82, 90]
+        
+        self.assertEqual(self.analyzer.calculate_average_score('s1'), statistics.mean(scores))
+        self.assertEqual(self.analyzer.calculate_median_score('s1'), statistics.median(scores))
+        self.assertEqual(self.analyzer.calculate_standard_deviation('s1'), statistics.stdev(scores))
+        self.assertEqual(self.analyzer.calculate_average_score('unknown'), 0.0)
+        self.assertEqual(self.analyzer.calculate_standard_deviation('s3'), 0.0)
+    
+    def test_improvement_rate_uses_stable_order(self):
+        """Testa taxa de melhoria com empates de data"""
+        # Empate em 2024-01-20: a última tentativa na ordem original vence
+        self.assertEqual(self.analyzer.calculate_improvement_rate('s1'), 20.0)
+        self.assertEqual(self.analyzer.calculate_improvement_rate('s2'), -27.27)
+        self.assertEqual(self.analyzer.calculate_improvement_rate('s3'), 0.0)
+    
+    def test_struggling_students(self):
+        """Testa identificação de alunos com dificuldades"""
+        self.assertEqual(self.analyzer.identify_struggling_students(), ['s2'])
+        self.assertEqual(
+            sorted(self.analyzer.identify_struggling_students(threshold=100)),
+            ['s1', 's2', 's3']
+        )
+    
+    def test_class_statistics(self):
+        """Testa estatísticas da turma"""
+        scores = [75, 82, 40, 55]
+        stats = self.analyzer.generate_class_statistics('c1')
+        
+        self.assertEqual(stats['total_attempts'], 4)
+        self.assertEqual(stats['average_score'], round(statistics.mean(scores), 2))
+        self.assertEqual(stats['median_score'], statistics.median(scores))
+        self.assertEqual(stats['min_score'], 40)
+        self.assertEqual(stats['max_score'], 82)
+        self.assertEqual(stats['std_deviation'], round(statistics.stdev(scores), 2))
+        self.assertEqual(stats['passing_rate'], 50.0)
+        self.assertEqual(self.analyzer.generate_class_statistics('missing'), {})
+    
+    def test_refresh_indexes(self):
+        """Testa reconstrução dos índices após alteração dos dados"""
+        self.analyzer.calculate_average_score('s3')
+        self.data.append(
+            {'student_id': 's3', 'class_id': 'c2', 'score': 80, 'completed_at': '2024-02-02T08:00:00'}
+        )
+        self.analyzer.refresh_indexes()
+        
+        self.assertEqual(self.analyzer.calculate_average_score('s3'), 70.0)
+
+
+class TestColumnarPerformanceAnalyzer(unittest.TestCase):
+    """Testes para o analisador colunar"""
+    
+    def setUp(self):
+        self.data = _sample_attempts()
+        self.reference = StudentPerformanceAnalyzer(self.data)
+        self.analyzer = ColumnarPerformanceAnalyzer.from_attempts(self.data)
+    
+    def assert_matches_reference(self, analyzer):
+        for class_id in ('c1', 'c2', 'missing'):
+            self.assertEqual(
+                analyzer.generate_class_statistics(class_id),
+                self.reference.generate_class_statistics(class_id)
+            )
+        for student_id in ('s1', 's2', 's3', 'missing'):
+            self.assertEqual(
+                analyzer.calculate_improvement_rate(student_id),
+                self.reference.calculate_improvement_rate(student_id)
+            )
+        self.assertEqual(
+            analyzer.identify_struggling_students(70),
+            self.reference.identify_struggling_students(70)
+        )
+    
+    def test_matches_dict_based_outputs(self):
+        """Testa equivalência com o analisador baseado em dicts"""
+        self.assert_matches_reference(self.analyzer)
+        self.assertEqual(
+            self.analyzer.calculate_all_improvement_rates(),
+            {'s1': 20.0, 's2': -27.27, 's3': 0.0}
+        )
+    
+    def test_fractional_scores(self):
+        """Testa equivalência com notas fracionárias"""
+        fractional = [
+            {**attempt, 'score': attempt['score'] + fraction}
+            for attempt, fraction in zip(self.data, (0.3, 0.7, 0.1, 0.9, 0.45, 0.05))
+        ]
+        self.reference = StudentPerformanceAnalyzer(fractional)
+        analyzer = ColumnarPerformanceAnalyzer.from_attempts(fractional)
+        
+        self.assert_matches_reference(analyzer)
+        self.assertEqual(analyzer.generate_class_statistics('c1')['max_score'], 82.7)
+    
+    def test_exact_mean_on_threshold(self):
+        """Testa média exata sobre o threshold (soma sem erro acumulado)"""
+        attempts = [
+            {'student_id': 's1', 'class_id': 'c1', 'score': score,
+             'completed_at': f"2024-01-0{day}T10:00:00"}
+            for day, score in enumerate((60.9, 56.3, 64.2, 59.7, 58.9), start=1)
+        ]
+        analyzer = ColumnarPerformanceAnalyzer.from_attempts(attempts)
+    
+        self.assertEqual(analyzer.calculate_average_score('s1'), 60.0)
+        self.assertEqual(analyzer.identify_struggling_students(60), [])
+        self.assertEqual(
+            analyzer.identify_struggling_students(60),
+            StudentPerformanceAnalyzer(attempts).identify_struggling_students(60)
+        )
+    
+    def test_timezone_offsets_converted_to_utc(self):
+        """Testa conversão explícita de offsets de fuso, sem avisos do NumPy"""
+        attempts = [
+            {**attempt, 'completed_at': attempt['completed_at'] + offset}
+            for attempt, offset in zip(self.data, ('Z', '+03:00', '-02:00', '', 'Z', '+00:00'))
+        ]
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            analyzer = ColumnarPerformanceAnalyzer.from_attempts(attempts)
+    
+        expected = []
+        for attempt in attempts:
+            moment = datetime.fromisoformat(attempt['completed_at'])
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            expected.append(int(moment.timestamp()) * 1000000)
+        self.assertEqual(analyzer.completed_at.tolist(), expected)
+    
+    def test_column_types(self):
+        """Testa tipos das colunas"""
+        self.assertEqual(self.analyzer.scores.dtype.name, 'float64')
+        self.assertEqual(self.analyzer.completed_at.dtype.name, 'int64')
+        self.assertEqual(self.analyzer.student_codes.dtype.name, 'int32')
+        self.assertEqual(self.analyzer.student_ids, ['s1', 's2', 's3'])
+    
+    def test_csv_and_npz_round_trip(self):
+        """Testa leitura de CSV e persistência em .npz"""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'attempts.csv')
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.data[0]))
+                writer.writeheader()
+                writer.writerows(self.data)
+            
+            from_csv = ColumnarPerformanceAnalyzer.from_csv(csv_path)
+            self.assert_matches_reference(from_csv)
+            
+            npz_path = os.path.join(tmp, 'attempts.npz')
+            from_csv.save(npz_path)
+            self.assert_matches_reference(ColumnarPerformanceAnalyzer.load(npz_path))
+
+
+def _content_gaps_reference(completion_data):
+    """Implementação original (filtra a lista inteira por material)"""
+    all_materials = set(item['material_id'] for item in completion_data)
+    gaps = []
+    for material_id in all_materials:
+        attempts = [item for item in completion_data if item['material_id'] == material_id]
+        completed = len([item for item in attempts if item.get('completed', False)])
+        if (completed / len(attempts)) * 100 < 30:
+            gaps.append(material_id)
+    return gaps
+
+
+class TestContentGapAggregator(unittest.TestCase):
+    """Testes para a identificação de lacunas em uma passada"""
+    
+    def setUp(self):
+        rng = random.Random(7)
+        self.rows = [
+            {'material_id': f"m{rng.randrange(40)}", 'completed': rng.random() < rng.choice((0.1, 0.5))}
+            for _ in range(3000)
+        ]
+        self.rows.append({'material_id': 'sem-flag'})
+    
+    def test_matches_reference(self):
+        """Testa equivalência com a implementação original"""
+        gaps = LearningTrendsAnalyzer.identify_content_gaps(iter(self.rows))
+        
+        self.assertEqual(sorted(gaps), sorted(_content_gaps_reference(self.rows)))
+        self.assertIn('sem-flag', gaps)
+    
+    def test_merge_partial_counts(self):
+        """Testa mescla de contagens parciais de vários workers"""
+        merged = ContentGapAggregator()
+        for start in range(0, len(self.rows), 700):
+            worker = ContentGapAggregator.from_rows(self.rows[start:start + 700])
+            merged.merge_counts(json.loads(json.dumps(worker.partial_counts())))
+        
+        single = ContentGapAggregator.from_rows(self.rows)
+        self.assertEqual(merged.partial_counts(), single.partial_counts())
+        self.assertEqual(sorted(merged.gaps()), sorted(single.gaps()))
+    
+    def test_empty_partial_count(self):
+        """Testa contagem parcial mesclada sem tentativas"""
+        aggregator = ContentGapAggregator()
+        aggregator.merge_counts({'vazio': (0, 0)})
+        
+        self.assertEqual(aggregator.completion_rates(), {'vazio': 0})
+        self.assertEqual(aggregator.gaps(), ['vazio'])
+
+
+class TestStudyTimeHeatmap(unittest.TestCase):
+    """Testes para o mapa de calor de horários de estudo"""
+    
+    def setUp(self):
+        rng = random.Random(11)
+        base = datetime(2024, 1, 1)
+        self.activities = [
+            {
+                'timestamp': (base + timedelta(seconds=rng.randrange(86400 * 366))).isoformat(),
+                'class_id': rng.choice(['c1', 'c2', None]),
+            }
+            for _ in range(2000)
+        ]
+    
+    def test_matches_per_row_hours(self):
+        """Testa equivalência com analyze_peak_study_times"""
+        reference = LearningTrendsAnalyzer.analyze_peak_study_times(self.activities)
+        heatmap = LearningTrendsAnalyzer.analyze_peak_study_heatmap(iter(self.activities), chunk_size=300)
+        
+        self.assertEqual(heatmap.hourly.tolist(), [reference[hour] for hour in range(24)])
+        self.assertEqual(heatmap.heatmap.shape, (7, 24))
+        self.assertEqual(heatmap.total, len(self.activities))
+    
+    def test_weekday_and_class_bins_with_timezone(self):
+        """Testa dia da semana, turmas e conversão de fuso (com horário de verão)"""
+        tz = ZoneInfo('America/New_York')
+        heatmap = StudyTimeHeatmap.from_activities(self.activities, 'America/New_York', chunk_size=500)
+        
+        expected = {}
+        for activity in self.activities:
+            local = datetime.fromisoformat(activity['timestamp']).replace(tzinfo=timezone.utc).astimezone(tz)
+            grid = expected.setdefault(activity['class_id'], np.zeros((7, 24), dtype=np.int64))
+            grid[local.weekday(), local.hour] += 1
+        
+        maps = heatmap.class_heatmaps()
+        self.assertEqual(set(maps), set(expected))
+        for class_id, grid in expected.items():
+            np.testing.assert_array_equal(maps[class_id], grid)
+    
+    def test_merge_and_csv(self):
+        """Testa mescla de mapas parciais e leitura de CSV"""
+        merged = StudyTimeHeatmap()
+        merged.merge(StudyTimeHeatmap.from_activities(self.activities[1000:]))
+        merged.merge(StudyTimeHeatmap.from_activities(self.activities[:1000]))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'activity.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['timestamp', 'class_id'])
+                writer.writeheader()
+                writer.writerows(self.activities)
+            from_csv = StudyTimeHeatmap.from_csv(path, chunk_size=128)
+        
+        np.testing.assert_array_equal(merged.heatmap, from_csv.heatmap)
+        for class_id, grid in from_csv.class_heatmaps().items():
+            np.testing.assert_array_equal(merged.class_heatmaps()[class_id], grid)
+
+
+class TestCohortEngagement(unittest.TestCase):
+    """Testes para o engajamento calculado por turma"""
+    
+    def setUp(self):
+        rng = random.Random(5)
+        types = ['login', 'material_read', 'quiz_completed', 'enrolled', 'forum_post']
+        self.activities = [
+            {
+                'user_id': f"u{rng.randrange(60)}",
+                'activity_type': rng.choice(types),
+                'activity_date': f"2024-03-{rng.randint(1, 31):02d}",
+            }
+            for _ in range(4000)
+        ]
+    
+    def test_matches_scalar_score(self):
+        """Testa equivalência com calculate_engagement_score aluno a aluno"""
+        ranked = LearningTrendsAnalyzer.calculate_cohort_engagement(iter(self.activities), chunk_size=333)
+        
+        self.assertEqual(len(ranked), 60)
+        for row in ranked:
+            rows = [a for a in self.activities if a['user_id'] == row['student_id']]
+            logins = sum(a['activity_type'] == 'login' for a in rows)
+            views = sum(a['activity_type'] == 'material_read' for a in rows)
+            quizzes = sum(a['activity_type'] == 'quiz_completed' for a in rows)
+            days = len({a['activity_date'] for a in rows})
+            
+            self.assertEqual(
+                (row['login'], row['material'], row['quiz'], row['days_active']),
+                (logins, views, quizzes, days)
+            )
+            self.assertEqual(
+                row['score'],
+                LearningTrendsAnalyzer.calculate_engagement_score(logins, views, quizzes, days)
+            )
+        
+        self.assertTrue(np.all(np.diff(ranked['score']) <= 0))
+    
+    def test_clamps_and_custom_types(self):
+        """Testa limites de 100% e mapeamento de tipos configurável"""
+        cohort = CohortEngagement({'quiz_completed': 'quiz'})
+        cohort.add_columns(
+            ['a'] * 40 + ['b'],
+            ['quiz_completed'] * 40 + ['login'],
+            [f"2024-01-{day % 28 + 1:02d}T10:00:00" for day in range(40)] + ['2024-01-01']
+        )
+        
+        ranked = cohort.ranking()
+        self.assertEqual(list(ranked['student_id']), ['a', 'b'])
+        self.assertEqual(ranked['score'].tolist(), [
+            LearningTrendsAnalyzer.calculate_engagement_score(0, 0, 40, 28),
+            LearningTrendsAnalyzer.calculate_engagement_score(0, 0, 0, 1),
+        ])
+
+
+class TestBatchReports(unittest.TestCase):
+    """Testes para a geração de relatórios em lote"""
+    
+    def setUp(self):
+        self.data = _sample_attempts()
+        self.analyzer = ColumnarPerformanceAnalyzer.from_attempts(self.data)
+        self.activities = [
+            {'user_id': 's1', 'activity_type': 'login', 'activity_date': '2024-01-15'},
+            {'user_id': 's1', 'activity_type': 'forum_post', 'activity_date': '2024-01-16'},
+            {'user_id': 's2', 'activity_type': 'quiz_completed', 'activity_date': '2024-01-18'},
+        ]
+        self.engagement = CohortEngagement()
+        self.engagement.add(self.activities)
+    
+    def test_inputs_match_per_student_methods(self):
+        """Testa equivalência com os métodos do StudentPerformanceAnalyzer"""
+        reference = StudentPerformanceAnalyzer(self.data)
+        inputs = build_report_inputs(self.analyzer, self.engagement)
+        
+        self.assertEqual(set(inputs), {'s1', 's2', 's3'})
+        for student_id, data in inputs.items():
+            self.assertEqual(data['average_score'], reference.calculate_average_score(student_id))
+            self.assertEqual(data['median_score'], reference.calculate_median_score(student_id))
+            self.assertAlmostEqual(data['std_deviation'], reference.calculate_standard_deviation(student_id))
+            self.assertEqual(data['improvement_rate'], reference.calculate_improvement_rate(student_id))
+            
+            prediction, probability = reference.predict_student_success(student_id)
+            self.assertEqual(data['prediction'], f"{prediction} ({probability}%)")
+        
+        self.assertEqual((inputs['s1']['total_activities'], inputs['s1']['days_active']), (2, 2))
+        self.assertEqual(
+            inputs['s2']['engagement_score'],
+            LearningTrendsAnalyzer.calculate_engagement_score(0, 0, 1, 1)
+        )
+        self.assertEqual(inputs['s3']['engagement_score'], 0.0)
+    
+    def test_inputs_with_fractional_scores(self):
+        """Testa entradas dos relatórios com notas fracionárias"""
+        fractional = [
+            {**attempt, 'score': attempt['score'] + fraction}
+            for attempt, fraction in zip(self.data, (0.3, 0.7, 0.1, 0.9, 0.45, 0.05))
+        ]
+        reference = StudentPerformanceAnalyzer(fractional)
+        inputs = build_report_inputs(ColumnarPerformanceAnalyzer.from_attempts(fractional))
+        
+        for student_id, data in inputs.items():
+            self.assertEqual(data['average_score'], reference.calculate_average_score(student_id))
+            self.assertEqual(data['median_score'], reference.calculate_median_score(student_id))
+            prediction, probability = reference.predict_student_success(student_id)
+            self.assertEqual(data['prediction'], f"{prediction} ({probability}%)")
+    
+    def test_files_per_class_and_archive(self):
+        """Testa saída por turma em diretório e em .zip, com pool de processos"""
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, 'reports')
+            progress = []
+            result = generate_batch_reports(
+                self.analyzer, out_dir, self.engagement, processes=2, chunk_size=1,
+                progress_every=1, on_progress=lambda written, total, _: progress.append((written, total))
+            )
+            
+            self.assertEqual(result['reports'], 4)
+            self.assertEqual(progress, [(1, 4), (2, 4), (3, 4), (4, 4)])
+            self.assertEqual(result['files'], ['relatorios_c1.txt', 'relatorios_c2.txt'])
+            with open(os.path.join(out_dir, 'relatorios_c1.txt'), encoding='utf-8') as f:
+                text = f.read()
+            self.assertEqual(text.count('RELATÓRIO DE DESEMPENHO'), 2)
+            self.assertIn('Aluno ID: s1', text)
+            self.assertIn('Aluno ID: s2', text)
+            
+            archive = os.path.join(tmp, 'reports.zip')
+            generate_batch_reports(self.analyzer, archive, archive=True, processes=1, progress_every=0)
+            with zipfile.ZipFile(archive) as zf:
+                self.assertEqual(zf.namelist(), ['relatorios_c1.txt', 'relatorios_c2.txt'])
+                self.assertIn('Aluno ID: s3', zf.read('relatorios_c2.txt').decode('utf-8'))
+    
+    def test_pool_without_fork(self):
+        """Testa o pool com o contexto padrão quando fork não está disponível"""
+        with tempfile.TemporaryDirectory() as tmp:
+            expected = generate_batch_reports(
+                self.analyzer, os.path.join(tmp, 'serial'), processes=1, progress_every=0
+            )
+            with mock.patch('multiprocessing.get_all_start_methods', return_value=['spawn']), \
+                    mock.patch('multiprocessing.get_context', wraps=multiprocessing.get_context) as context:
+                result = generate_batch_reports(
+                    self.analyzer, os.path.join(tmp, 'pool'), processes=2, progress_every=0
+                )
+            
+            context.assert_called_once_with(None)
+            self.assertEqual(result['files'], expected['files'])
+            for filename in result['files']:
+                with open(os.path.join(tmp, 'serial', filename), encoding='utf-8') as f:
+                    serial_text = f.read()
+                with open(os.path.join(tmp, 'pool', filename), encoding='utf-8') as f:
+                    self.assertEqual(f.read(), serial_text)
+    
+    def test_colliding_class_names(self):
+        """Testa turmas cujos nomes de arquivo coincidem após a limpeza"""
+        data = [
+            {**attempt, 'class_id': class_id}
+            for attempt, class_id in zip(self.data, ('a/b', 'a_b', 'sem_turma', None, 'a/b', 'a_b'))
+        ]
+        analyzer = ColumnarPerformanceAnalyzer.from_attempts(data)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = os.path.join(tmp, 'reports')
+            result = generate_batch_reports(analyzer, out_dir, processes=1, progress_every=0)
+            
+            self.assertEqual(len(set(result['files'])), 4)
+            self.assertEqual(sorted(os.listdir(out_dir)), sorted(result['files']))
+            
+            archive = os.path.join(tmp, 'reports.zip')
+            generate_batch_reports(analyzer, archive, archive=True, processes=1, progress_every=0)
+            with zipfile.ZipFile(archive) as zf:
+                self.assertEqual(len(set(zf.namelist())), 4)
+                self.assertEqual(len(zf.namelist()), 4)
+
+
+class TestCollaborativeFiltering(unittest.TestCase):
+    """Testes para a filtragem colaborativa com índice invertido"""
+    
+    def setUp(self):
+        rng = random.Random(7)
+        catalog = [f"c{i}" for i in range(30)]
+        self.interactions = {
+            f"u{i}": rng.sample(catalog, rng.randint(1, 8))
+            for i in range(200)
+        }
+        self.engine = ContentRecommendationEngine()
+    
+    def test_matches_full_scan(self):
+        """Testa equivalência com a varredura completa"""
+        for user_id in list(self.interactions) + ['unknown']:
+            self.assertEqual(
+                self.engine.collaborative_filtering(user_id, self.interactions),
+                collaborative_filtering_scan(user_id, self.interactions)
+            )
+    
+    def test_index_is_reused(self):
+        """Testa reaproveitamento do índice para os mesmos dados"""
+        self.engine.collaborative_filtering('u1', self.interactions)
+        index = self.engine.user_item_index
+        self.engine.collaborative_filtering('u2', self.interactions)
+        
+        self.assertIs(self.engine.user_item_index, index)
+    
+    def test_incremental_update(self):
+        """Testa atualização incremental do índice"""
+        original = {user_id: list(items) for user_id, items in self.interactions.items()}
+        index = self.engine.build_user_index(self.interactions)
+        index.add_interaction('new_user', 'c1')
+        index.add_interaction('new_user', 'c2')
+        index.add_interaction('u0', 'c29')
+        
+        expected = {**original, 'new_user': ['c1', 'c2'], 'u0': original['u0'] + ['c29']}
+        for user_id in ('new_user', 'u0', 'u5'):
+            self.assertEqual(
+                self.engine.collaborative_filtering(user_id, self.interactions),
+                collaborative_filtering_scan(user_id, expected)
+            )
+        self.assertEqual(self.interactions, original)
+    
+    def test_rebuilds_when_users_added(self):
+        """Testa que o índice é refeito quando o dict ganha usuários"""
+        self.engine.collaborative_filtering('u0', self.interactions)
+        self.interactions['late_user'] = list(self.interactions['u0'])
+        
+        self.assertEqual(
+            self.engine.collaborative_filtering('late_user', self.interactions),
+            collaborative_filtering_scan('late_user', self.interactions)
+        )
+    
+    def test_rebuilds_when_lists_change_in_place(self):
+        """Testa que listas alteradas no lugar refazem o índice"""
+        interactions = {'a': ['c'], 'b': ['c', 'd']}
+        self.assertEqual(self.engine.collaborative_filtering('a', interactions), ['d'])
+        
+        interactions['a'].insert(0, 'd')
+        interactions['b'][:] = ['d', 'e']
+        
+        self.assertEqual(self.engine.collaborative_filtering('a', interactions), ['e'])
+        self.assertEqual(self.engine.user_item_index.items_of('a'), ['d', 'c'])
+
+    def test_similar_users_threshold(self):
+        """Testa threshold e ordenação dos usuários similares"""
+        interactions = {
+            'a': ['x', 'y', 'z'],
+            'b': ['x', 'y', 'z'],
+            'c': ['x', 'y', 'w'],
+            'd': ['x'],
+        }
+        index = self.engine.build_user_index(interactions)
+        
+        self.assertEqual(index.similar_users('a'), [('b', 1.0), ('c', 0.5), ('d', 1 / 3)])
+        self.assertEqual(index.similar_users('a', threshold=0.5), [('b', 1.0)])
+
+
+class TestContentBasedFiltering(unittest.TestCase):
+    """Testes para a filtragem baseada em conteúdo vetorizada"""
+    
+    def setUp(self):
+        self.rng = random.Random(11)
+        self.catalog = sample_catalog(self.rng, 300, tags=20)
+        self.engine = ContentRecommendationEngine()
+    
+    def test_matches_python_loops(self):
+        """Testa equivalência com a implementação por laços"""
+        for size in (0, 1, 5, 40):
+            history = sample_history(self.rng, self.catalog, size)
+            self.assertEqual(
+                self.engine.content_based_filtering('u', history, self.catalog),
+                content_based_filtering_scan(history, self.catalog)
+            )
+    
+    def test_ties_and_unknown_content(self):
+        """Testa desempate pela ordem do catálogo e itens fora do catálogo"""
+        catalog = [
+            {'id': f"c{i}", 'tags': ['a'], 'difficulty': 5}
+            for i in range(15)
+        ] + [{'id': 'c0', 'tags': ['b']}]
+        history = [{'content_id': 'c3', 'rating': 4}, {'content_id': 'missing'}]
+        
+        result = self.engine.content_based_filtering('u', history, catalog)
+        
+        self.assertEqual(result, content_based_filtering_scan(history, catalog))
+        self.assertNotIn('c3', result)
+    
+    def test_catalog_metadata(self):
+        """Testa mapa id → conteúdo do catálogo"""
+        self.engine.build_content_catalog(self.catalog)
+        
+        self.assertIs(self.engine.content_metadata['c7'], self.catalog[7])
+        self.assertEqual(len(self.engine.content_catalog), 300)
+    
+    def test_rebuilds_when_catalog_changes(self):
+        """Testa que a lista alterada no lugar refaz o catálogo"""
+        catalog = [{'id': 'c1', 'tags': ['a']}, {'id': 'c2', 'tags': ['b']}]
+        history = [{'content_id': 'c1', 'rating': 5}]
+        self.assertEqual(self.engine.content_based_filtering('u', history, catalog), ['c2'])
+        
+        catalog.append({'id': 'new', 'tags': ['a']})
+        self.assertEqual(self.engine.content_based_filtering('u', history, catalog), ['new', 'c2'])
+        
+        # Dicts alterados no lugar exigem invalidate explícito
+        catalog[1]['tags'] = ['a', 'a']
+        self.engine.invalidate()
+        self.assertEqual(self.engine.content_based_filtering('u', history, catalog), ['c2', 'new'])
+
+
+class TestBatchRecommendations(unittest.TestCase):
+    """Testes para recomendações híbridas em lote"""
+    
+    def setUp(self):
+        rng = random.Random(5)
+        self.catalog = sample_catalog(rng, 120, tags=15)
+        self.histories = {
+            f"u{i}": sample_history(rng, self.catalog, rng.randint(0, 12))
+            for i in range(40)
+        }
+        self.interactions = {
+            user_id: [item['content_id'] for item in history]
+            for user_id, history in self.histories.items()
+        }
+        self.engine = ContentRecommendationEngine()
+    
+    def expected(self, user_ids):
+        return [
+            (user_id, self.engine.hybrid_recommendation(
+                user_id,
+                self.histories.get(user_id, []),
+                self.interactions,
+                self.catalog
+            ))
+            for user_id in user_ids
+        ]
+    
+    def test_matches_individual_calls(self):
+        """Testa equivalência com chamadas individuais"""
+        user_ids = list(self.histories) + ['unknown']
+        results = list(self.engine.recommend_many(
+            user_ids, self.histories, self.interactions, self.catalog, block_size=7
+        ))
+        
+        self.assertEqual(results, self.expected(user_ids))
+    
+    def test_process_pool(self):
+        """Testa execução em pool de processos"""
+        user_ids = list(self.histories)
+        results = list(self.engine.recommend_many(
+            user_ids, self.histories, self.interactions, self.catalog,
+            block_size=10, processes=2
+        ))
+        
+        self.assertEqual(results, self.expected(user_ids))
+
+
+class TestItemNeighbourTable(unittest.TestCase):
+    """Testes para a tabela pré-calculada de conteúdos similares"""
+    
+    def setUp(self):
+        rng = random.Random(3)
+        self.catalog = sample_catalog(rng, 150, tags=12)
+        self.catalog.append({'id': 'no-tags', 'tags': []})
+        self.engine = ContentRecommendationEngine()
+    
+    def brute_force(self, position, k):
+        content = self.catalog[position]
+        scored = [
+            (self.engine.calculate_content_similarity(content, other), other_position)
+            for other_position, other in enumerate(self.catalog)
+            if other_position != position
+        ]
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [score for score, _ in scored if score > 0][:k]
+    
+    def test_matches_pairwise_similarity(self):
+        """Testa equivalência com calculate_content_similarity par a par"""
+        table = self.engine.precompute_similar_content(self.catalog, k=6, block_size=16)
+        
+        for position, content in enumerate(self.catalog):
+            scores = [score for _, score in table.neighbours_of(content['id'])]
+            self.assertEqual(scores, self.brute_force(position, 6))
+        
+        self.assertEqual(table.neighbours_of('no-tags'), [])
+        self.assertEqual(table.neighbours_of('missing'), [])
+    
+    def test_common_tags_are_ignored(self):
+        """Testa que tags acima de max_tag_items são tratadas como stop-words"""
+        catalog = [
+            {**content, 'tags': content['tags'] + ['common']}
+            for content in self.catalog if content['tags']
+        ]
+        table = self.engine.precompute_similar_content(catalog, k=5, max_tag_items=100)
+        
+        for position, content in enumerate(self.catalog[:-1]):
+            scores = [score for _, score in table.neighbours_of(content['id'])]
+            self.assertEqual(scores, self.brute_force(position, 5))
+    
+    def test_memory_mapped_round_trip(self):
+        """Testa persistência e leitura via memory-map"""
+        table = self.engine.precompute_similar_content(self.catalog, k=4)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            table.save(tmp)
+            loaded = ItemNeighbourTable.load(tmp)
+            
+            self.assertIsInstance(loaded.neighbours, np.memmap)
+            for content in self.catalog:
+                self.assertEqual(
+                    loaded.neighbours_of(content['id']),
+                    table.neighbours_of(content['id'])
+                )
+            del loaded
+
+
+class TestRecommendationSnapshot(unittest.TestCase):
+    """Testes para snapshots do motor de recomendação"""
+    
+    def setUp(self):
+        rng = random.Random(9)
+        self.catalog = sample_catalog(rng, 80, tags=10)
+        self.histories = {
+            f"u{i}": sample_history(rng, self.catalog, rng.randint(0, 10))
+            for i in range(30)
+        }
+        self.interactions = {
+            user_id: [item['content_id'] for item in history] * 2
+            for user_id, history in self.histories.items()
+        }
+        self.engine = ContentRecommendationEngine()
+        self.engine.build_user_index(self.interactions)
+        self.engine.build_user_profiles(self.histories, self.catalog)
+    
+    def test_loaded_snapshot_matches_engine(self):
+        """Testa equivalência das recomendações a partir do snapshot"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.engine.save_snapshot(tmp)
+            loaded = ContentRecommendationEngine.load_snapshot(tmp)
+            
+            self.assertIsInstance(loaded.content_catalog.indptr, np.memmap)
+            for user_id in list(self.histories) + ['unknown']:
+                self.assertEqual(
+                    loaded.hybrid_recommendation(user_id, None, None, None),
+                    self.engine.hybrid_recommendation(
+                        user_id,
+                        self.histories.get(user_id, []),
+                        self.interactions,
+                        self.catalog
+                    )
+                )
+                self.assertEqual(
+                    loaded.user_item_index.similar_users(user_id),
+                    self.engine.user_item_index.similar_users(user_id)
+                )
+            
+            self.assertEqual(
+                list(loaded.recommend_many(self.histories, None, None, None)),
+                list(self.engine.recommend_many(
+                    self.histories, self.histories, self.interactions, self.catalog
+                ))
+            )
+            del loaded
+    
+    def test_missing_structures(self):
+        """Testa erro ao consultar estruturas não carregadas"""
+        with self.assertRaises(ValueError):
+            ContentRecommendationEngine().content_based_filtering('u1', None, None)
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    """Testes para a ingestão incremental de interações"""
+    
+    def setUp(self):
+        rng = random.Random(21)
+        self.catalog = sample_catalog(rng, 60, tags=8)
+        self.histories = {
+            f"u{i}": sample_history(rng, self.catalog, rng.randint(1, 6))
+            for i in range(25)
+        }
+        self.events = [
+            {'user_id': rng.choice(list(self.histories) + ['new']),
+             'content_id': rng.choice(self.catalog)['id'],
+             'rating': rng.randint(1, 5)}
+            for _ in range(30)
+        ]
+        self.engine = self.build_engine(self.histories)
+    
+    def build_engine(self, histories):
+        engine = ContentRecommendationEngine()
+        engine.build_content_catalog(self.catalog)
+        engine.build_user_index({
+            user_id: [item['content_id'] for item in history]
+            for user_id, history in histories.items()
+        })
+        engine.build_user_profiles(histories)
+        return engine
+    
+    def rebuilt_after_events(self):
+        histories = {user_id: list(history) for user_id, history in self.histories.items()}
+        for event in self.events:
+            histories.setdefault(event['user_id'], []).append(
+                {'content_id': event['content_id'], 'rating': event['rating']}
+            )
+        return self.build_engine(histories)
+    
+    def test_matches_full_rebuild(self):
+        """Testa equivalência com a reconstrução completa"""
+        for user_id in self.histories:
+            self.engine.recommend(user_id)
+        version = self.engine.version
+        
+        self.assertGreater(self.engine.ingest(self.events), version)
+        self.assertEqual(len(self.engine.interaction_history), len(self.events))
+        
+        rebuilt = self.rebuilt_after_events()
+        for user_id in list(self.histories) + ['new']:
+            self.assertEqual(self.engine.recommend(user_id), rebuilt.recommend(user_id))
+    
+    def test_sparse_overrides_match_rebuilt_profiles(self):
+        """Testa que os perfis esparsos atualizados equivalem aos reconstruídos"""
+        self.engine.ingest(self.events)
+        rebuilt = self.rebuilt_after_events()
+        
+        for user_id in set(event['user_id'] for event in self.events):
+            weights, _, _, positions = self.engine.user_profiles.overrides[user_id]
+            self.assertIsInstance(weights, dict)
+            self.assertIsInstance(positions, set)
+            
+            profile, difficulty_sum, count, consumed = self.engine.user_profiles.components(user_id)
+            expected = rebuilt.user_profiles.components(user_id)
+            np.testing.assert_array_equal(profile, expected[0])
+            self.assertEqual((difficulty_sum, count), expected[1:3])
+            np.testing.assert_array_equal(consumed, expected[3])
+    
+    def test_cache_invalidation(self):
+        """Testa invalidação seletiva do cache de recomendações"""
+        cached = self.engine.recommend('u0')
+        self.assertIs(self.engine.recommend('u0'), cached)
+        
+        self.engine.ingest([{'user_id': 'u0', 'content_id': self.catalog[0]['id']}])
+        
+        self.assertIsNot(self.engine.recommend('u0'), cached)
+    
+    def test_ingested_events_survive_index_rebuild(self):
+        """Testa que eventos ingeridos são reaplicados quando o índice é refeito"""
+        engine = ContentRecommendationEngine()
+        interactions = {'a': ['x', 'y'], 'b': ['x']}
+        engine.build_user_index(interactions)
+        engine.ingest([{'user_id': 'b', 'content_id': 'z'}])
+    
+        interactions['c'] = ['q']
+    
+        self.assertEqual(engine.collaborative_filtering('a', interactions), ['z'])
+        self.assertEqual(engine.user_item_index.items_of('b'), ['x', 'z'])
+        self.assertEqual(interactions['b'], ['x'])
+    
+        # Um build explícito define a nova origem completa
+        engine.build_user_index(interactions)
+        self.assertEqual(engine.user_item_index.items_of('b'), ['x'])
+    
+    def test_ingest_into_loaded_snapshot(self):
+        """Testa ingestão sobre um snapshot somente leitura"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.engine.save_snapshot(tmp)
+            loaded = ContentRecommendationEngine.load_snapshot(tmp)
+            loaded.ingest(self.events)
+            
+            rebuilt = self.rebuilt_after_events()
+            for user_id in list(self.histories) + ['new']:
+                self.assertEqual(loaded.recommend(user_id), rebuilt.recommend(user_id))
+            del loaded
+
+
+def _prerequisite_chain_recursive(content_id, prerequisites_map):
+    """Implementação original (DFS recursiva)"""
+    chain = []
+    visited = set()
+    
+    def dfs(current_id):
+        if current_id in visited:
+            return
+        visited.add(current_id)
+        for prereq in prerequisites_map.get(current_id, []):
+            dfs(prereq)
+        chain.append(current_id)
+    
+    dfs(content_id)
+    return chain
+
+
+class TestPrerequisiteGraph(unittest.TestCase):
+    """Testes para a resolução de pré-requisitos"""
+    
+    def setUp(self):
+        rng = random.Random(9)
+        self.prerequisites = {
+            f"m{i}": [f"m{j}" for j in rng.sample(range(i), min(i, rng.randint(0, 4)))]
+            for i in range(80) if rng.random() < 0.9
+        }
+        self.targets = [f"m{i}" for i in range(80)] + ['fora-do-mapa']
+    
+    def test_matches_recursive_chain(self):
+        """Testa equivalência com a DFS recursiva original"""
+        graph = PrerequisiteGraph(self.prerequisites)
+        chains = graph.chains(self.targets)
+        
+        for target in self.targets:
+            expected = _prerequisite_chain_recursive(target, self.prerequisites)
+            self.assertEqual(chains[target], expected)
+            self.assertEqual(StudyPathOptimizer.calculate_prerequisite_chain(target, self.prerequisites), expected)
+        
+        order = graph.topological_order()
+        position = {content_id: index for index, content_id in enumerate(order)}
+        for content_id, prereqs in self.prerequisites.items():
+            for prereq in prereqs:
+                self.assertLess(position[prereq], position[content_id])
+                self.assertTrue(graph.depends_on(content_id, prereq))
+    
+    def test_class_study_paths(self):
+        """Testa trilhas de uma turma com um único grafo"""
+        targets_by_student = {'s1': ['m70', 'm75'], 's2': ['m10'], 's3': ['fora-do-mapa', 'm3']}
+        paths = StudyPathOptimizer.build_study_paths(targets_by_student, self.prerequisites)
+        
+        for student_id, targets in targets_by_student.items():
+            path = paths[student_id]
+            position = {content_id: index for index, content_id in enumerate(path)}
+            self.assertEqual(len(position), len(path))
+            
+            # Cada alvo acrescenta o que falta da sua cadeia, na ordem dos alvos
+            expected = []
+            for target in targets:
+                expected += [c for c in _prerequisite_chain_recursive(target, self.prerequisites) if c not in expected]
+                self.assertEqual(set(path[:len(expected)]), set(expected))
+            self.assertEqual(len(path), len(expected))
+            
+            for content_id in path:
+                for prereq in self.prerequisites.get(content_id, []):
+                    self.assertLess(position[prereq], position[content_id])
+    
+    def test_study_paths_share_one_order(self):
+        """Testa que as trilhas filtram a mesma pós-ordem, calculada uma vez"""
+        graph = PrerequisiteGraph(self.prerequisites)
+        first = graph.study_path(['m70', 'fora-do-mapa', 'm75'])
+        order = graph._order
+        
+        self.assertEqual(graph.study_path(['m70', 'fora-do-mapa', 'm75']), first)
+        self.assertIn('fora-do-mapa', first)
+        self.assertIs(graph._order, order)
+        ordered = [graph.content_ids[node] for node in order]
+        self.assertEqual(graph.study_path(['m10']), [c for c in ordered if graph.depends_on('m10', c)])
+    
+    def test_deep_curriculum(self):
+        """Testa cadeias mais profundas que o limite de recursão"""
+        depth = 5000
+        prerequisites = {f"m{i}": [f"m{i - 1}"] for i in range(1, depth)}
+        expected = [f"m{i}" for i in range(depth)]
+        
+        self.assertEqual(PrerequisiteGraph(prerequisites).chain(f"m{depth - 1}"), expected)
+        self.assertEqual(StudyPathOptimizer.calculate_prerequisite_chain(f"m{depth - 1}", prerequisites), expected)
+    
+    def test_cycles_are_reported(self):
+        """Testa detecção de ciclos"""
+        prerequisites = {'a': ['b'], 'b': ['c'], 'c': ['a'], 'd': ['a'], 'e': ['e'], 'f': []}
+        graph = PrerequisiteGraph(prerequisites)
+        
+        self.assertEqual(graph.cycles, [['a', 'b', 'c'], ['e']])
+        self.assertEqual(graph.chain('f'), ['f'])
+        with self.assertRaises(PrerequisiteCycleError) as context:
+            graph.chain('d')
+        self.assertEqual(context.exception.cycle, ['a', 'b', 'c'])
+        with self.assertRaises(PrerequisiteCycleError):
+            graph.topological_order()
+        with self.assertRaises(PrerequisiteCycleError):
+            graph.study_path(['f', 'd'])
+        with self.assertRaises(PrerequisiteCycleError):
+            StudyPathOptimizer.calculate_prerequisite_chain('d', prerequisites)
+
+
+class TestStreamingCSVImporter(unittest.TestCase):
+    """Testes do importador CSV em streaming"""
+    
+    ROWS = [
+        ['Email', 'Name', 'Score', 'Quiz', 'Date', 'student_email'],
+        ['a@x.com', 'Ana', '7.5', 'Q1', '2024-01-15', 'a@x.com'],
+        ['b@x.com', 'Bruno', '9', 'Q2', '15/01/2024', 'b@x.com'],
+        ['c@x.com', 'Carla'],
+        [],
+        ['d@x.com', 'Davi, Jr.', '10', 'Q1', '2024-02-01', 'd@x.com'],
+    ]
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.csv')
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(self.ROWS)
+        
+        self.gz_path = os.path.join(self.tmp.name, 'data.csv.gz')
+        with open(self.path, 'rb') as src, gzip.open(self.gz_path, 'wb') as dst:
+            dst.write(src.read())
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def dict_reader_students(self, path):
+        """Implementação original baseada em DictReader"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return [
+                {
+                    'email': row.get('email', row.get('Email', '')),
+                    'full_name': row.get('name', row.get('Name', row.get('full_name', ''))),
+                    'role': 'student'
+                }
+                for row in csv.DictReader(f)
+            ]
+    
+    def test_students_match_dict_reader(self):
+        """Testa equivalência com a leitura via DictReader"""
+        expected = self.dict_reader_students(self.path)
+        self.assertEqual(CSVImporter.import_students_from_csv(self.path), expected)
+        self.assertEqual(CSVImporter.import_students_from_csv(self.gz_path), expected)
+    
+    def test_grades_and_missing_columns(self):
+        """Testa aliases de coluna e valores padrão de colunas ausentes"""
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows([['Student Email', 'quiz'], ['a@x.com', 'Q1']])
+        
+        grades = CSVImporter.import_grades_from_csv(self.path)
+        
+        self.assertEqual(grades, [{
+            'student_email': 'a@x.com',
+            'quiz_title': 'Q1',
+            'score': 0.0,
+            'completed_at': ''
+        }])
+    
+    def test_batches_and_stats(self):
+        """Testa lotes de tamanho fixo e contagem de linhas"""
+        stats = ImportStats()
+        rows = CSVImporter.iter_students_from_csv(self.gz_path, stats=stats)
+        batches = list(CSVImporter.iter_batches(rows, batch_size=2))
+        
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+        self.assertEqual(stats.rows, 4)
+        self.assertIsNotNone(stats.finished_at)
+        self.assertGreaterEqual(stats.rows_per_second, 0)
+    
+    def test_progress_callback(self):
+        """Testa o callback de progresso sem saída no console"""
+        seen = []
+        with mock.patch('builtins.print') as printed:
+            list(CSVImporter.iter_students_from_csv(
+                self.gz_path, progress_every=2, on_progress=lambda stats: seen.append(stats.rows)
+            ))
+        
+        self.assertEqual(seen, [2, 4])
+        printed.assert_not_called()
+
+
+class TestDateParser(unittest.TestCase):
+    """Testes do parser de datas com detecção de formato"""
+    
+    VALUES = [
+        '2024-01-15', '2024-01-15 10:30:00', '15/01/2024', '15/01/2024 10:30:00',
+        '5/1/2024', '2024-1-5', '31/02/2024', '15/01/2024 25:00:00', '+1/01/2024',
+        '15-01-2024', '2024/01/15', 'ontem', '15/01/2024 10:30', '１５/01/2024',
+    ]
+    
+    def test_matches_strptime(self):
+        """Testa equivalência com os formatos strptime originais"""
+        parser = DateParser()
+        for _ in range(2):
+            for value in self.VALUES:
+                expected = parse_date_strptime(value)
+                if expected is not None:
+                    self.assertEqual(parser.parse(value, 'col'), expected, value)
+    
+    def test_learns_format_and_counts_failures(self):
+        """Testa aprendizado do formato por coluna e contagem de falhas"""
+        parser = DateParser()
+        self.assertEqual(parser.parse('15/01/2024', 'a'), '2024-01-15T00:00:00')
+        self.assertEqual(parser.parse('2024-01-15', 'b'), '2024-01-15T00:00:00')
+        self.assertEqual(parser.learned_formats, {'a': 'day_first', 'b': 'iso'})
+        
+        self.assertIsNone(parser.parse('31/02/2024', 'a'))
+        self.assertIsNone(parser.parse('', 'a'))
+        self.assertIsNone(parser.parse(None, 'b'))
+        self.assertIsNone(parser.parse(20240115, 'b'))
+        
+        self.assertEqual(parser.take_report(), {
+            'a': {'missing': 1, 'unparseable': 1},
+            'b': {'missing': 1, 'unparseable': 1},
+        })
+        self.assertEqual(parser.report(), {})
+
+
+class TestMigrationLog(unittest.TestCase):
+    """Testes do log de migração em streaming"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_streaming_errors_only_with_summaries(self):
+        """Testa gravação em lotes, apenas erros e resumos periódicos"""
+        path = os.path.join(self.tmp.name, 'log.ndjson')
+        log = MigrationLog(path, errors_only=True, summary_every=4, buffer_size=2)
+        migrator = DataMigrationTool('legacy', 'lumina', log)
+        
+        migrator.migrate_users([{'email': f'u{i}@x.com'} for i in range(5)] + [{'email': None}])
+        log.close()
+        
+        with open(path, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        
+        self.assertEqual([entry['status'] for entry in entries], ['summary', 'error'])
+        self.assertEqual(entries[0]['counts'], {'user': {'success': 4}})
+        self.assertEqual(log.summary(), {'user': {'success': 5, 'error': 1}})
+        self.assertEqual(log.error_count, 1)
+    
+    def test_export_small_run(self):
+        """Testa exportação do log completo em JSON"""
+        for filepath in (None, os.path.join(self.tmp.name, 'log.ndjson')):
+            migrator = DataMigrationTool('legacy', 'lumina', MigrationLog(filepath, buffer_size=1))
+            migrator.migrate_classes([{'name': 'Turma', 'teacher_email': 'x'}], {'x': 't1'})
+            migrator.migrate_classes([{'name': 'Outra', 'teacher_email': 'y'}], {})
+            
+            export_path = os.path.join(self.tmp.name, 'export.json')
+            migrator.export_migration_log(export_path)
+            migrator.log.close()
+            
+            with open(export_path, encoding='utf-8') as f:
+                exported = json.load(f)
+            self.assertEqual(
+                [(e['status'], e['name'], e.get('error')) for e in exported],
+                [('success', 'Turma', None), ('error', 'Outra', 'Teacher not found')]
+            )
+    
+    def test_context_manager_closes_file(self):
+        """Testa fechamento do arquivo e leitura completa do log gravado"""
+        path = os.path.join(self.tmp.name, 'log.ndjson')
+        with DataMigrationTool('legacy', 'lumina', MigrationLog(path, buffer_size=2)) as migrator:
+            migrator.migrate_users([{'email': f'u{i}@x.com'} for i in range(3)])
+        
+        self.assertIsNone(migrator.log._file)
+        self.assertEqual([entry['name'] for entry in migrator.migration_log],
+                         ['u0@x.com', 'u1@x.com', 'u2@x.com'])
+    
+    def test_codes_reserved_only_for_migrated_classes(self):
+        """Testa que turmas rejeitadas não consomem códigos"""
+        allocator = ClassCodeAllocator()
+        migrator = DataMigrationTool('legacy', 'lumina', code_allocator=allocator)
+        
+        migrated = migrator.migrate_classes(
+            [{'name': 'Turma', 'teacher_email': 'x'}, {'name': 'Outra', 'teacher_email': 'y'}],
+            {'x': 't1'}
+        )
+        
+        self.assertEqual(allocator.reserved, 1)
+        self.assertTrue(ClassService.validate_class_code(migrated[0]['code']))
+
+
+class TestPipelinedMigration(unittest.TestCase):
+    """Testes da migração em pipeline"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.legacy_dir = os.path.join(self.tmp.name, 'legacy')
+        os.makedirs(self.legacy_dir)
+        
+        users = [
+            {
+                'email': f' User{i}@Example.com ',
+                'name': f'Usuário {i}',
+                'type': 'professor' if i % 5 == 0 else 'learner',
+                'created_at': '2024-01-15',
+            }
+            for i in range(40)
+        ]
+        users.append({'email': None, 'name': 'Inválido'})
+        classes = [
+            {
+                'name': f'Turma {i}',
+                'teacher_email': f'user{i % 12}@example.com',
+                'created_at': '15/01/2024',
+            }
+            for i in range(30)
+        ]
+        
+        with open(os.path.join(self.legacy_dir, 'users.json'), 'w', encoding='utf-8') as f:
+            json.dump(users, f, indent=2)
+        with open(os.path.join(self.legacy_dir, 'classes.json'), 'w', encoding='utf-8') as f:
+            json.dump(classes, f)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def read_ndjson(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+    
+    def test_iter_json_array(self):
+        """Testa leitura incremental com blocos menores que os elementos"""
+        path = os.path.join(self.tmp.name, 'array.json')
+        data = [1234567, {'a': [1, 2, {'b': 'x, ]'}]}, 'texto', None, 3.5, []]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(' \n' + json.dumps(data, indent=1) + '\n')
+        
+        self.assertEqual(list(iter_json_array(path, read_size=3)), data)
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[1, 2')
+        with self.assertRaises(ValueError):
+            list(iter_json_array(path, read_size=2))
+    
+    def test_matches_batch_migration(self):
+        """Testa equivalência com a migração em memória"""
+        expected = batch_migrate_from_legacy_system(self.legacy_dir, self.tmp.name)
+        
+        for processes in (None, 2):
+            result = pipelined_migrate_from_legacy_system(
+                self.legacy_dir, self.tmp.name, chunk_size=7, processes=processes, resume=False
+            )
+            users = self.read_ndjson(result['outputs']['users'])
+            classes = self.read_ndjson(result['outputs']['classes'])
+            log = self.read_ndjson(result['outputs']['log'])
+            
+            self.assertEqual(users, expected['users'])
+            self.assertEqual(
+                [{k: v for k, v in c.items() if k != 'code'} for c in classes],
+                [{k: v for k, v in c.items() if k != 'code'} for c in expected['classes']]
+            )
+            self.assertEqual(
+                [(e['status'], e['type'], e['name']) for e in log],
+                [(e['status'], e['type'], e['name']) for e in expected['log']]
+            )
+            self.assertEqual(result['errors'], 1 + 30 - len(classes))
+            self.assertEqual(result['users'], 40)
+            self.assertEqual(len({c['code'] for c in classes}), len(classes))
+    
+    def without_codes(self, classes):
+        return [{k: v for k, v in c.items() if k != 'code'} for c in classes]
+    
+    def test_resume_after_crash(self):
+        """Testa retomada a partir do checkpoint após uma falha"""
+        expected_dir = os.path.join(self.tmp.name, 'expected')
+        os.makedirs(expected_dir)
+        expected = pipelined_migrate_from_legacy_system(self.legacy_dir, expected_dir, chunk_size=4)
+        
+        original = data_migration._migrate_classes_chunk
+        calls = []
+        
+        def failing_chunk(chunk):
+            calls.append(len(chunk))
+            if len(calls) == 6:
+                raise RuntimeError('falha simulada')
+            return original(chunk)
+        
+        with mock.patch.object(data_migration, '_migrate_classes_chunk', failing_chunk):
+            with self.assertRaises(RuntimeError):
+                pipelined_migrate_from_legacy_system(
+                    self.legacy_dir, self.tmp.name, chunk_size=4, checkpoint_every=2
+                )
+        
+        with open(os.path.join(self.tmp.name, data_migration.CHECKPOINT_FILE)) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['phase'], 'classes')
+        self.assertEqual(checkpoint['offsets'], {'users': 41, 'classes': 16})
+        
+        resumed = pipelined_migrate_from_legacy_system(
+            self.legacy_dir, self.tmp.name, chunk_size=4, checkpoint_every=2
+        )
+        
+        for name in ('users', 'classes', 'errors', 'skipped', 'dates'):
+            self.assertEqual(resumed[name], expected[name])
+        self.assertEqual(
+            self.read_ndjson(resumed['outputs']['users']),
+            self.read_ndjson(expected['outputs']['users'])
+        )
+        self.assertEqual(
+            self.without_codes(self.read_ndjson(resumed['outputs']['classes'])),
+            self.without_codes(self.read_ndjson(expected['outputs']['classes']))
+        )
+        self.assertEqual(
+            len(self.read_ndjson(resumed['outputs']['log'])),
+            len(self.read_ndjson(expected['outputs']['log']))
+        )
+        
+        # Execução já concluída não migra nada novamente
+        again = pipelined_migrate_from_legacy_system(self.legacy_dir, self.tmp.name)
+        self.assertEqual(again['users'], 40)
+    
+    def test_changed_input_ignores_checkpoint(self):
+        """Testa que um checkpoint de outra entrada não é reaproveitado"""
+        pipelined_migrate_from_legacy_system(self.legacy_dir, self.tmp.name, chunk_size=4)
+        
+        users_path = os.path.join(self.legacy_dir, 'users.json')
+        with open(users_path, encoding='utf-8') as f:
+            users = json.load(f)
+        with open(users_path, 'w', encoding='utf-8') as f:
+            json.dump(users + [{'email': 'nova@example.com', 'name': 'Nova'}], f)
+        
+        result = pipelined_migrate_from_legacy_system(self.legacy_dir, self.tmp.name, chunk_size=4)
+        
+        self.assertEqual(result['users'], 41)
+        self.assertEqual(len(self.read_ndjson(result['outputs']['users'])), 41)
+    
+    def test_skips_duplicate_ids(self):
+        """Testa que entidades com ID já migrado são ignoradas"""
+        with open(os.path.join(self.legacy_dir, 'users.json'), encoding='utf-8') as f:
+            users = json.load(f)
+        with open(os.path.join(self.legacy_dir, 'users.json'), 'w', encoding='utf-8') as f:
+            json.dump(users + users[:3], f)
+        
+        result = pipelined_migrate_from_legacy_system(self.legacy_dir, self.tmp.name, chunk_size=4)
+        
+        self.assertEqual(result['users'], 40)
+        self.assertEqual(result['skipped'], 3)
+    
+    def test_duplicate_after_failed_copy_is_migrated(self):
+        """Testa que uma cópia válida não é ignorada se a primeira falhou"""
+        with open(os.path.join(self.legacy_dir, 'users.json'), 'w', encoding='utf-8') as f:
+            json.dump([
+                {'email': 'dup@example.com', 'name': 'Inválido', 'type': 5},
+                {'email': 'outro@example.com', 'name': 'Outro'},
+                {'email': 'dup@example.com', 'name': 'Válido', 'type': 'learner'},
+                {'email': 'dup@example.com', 'name': 'Repetido', 'type': 'learner'},
+            ], f)
+        
+        for processes in (None, 2):
+            result = pipelined_migrate_from_legacy_system(
+                self.legacy_dir, self.tmp.name, chunk_size=1, processes=processes, resume=False
+            )
+            users = self.read_ndjson(result['outputs']['users'])
+            
+            self.assertEqual([u['full_name'] for u in users], ['Outro', 'Válido'])
+            self.assertEqual((result['users'], result['skipped']), (2, 1))
+    
+    def test_errors_only_log(self):
+        """Testa o log compacto com apenas erros na migração em pipeline"""
+        result = pipelined_migrate_from_legacy_system(
+            self.legacy_dir, self.tmp.name, chunk_size=4, processes=2, errors_only=True
+        )
+        log = self.read_ndjson(result['outputs']['log'])
+        
+        self.assertEqual([entry['status'] for entry in log], ['error'])
+        self.assertEqual(result['log'], {'user': {'success': 40, 'error': 1}, 'class': {'success': 30}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,35 @@ Testes Unitários - Serviços
 Testes para lógica de negócio
 """
 
+import asyncio
+import csv
+import io
+import json
+import threading
+import os
+import pickle
+import random
+import statistics
+import tempfile
+import time
 import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import jwt
+import numpy as np
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
 from services.auth_service import AuthService
+from services.jwt_keys import JWTKeyStore, set_jwt_key_store, get_jwt_key_store
+from services.token_cache import TokenCache
+from services.password_hash_pool import PasswordHashPool, PasswordHashPoolSaturated
 from services.class_service import ClassService
-from services.quiz_service import QuizService
+from services import class_code_allocator
+from services.class_code_allocator import ClassCodeAllocator
+from services.quiz_statistics import QuizStatistics, QuizStatisticsStore
+from services.item_analysis import ItemAnalysis
+from cli.admin_tools import AdminCLI
+from services.quiz_service import QuizService, AnswerKey, UNANSWERED
 
 
 class TestAuthService(unittest.TestCase):
@@ -71,6 +96,268 @@ class TestAuthService(unittest.TestCase):
         self.assertIsNone(payload)
 
 
+class TestTokenCache(unittest.TestCase):
+    """Testes do cache de tokens verificados"""
+    
+    def test_decode_token_uses_cache(self):
+        """Testa que a segunda decodificação vem do cache"""
+        token = AuthService.create_access_token("cache-user", "cache@example.com")
+        cache = TokenCache(max_entries=10)
+        
+        with mock.patch('services.auth_service.get_token_cache', return_value=cache):
+            first = AuthService.decode_token(token)
+            with mock.patch('services.auth_service.jwt.decode') as decode:
+                second = AuthService.decode_token(token)
+                decode.assert_not_called()
+        
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+    
+    def test_entry_expires_with_token(self):
+        """Testa que a entrada não sobrevive ao exp do token"""
+        cache = TokenCache(max_entries=10, ttl_seconds=300)
+        cache.put("token", {"sub": "u1", "exp": time.time() - 1})
+        
+        self.assertIsNone(cache.get("token"))
+    
+    def test_lru_eviction(self):
+        """Testa o limite de entradas"""
+        cache = TokenCache(max_entries=2)
+        for name in ("a", "b"):
+            cache.put(name, {"sub": name})
+        cache.get("a")
+        cache.put("c", {"sub": "c"})
+        
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()['entries'], 2)
+    
+    def test_revocation(self):
+        """Testa logout e troca de senha"""
+        cache = TokenCache(max_entries=10)
+        
+        with mock.patch('services.auth_service.get_token_cache', return_value=cache):
+            token = AuthService.create_access_token("rev-user", "rev@example.com")
+            other = AuthService.create_access_token("rev-user", "rev@example.com")
+            self.assertIsNotNone(AuthService.decode_token(token))
+            
+            AuthService.revoke_token(token)
+            self.assertIsNone(AuthService.decode_token(token))
+            self.assertIsNotNone(AuthService.decode_token(other))
+            
+            AuthService.revoke_user_tokens("rev-user")
+            self.assertIsNone(AuthService.decode_token(other))
+            
+            fresh = AuthService.create_access_token("rev-user", "rev@example.com")
+            self.assertIsNotNone(AuthService.decode_token(fresh))
+    
+    def test_put_if_not_revoked(self):
+        """Testa que um payload revogado não entra no cache"""
+        cache = TokenCache(max_entries=10)
+        cache.revoke_subject("u1")
+        
+        self.assertFalse(cache.put_if_not_revoked("old", {"sub": "u1", "iat": time.time() - 10}))
+        self.assertIsNone(cache.get("old"))
+        self.assertTrue(cache.put_if_not_revoked("new", {"sub": "u1", "iat": time.time() + 1}))
+        self.assertIsNotNone(cache.get("new"))
+    
+    def test_subject_revocations_are_pruned(self):
+        """Testa que revogações por usuário expiram com os tokens"""
+        cache = TokenCache(max_entries=10, max_token_age=60)
+        now = time.time()
+        
+        with mock.patch('services.token_cache.time.time', return_value=now):
+            cache.revoke_subject("u1")
+        with mock.patch('services.token_cache.time.time', return_value=now + 61):
+            cache.revoke_subject("u2")
+        
+        self.assertEqual(cache.stats()['revoked_subjects'], 1)
+
+
+class TestJWTKeyStore(unittest.TestCase):
+    """Testes das chaves JWT assimétricas"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+    
+    def _write_key(self, name, private_key):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption()
+            ))
+        return path
+    
+    def _write_jwks(self, entries):
+        keys = []
+        for kid, algorithm, private_key in entries:
+            if algorithm == 'RS256':
+                data = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            else:
+                data = jwt.algorithms.OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            data.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+            keys.append(data)
+        
+        path = os.path.join(self.tmpdir.name, 'jwks.json')
+        with open(path, 'w') as f:
+            json.dump({'keys': keys}, f)
+        return path
+    
+    def test_verification_only_node(self):
+        """Testa nó de verificação sem chave privada"""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwks = self._write_jwks([('k1', 'RS256', private_key)])
+        signer = JWTKeyStore('RS256', jwks_file=jwks,
+                             private_key_file=self._write_key('k1.pem', private_key), signing_kid='k1')
+        verifier = JWTKeyStore('RS256', jwks_file=jwks)
+        
+        token = signer.sign({'sub': 'u1'})
+        
+        self.assertEqual(jwt.get_unverified_header(token)['kid'], 'k1')
+        self.assertEqual(verifier.verify(token)['sub'], 'u1')
+        self.assertFalse(verifier.can_sign)
+        with self.assertRaises(RuntimeError):
+            verifier.sign({'sub': 'u1'})
+    
+    def test_key_rotation(self):
+        """Testa rotação de kid com releitura do JWKS"""
+        old_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        new_key = ed25519.Ed25519PrivateKey.generate()
+        jwks = self._write_jwks([('old', 'RS256', old_key)])
+        verifier = JWTKeyStore('RS256', jwks_file=jwks)
+        
+        old_token = JWTKeyStore('RS256', jwks_file=jwks, private_key_file=self._write_key('old.pem', old_key),
+                                signing_kid='old').sign({'sub': 'u1'})
+        
+        self._write_jwks([('old', 'RS256', old_key), ('new', 'EdDSA', new_key)])
+        os.utime(jwks, (time.time() + 5, time.time() + 5))
+        new_token = JWTKeyStore('EdDSA', jwks_file=jwks, private_key_file=self._write_key('new.pem', new_key),
+                                signing_kid='new').sign({'sub': 'u2'})
+        
+        self.assertEqual(verifier.verify(new_token)['sub'], 'u2')
+        self.assertEqual(verifier.verify(old_token)['sub'], 'u1')
+        self.assertEqual(verifier.kids, ['new', 'old'])
+    
+    def test_rejects_unknown_kid_and_algorithm_confusion(self):
+        """Testa kid desconhecido e token HS256 assinado com a chave pública"""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        verifier = JWTKeyStore('RS256', jwks_file=self._write_jwks([('k1', 'RS256', private_key)]))
+        other = JWTKeyStore('HS256', secret_key='outro-segredo-com-tamanho-suficiente-32b')
+        
+        with self.assertRaises(jwt.InvalidTokenError):
+            verifier.verify(jwt.encode({'sub': 'x'}, 'segredo-qualquer-com-32-bytes-ou-mais', headers={'kid': 'k2'}))
+        with self.assertRaises(jwt.InvalidTokenError):
+            verifier.verify(jwt.encode({'sub': 'x'}, 'segredo-qualquer-com-32-bytes-ou-mais', headers={'kid': 'k1'}))
+        with self.assertRaises(jwt.InvalidTokenError):
+            verifier.verify(other.sign({'sub': 'x'}))
+    
+    def test_partial_jwks_keeps_previous_keys(self):
+        """Testa JWKS lido no meio de uma escrita"""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwks = self._write_jwks([('k1', 'RS256', private_key)])
+        signer = JWTKeyStore('RS256', jwks_file=jwks,
+                             private_key_file=self._write_key('k1.pem', private_key), signing_kid='k1')
+        verifier = JWTKeyStore('RS256', jwks_file=jwks)
+        
+        with open(jwks, 'w') as f:
+            f.write('{"keys": [{"kty": "RSA", ')
+        os.utime(jwks, (time.time() + 5, time.time() + 5))
+        
+        with self.assertRaises(jwt.InvalidTokenError):
+            verifier.verify(jwt.encode({'sub': 'x'}, 'segredo-qualquer-com-32-bytes-ou-mais', headers={'kid': 'k2'}))
+        self.assertEqual(verifier.kids, ['k1'])
+        self.assertEqual(verifier.verify(signer.sign({'sub': 'u1'}))['sub'], 'u1')
+    
+    def test_auth_service_uses_store(self):
+        """Testa AuthService com chaves EdDSA configuradas"""
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        store = JWTKeyStore('EdDSA', jwks_file=self._write_jwks([('k1', 'EdDSA', private_key)]),
+                            private_key_file=self._write_key('k1.pem', private_key), signing_kid='k1')
+        previous = get_jwt_key_store()
+        set_jwt_key_store(store)
+        self.addCleanup(set_jwt_key_store, previous)
+        
+        with mock.patch('services.auth_service.get_token_cache', return_value=TokenCache(max_entries=0)):
+            token = AuthService.create_access_token("u1", "u1@example.com")
+            self.assertEqual(jwt.get_unverified_header(token)['alg'], 'EdDSA')
+            self.assertEqual(AuthService.decode_token(token)['sub'], "u1")
+
+
+class TestPasswordHashPool(unittest.TestCase):
+    """Testes para o pool de hash de senhas"""
+    
+    def test_async_hash_and_verify(self):
+        """Testa hash e verificação assíncronos"""
+        async def login():
+            hashed = await AuthService.hash_password_async("password123")
+            return (
+                await AuthService.verify_password_async("password123", hashed),
+                await AuthService.verify_password_async("wrong", hashed),
+            )
+        
+        self.assertEqual(asyncio.run(login()), (True, False))
+    
+    def test_rejects_when_saturated(self):
+        """Testa backpressure com a fila cheia"""
+        pool = PasswordHashPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        
+        async def scenario():
+            first = asyncio.ensure_future(pool.run(release.wait))
+            second = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            
+            metrics = pool.metrics()
+            with self.assertRaises(PasswordHashPoolSaturated):
+                await pool.run(release.wait)
+            
+            release.set()
+            await asyncio.gather(first, second)
+            return metrics
+        
+        metrics = asyncio.run(scenario())
+        pool.shutdown()
+        
+        self.assertEqual((metrics['running'], metrics['queue_depth']), (1, 1))
+        self.assertEqual(pool.metrics()['rejected'], 1)
+        self.assertEqual(pool.metrics()['completed'], 2)
+        self.assertEqual(pool.metrics()['queue_depth'], 0)
+    
+    def test_cancelled_queued_task_releases_slot(self):
+        """Testa que cancelar uma tarefa na fila libera a vaga"""
+        pool = PasswordHashPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        
+        async def scenario():
+            first = asyncio.ensure_future(pool.run(release.wait))
+            queued = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            metrics = pool.metrics()
+            
+            # A vaga liberada aceita uma nova tarefa
+            replacement = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            release.set()
+            await asyncio.gather(first, replacement)
+            return metrics
+        
+        metrics = asyncio.run(scenario())
+        pool.shutdown()
+        
+        self.assertEqual((metrics['running'], metrics['queue_depth']), (1, 0))
+        self.assertEqual(pool.metrics()['rejected'], 0)
+        self.assertEqual(pool.metrics()['completed'], 2)
+        self.assertEqual(pool.metrics()['queue_depth'], 0)
+
+
 class TestClassService(unittest.TestCase):
     """Testes para serviço de turmas"""
     
@@ -225,6 +512,218 @@ class TestQuizService(unittest.TestCase):
         self.assertEqual(total, 2)  # 1 ponto cada por padrão
 
 
+class TestClassCodeAllocator(unittest.TestCase):
+    """Testes para o alocador de códigos de turma"""
+    
+    def test_reserve_unique_valid_codes(self):
+        """Testa reserva em lote de códigos únicos e válidos"""
+        allocator = ClassCodeAllocator()
+        
+        codes = ClassService.reserve_class_codes(20000, allocator) + allocator.reserve(5000)
+        
+        self.assertEqual(len(set(codes)), 25000)
+        self.assertTrue(all(ClassService.validate_class_code(code) for code in codes))
+    
+    def test_skips_used_codes(self):
+        """Testa que códigos já usados não são reservados"""
+        used = [f"A{i:02d}" for i in range(100)] + ['B12', 'C99']
+        allocator = ClassCodeAllocator(used, capacity=5000, length=3)
+        
+        codes = allocator.reserve(1000)
+        
+        self.assertEqual(len(set(codes)), 1000)
+        self.assertFalse(set(codes) & set(used))
+        self.assertFalse(any(code.isdigit() for code in codes))
+    
+    def test_shared_allocator_seeded_with_stored_codes(self):
+        """Testa que o alocador compartilhado começa com os códigos gravados"""
+        previous = class_code_allocator._default_allocator
+        self.addCleanup(class_code_allocator.set_class_code_allocator, previous)
+        class_code_allocator.set_class_code_allocator(None)
+        
+        with mock.patch.object(ClassService, 'get_all_class_codes', return_value=['ABC123']):
+            allocator = class_code_allocator.get_class_code_allocator()
+        
+        stored = np.array([int('ABC123', 36)], dtype=np.uint64)
+        self.assertTrue(allocator._contains(stored)[0])
+
+
+class TestBatchGrading(unittest.TestCase):
+    """Testes para correção de quizzes em lote"""
+    
+    def test_matches_calculate_score(self):
+        """Testa equivalência com calculate_score"""
+        rng = random.Random(7)
+        options = ['a', 'b', 'c', 'd', None]
+        
+        for n_questions in (0, 1, 3, 7, 13):
+            correct_answers = [{'correct_option_id': rng.choice(options)} for _ in range(n_questions)]
+            questions = [{'points': rng.randint(1, 5)} for _ in range(n_questions)]
+            submissions = [
+                [{'option_id': rng.choice(options)} if rng.random() > 0.1 else {}
+                 for _ in range(rng.randint(0, n_questions + 2))]
+                for _ in range(200)
+            ]
+            
+            result = QuizService.grade_submissions(submissions, correct_answers, questions, passing_score=50)
+            
+            expected = [QuizService.calculate_score(answers, correct_answers) for answers in submissions]
+            self.assertEqual(result['scores'].tolist(), expected)
+            self.assertEqual(
+                result['passed'].tolist(),
+                [QuizService.is_passing_score(score, 50) for score in expected]
+            )
+            self.assertEqual(result['total_points'], QuizService.calculate_total_points(questions))
+            
+            for column in range(n_questions):
+                hits = [
+                    len(answers) > column
+                    and answers[column].get('option_id') == correct_answers[column]['correct_option_id']
+                    for answers in submissions
+                ]
+                self.assertEqual(result['question_correct_counts'][column], sum(hits))
+    
+    def test_grade_option_index_matrix(self):
+        """Testa correção a partir de índices de opção e pontos por questão"""
+        key = AnswerKey([0, 2, 1], points=[1, 2, 3])
+        responses = np.array([
+            [0, 2, 1],
+            [0, 1, UNANSWERED],
+            [3, 2, 1],
+        ])
+        
+        result = QuizService.grade_batch(responses, key)
+        
+        self.assertEqual(result['scores'].tolist(), [100, 33, 66])
+        self.assertEqual(result['passed'].tolist(), [True, False, True])
+        self.assertEqual(result['points'].tolist(), [6, 1, 5])
+        self.assertEqual(result['question_correct_counts'].tolist(), [2, 2, 2])
+        
+        with self.assertRaises(ValueError):
+            QuizService.grade_batch(responses[:, :2], key)
+
+
+class TestQuizStatistics(unittest.TestCase):
+    """Testes para estatísticas incrementais de quizzes"""
+    
+    def test_matches_full_recomputation(self):
+        """Testa equivalência com o cálculo sobre todas as notas"""
+        rng = random.Random(3)
+        scores = [rng.randint(0, 100) for _ in range(1001)]
+        
+        incremental = QuizStatistics()
+        for score in scores[:400]:
+            incremental.add(score)
+        incremental.add_many(np.array(scores[400:]))
+        
+        summary = incremental.summary()
+        
+        self.assertEqual(summary['total_attempts'], len(scores))
+        self.assertAlmostEqual(summary['average_score'], statistics.mean(scores))
+        self.assertAlmostEqual(summary['std_dev'], statistics.stdev(scores))
+        self.assertEqual(summary['highest_score'], max(scores))
+        self.assertEqual(summary['lowest_score'], min(scores))
+        self.assertEqual(summary['median_score'], statistics.median(scores))
+        for p, value in summary['percentiles'].items():
+            self.assertAlmostEqual(value, np.percentile(scores, p))
+    
+    def test_merge_across_processes(self):
+        """Testa mescla de estados serializados de workers"""
+        rng = random.Random(5)
+        parts = [[rng.randint(0, 100) for _ in range(n)] for n in (0, 1, 50, 300)]
+        
+        merged = QuizStatisticsStore()
+        for part in parts:
+            worker = QuizStatisticsStore()
+            worker.record_started('q', len(part) + 1)
+            worker.record_scores('q', part)
+            merged.merge(pickle.loads(pickle.dumps(worker)))
+        
+        single = QuizStatistics()
+        single.add_many([score for part in parts for score in part])
+        
+        summary = merged.summary('q')
+        for name, value in single.summary().items():
+            if name not in ('completion_rate', 'percentiles'):
+                self.assertAlmostEqual(summary[name], value)
+        self.assertAlmostEqual(summary['completion_rate'], 351 / 355 * 100)
+    
+    def test_get_quiz_statistics_after_grading(self):
+        """Testa estatísticas atualizadas pela correção em lote"""
+        key = AnswerKey([0, 1])
+        QuizService.record_attempt_started('quiz-stats')
+        QuizService.grade_batch(np.array([[0, 1], [0, 0], [1, 0]]), key, quiz_id='quiz-stats')
+        
+        stats = QuizService.get_quiz_statistics('quiz-stats')
+        
+        self.assertEqual(stats['total_attempts'], 3)
+        self.assertEqual(stats['highest_score'], 100)
+        self.assertEqual(stats['lowest_score'], 0)
+        self.assertEqual(stats['median_score'], 50)
+        self.assertEqual(QuizService.get_quiz_statistics('sem-tentativas')['total_attempts'], 0)
+
+
+class TestItemAnalysis(unittest.TestCase):
+    """Testes para análise de itens"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        ability = rng.normal(size=(500, 1))
+        difficulty = np.linspace(-2, 2, 8)
+        self.correct = (ability - difficulty + rng.normal(size=(500, 8)) > 0).astype(np.int8)
+        self.correct[:, 7] = 1  # Questão sem variância
+    
+    def test_matches_direct_computation(self):
+        """Testa índices em blocos contra o cálculo sobre a matriz inteira"""
+        points = [1, 2, 1, 3, 1, 1, 2, 1]
+        analysis = ItemAnalysis.from_blocks(
+            (self.correct[start:start + 64] for start in range(0, 500, 64)), points=points
+        )
+        results = analysis.results()
+        
+        totals = self.correct @ np.array(points)
+        for index, result in enumerate(results[:7]):
+            column = self.correct[:, index]
+            self.assertAlmostEqual(result['p_value'], column.mean())
+            self.assertAlmostEqual(result['point_biserial'], np.corrcoef(column, totals)[0, 1])
+            self.assertAlmostEqual(
+                result['corrected_point_biserial'],
+                np.corrcoef(column, totals - points[index] * column)[0, 1]
+            )
+        
+        self.assertEqual(results[7]['p_value'], 1.0)
+        self.assertIsNone(results[7]['point_biserial'])
+        self.assertIn('muito fácil', analysis.flags(results[7]))
+    
+    def test_merge_and_responses(self):
+        """Testa mescla de análises parciais e entrada por índices de opção"""
+        key = AnswerKey([1] * 8)
+        first = ItemAnalysis(8)
+        first.update_responses(self.correct[:200].astype(np.int32), key)
+        second = ItemAnalysis(8)
+        second.update(self.correct[200:])
+        first.merge(second)
+        
+        self.assertEqual(first.results(), ItemAnalysis.from_blocks([self.correct]).results())
+    
+    def test_cli_report(self):
+        """Testa o relatório do comando item-analysis"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'acertos.csv')
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow([f"Q{i}" for i in range(8)])
+                writer.writerows(self.correct.tolist())
+            
+            output = io.StringIO()
+            with redirect_stdout(output):
+                AdminCLI().run(['item-analysis', '--input', path, '--block-size', '100'])
+        
+        report = output.getvalue()
+        self.assertIn('Tentativas analisadas: 500', report)
+        self.assertIn('Q7', report)
+
+
 class TestDataIntegrity(unittest.TestCase):
     """Testes de integridade de dados"""
     
@@ -4,7 +4,8 @@ Funções utilitárias gerais
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from itertools import islice
+from typing import Optional, List, Dict, Iterable, Iterator
 
 
 def format_datetime(dt: datetime, format_string: str = "%d/%m/%Y %H:%M") -> str:
@@ -41,6 +42,16 @@ def chunk_list(items: List, chunk_size: int) -> List[List]:
     return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
 
 
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    """Divide um iterável em chunks sem materializá-lo por completo"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def calculate_percentage(part: float, whole: float) -> float:
     """Calcula porcentagem"""
     if whole == 0: